@@ -0,0 +1,228 @@
+import csv
+import json
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import win_lines, default_win_length
+from book import MARK_PLAYER, MARK_OPPONENT, MARK_EMPTY
+from game import EVALUATE_SIZE
+from symmetry import Symmetry
+from server import normalize, request_key, search_move
+
+# Posições lidas e buscadas de cada vez (a memoria depende deste bloco e do cache, não do tamanho da entrada)
+ANALYZE_CHUNK   = 1000
+
+# Resultados mantidos no cache compartilhado pelo lote todo
+ANALYZE_CACHE   = 100000
+
+# Formato pela extensão do arquivo (o restante é JSONL)
+FORMAT_CSV      = ".csv"
+
+# Separador das linhas do board na coluna board do CSV (ex: 100/020/000)
+CSV_ROW         = "/"
+
+# Colunas do arquivo de saida
+OUTPUT_FIELDS   = ("line","id","move","score","nodes","cached","error")
+
+# Simetrias por (formato,k)
+_symmetries     = {}
+
+
+def csv_request(row,defaults):
+    """
+    Requisição de uma linha do CSV
+    """
+
+    request = dict(defaults,board=[[int(cell) for cell in line] for line in row["board"].strip().split(CSV_ROW)])
+
+    for key in ("id","strategy"):
+        if row.get(key):
+            request[key] = row[key]
+
+    for key in ("player","win_length"):
+        if row.get(key):
+            request[key] = int(row[key])
+
+    return request
+
+
+def read_positions(file_name,defaults):
+    """
+    Gera (linha,requisição,erro) de cada posição do arquivo JSONL (uma requisição do servidor por linha) ou CSV
+    (colunas board no formato 100/020/000 e, opcionais, id, player, strategy e win_length).
+    defaults completa as requisições (ex: strategy e options da linha de comando).
+    Uma linha invalida gera o erro (requisição None) e a leitura continua
+    """
+
+    with open(file_name,newline="") as f:
+
+        if file_name.endswith(FORMAT_CSV):
+            rows = enumerate(csv.DictReader(f),2)
+            read = lambda row: csv_request(row,defaults)
+        else:
+            rows = ((number,line) for number,line in enumerate(f,1) if line.strip())
+            read = lambda line: dict(defaults,**json.loads(line))
+
+        for number,row in rows:
+            try:
+                yield number,read(row),None
+            except Exception as e:
+                yield number,None,"{}: {}".format(type(e).__name__,e)
+
+
+def symmetry(shape,win_length):
+    """
+    Simetrias do formato (cache por formato e k)
+    """
+
+    k = win_length if win_length is not None else default_win_length(shape,EVALUATE_SIZE)
+
+    if (shape,k) not in _symmetries:
+        _symmetries[(shape,k)] = Symmetry(shape,win_lines(shape,k))
+
+    return _symmetries[(shape,k)]
+
+
+def canonical(request):
+    """
+    Posição equivalente canonica: jogador da vez como 1, oponente como 2 e a orientação de menor texto.
+    Retorna (requisição canonica,simetria) para levar a jogada de volta ao tabuleiro real
+    """
+
+    shape       = tuple(request["shape"])
+    player      = request["player"]
+    cells       = [MARK_EMPTY if value == 0 else MARK_PLAYER if value == player else MARK_OPPONENT
+                   for row in request["board"] for value in row]
+    (text,t)    = symmetry(shape,request["win_length"]).canonical_string(cells)
+    values      = {MARK_EMPTY: 0,MARK_PLAYER: 1,MARK_OPPONENT: 2}
+    board       = [[values[cell] for cell in text[row * shape[1]:(row + 1) * shape[1]]] for row in range(shape[0])]
+
+    return dict(request,board=board,player=1),t
+
+
+def search_all(pending,pool):
+    """
+    Busca as posições pendentes (chave: requisição canonica) no pool ou neste processo.
+    A falha de uma busca (inclusive do proprio pool) vira o erro somente das posições dela
+    """
+
+    if pool is None:
+        return {key: search_move(request) for key,request in pending.items()}
+
+    futures = {key: pool.submit(search_move,request) for key,request in pending.items()}
+    found   = {}
+
+    for key,future in futures.items():
+        try:
+            found[key] = future.result()
+        except Exception as e:
+            found[key] = {"error": "{}: {}".format(type(e).__name__,e)}
+
+    return found
+
+
+def analyze(input_file,output_file,defaults,workers=1,chunk_size=ANALYZE_CHUNK,cache_size=ANALYZE_CACHE,progress=None):
+    """
+    Melhor jogada, score e nós de cada posição do arquivo de entrada gravados no arquivo de saida (JSONL ou CSV), na mesma ordem.
+    As posições equivalentes (simetria e troca dos jogadores) são buscadas uma unica vez e os resultados ficam em um cache LRU
+    compartilhado pelo lote todo. Retorna os contadores (posições, buscas, cache, erros)
+    """
+
+    cache   = OrderedDict()
+    stats   = dict(positions=0,searches=0,cached=0,errors=0)
+    pool    = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    as_csv  = output_file.endswith(FORMAT_CSV)
+
+    with open(output_file,"w",newline="") as out:
+
+        writer = csv.DictWriter(out,OUTPUT_FIELDS) if as_csv else None
+
+        if writer is not None:
+            writer.writeheader()
+
+        positions = read_positions(input_file,defaults)
+
+        while True:
+
+            chunk = list(itertools.islice(positions,chunk_size))
+
+            if len(chunk) == 0:
+                break
+
+            rows    = []
+            pending = OrderedDict()
+            hits    = {}
+
+            for number,request,error in chunk:
+
+                row = dict(line=number,id=request.get("id") if isinstance(request,dict) else None)
+
+                if error is not None:
+                    row["error"] = error
+                    rows.append(row)
+                    continue
+
+                try:
+                    (search,t) = canonical(normalize(request))
+                    key        = request_key(search)
+                    row.update(key=key,t=t,shape=tuple(search["shape"]),win_length=search["win_length"])
+                    if key in cache:
+                        hits[key] = cache[key]
+                        cache.move_to_end(key)
+                    elif key not in pending:
+                        pending[key] = search
+                except Exception as e:
+                    row["error"] = "{}: {}".format(type(e).__name__,e)
+
+                rows.append(row)
+
+            found    = search_all(pending,pool)
+
+            for key,result in found.items():
+                if "error" in result:
+                    continue
+                cache[key] = result
+                if len(cache) > cache_size:
+                    cache.popitem(last=False)
+
+            searched = set()
+
+            for row in rows:
+
+                stats["positions"] += 1
+
+                if "key" in row:
+
+                    key = row.pop("key")
+
+                    # Somente a primeira ocorrencia de uma posição buscada neste bloco conta como busca
+                    cached  = key not in found or key in searched
+                    result  = hits[key] if key in hits else found[key]
+
+                    searched.add(key)
+
+                    (t,shape,win_length) = (row.pop("t"),row.pop("shape"),row.pop("win_length"))
+
+                    row.update(result,cached=cached)
+
+                    if "move" in result:
+                        row["move"] = list(symmetry(shape,win_length).from_canonical(t,tuple(result["move"])))
+
+                    stats["cached" if cached else "searches"] += 1
+
+                if "error" in row:
+                    stats["errors"] += 1
+
+                if writer is not None:
+                    writer.writerow(dict(row,move="{},{}".format(*row["move"]) if "move" in row else None))
+                else:
+                    out.write(json.dumps({key: value for key,value in row.items() if value is not None},separators=(",",":")) + "\n")
+
+            if progress is not None:
+                progress(stats)
+
+    if pool is not None:
+        pool.shutdown()
+
+    return stats
@@ -0,0 +1,252 @@
+import json
+import time
+import platform
+import numpy as np
+
+from game import create_game, ENGINE_NUMPY, ENGINE_BITBOARD
+from player import create_players, Player
+from register import Register
+from strategy import StrategyGame
+
+# Formatos e confrontos medidos por padrão
+BENCH_SHAPES    = ((3,3),(3,4),(4,4))
+BENCH_PAIRINGS  = ((StrategyGame.RANDOM,StrategyGame.RANDOM),
+                   (StrategyGame.ALPHA_BETA,StrategyGame.RANDOM),
+                   (StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA))
+
+# Profundidade das buscas (a busca completa do 4x4 levaria minutos por partida)
+BENCH_DEPTH     = 3
+
+# Tabuleiros aleatorios usados nas medidas das funções
+BENCH_BOARDS    = 512
+
+# Tempo minimo (s) de cada medida
+BENCH_TIME      = 0.2
+
+# Piora (fração) a partir da qual uma medida é considerada regressão
+REGRESSION      = 0.10
+
+# Unidades: tempo por chamada (menor é melhor) ou vazão (maior é melhor)
+UNIT_TIME       = "us/call"
+UNIT_NODES      = "nodes/s"
+UNIT_GAMES      = "games/s"
+
+
+def shape_name(shape):
+    """
+    Nome do formato usado nas chaves do resultado (ex: 3x4)
+    """
+
+    return "{}x{}".format(*shape)
+
+
+def measure(func,count,min_time=BENCH_TIME,repeat=5):
+    """
+    Executa func() (que processa count itens) até passar min_time, repeat vezes.
+    Retorna o menor tempo por item em segundos
+    """
+
+    best = None
+
+    for r in range(repeat):
+
+        calls   = 0
+        start   = time.perf_counter()
+
+        while True:
+            func()
+            calls  += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+
+        per_item = elapsed / (calls * count)
+        best     = per_item if best is None else min(best,per_item)
+
+    return best
+
+
+def random_boards(game,players,count,rng):
+    """
+    Tabuleiros com uma quantidade aleatoria de jogadas (alternando os jogadores) na representação do jogo
+    """
+
+    boards  = []
+    size    = game.shape[0] * game.shape[1]
+
+    for i in range(count):
+        board = game.create_board()
+        for turn,index in enumerate(rng.permutation(size)[:rng.integers(0,size + 1)]):
+            board_place(board,players[turn % 2],(int(index) // game.shape[1],int(index) % game.shape[1]))
+        boards.append(board)
+
+    return boards
+
+
+def board_place(board,player,position):
+    """
+    Jogada sem passar por Game.place (usada somente para montar os tabuleiros do benchmark)
+    """
+
+    if isinstance(board,np.ndarray):
+        board[position] = player.id
+    else:
+        board.place(position,player.id)
+
+
+def bench_functions(shape,engine,min_time=BENCH_TIME,seed=0):
+    """
+    Tempo por chamada de Game.evaluate, Game.possibilities_cells, Game.place (+ undo) e Register.board_out
+    """
+
+    game            = create_game(shape,False,engine,trace=False)
+    players         = [Player(1,"X"),Player(2,"O")]
+    game.players    = players
+    rng             = np.random.default_rng(seed)
+    boards          = random_boards(game,players,BENCH_BOARDS,rng)
+    register        = Register(None)
+    empty           = game.create_board()
+    cells           = game.possibilities_cells(empty)
+    player          = players[0]
+
+    def evaluate():
+        for board in boards:
+            game.evaluate(board)
+
+    def possibilities():
+        for board in boards:
+            game.possibilities_cells(board)
+
+    def place():
+        for pos in cells:
+            game.place(empty,player,pos)
+            game.undo(empty,pos)
+
+    def board_out():
+        for board in boards:
+            register.board_out(board,players)
+
+    return {
+        "evaluate"          : measure(evaluate,len(boards),min_time),
+        "possibilities_cells": measure(possibilities,len(boards),min_time),
+        "place"             : measure(place,len(cells),min_time),
+        "board_out"         : measure(board_out,len(boards),min_time),
+    }
+
+
+def bench_search(shape,strategy,engine=ENGINE_NUMPY,depth=BENCH_DEPTH,min_time=BENCH_TIME):
+    """
+    Nós por segundo da busca (sem tabela de transposição) da primeira jogada do tabuleiro vazio
+    """
+
+    game            = create_game(shape,False,engine,trace=False,seed=0)
+    game.players    = create_players(game,((1,strategy,"X"),(2,StrategyGame.RANDOM,"O")),None,False,tt_size=0,depth=depth)
+    strategy        = game.players[0].strategy
+    nodes           = []
+
+    game.start()
+
+    def search():
+        strategy.move()
+        nodes.append(strategy.count)
+
+    per_call = measure(search,1,min_time)
+
+    return nodes[-1] / per_call
+
+
+def bench_games(shape,pairing,engine=ENGINE_NUMPY,depth=BENCH_DEPTH,min_time=BENCH_TIME):
+    """
+    Partidas completas por segundo do confronto (sem trace)
+    """
+
+    game            = create_game(shape,False,engine,trace=False,seed=0)
+    game.players    = create_players(game,((1,pairing[0],"X"),(2,pairing[1],"O")),None,False,tt_size=0,depth=depth)
+    played          = [0]
+
+    def games():
+        game.play_games(played[0],1)
+        played[0] += 1
+
+    return 1 / measure(games,1,min_time,repeat=1)
+
+
+def run_bench(shapes=BENCH_SHAPES,pairings=BENCH_PAIRINGS,min_time=BENCH_TIME,depth=BENCH_DEPTH,progress=None):
+    """
+    Executa o benchmark. Retorna {"meta": ..., "results": {nome: {"value","unit"}}}
+    com os nomes no formato medida/formato[/detalhe] (ex: evaluate/3x3/numpy, nodes/4x4/alpha_beta, games/3x3/alpha_beta-random)
+    """
+
+    results = {}
+
+    def add(name,value,unit):
+        results[name] = {"value": value,"unit": unit}
+        if progress is not None:
+            progress(name,results[name])
+
+    for shape in shapes:
+
+        for engine in (ENGINE_NUMPY,ENGINE_BITBOARD):
+            for name,seconds in bench_functions(shape,engine,min_time).items():
+                add("{}/{}/{}".format(name,shape_name(shape),engine),seconds * 1e6,UNIT_TIME)
+
+        for strategy in (StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA):
+            add("nodes/{}/{}".format(shape_name(shape),strategy),bench_search(shape,strategy,depth=depth,min_time=min_time),UNIT_NODES)
+
+        for pairing in pairings:
+            add("games/{}/{}".format(shape_name(shape),"-".join(pairing)),bench_games(shape,pairing,depth=depth,min_time=min_time),UNIT_GAMES)
+
+    return {
+        "meta": {
+            "python"    : platform.python_version(),
+            "numpy"     : np.__version__,
+            "machine"   : platform.machine(),
+            "time"      : time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "min_time"  : min_time,
+            "depth"     : depth,
+        },
+        "results": results,
+    }
+
+
+def compare(results,baseline,threshold=REGRESSION):
+    """
+    Compara com um benchmark gravado. Retorna (nome,base,atual,variação) de cada medida presente nos dois,
+    com a variação positiva quando piorou (mais tempo por chamada ou menos vazão)
+    """
+
+    changes = []
+
+    for name,current in results["results"].items():
+
+        base = baseline["results"].get(name)
+
+        if base is None or base["value"] <= 0 or current["value"] <= 0:
+            continue
+
+        if current["unit"] == UNIT_TIME:
+            change = current["value"] / base["value"] - 1
+        else:
+            change = base["value"] / current["value"] - 1
+
+        changes.append((name,base["value"],current["value"],change))
+
+    return changes
+
+
+def save_bench(results,file_name):
+    """
+    Grava o resultado em JSON
+    """
+
+    with open(file_name,"w") as f:
+        json.dump(results,f,indent=1)
+
+
+def load_bench(file_name):
+    """
+    Carrega um resultado gravado com save_bench
+    """
+
+    with open(file_name) as f:
+        return json.load(f)
@@ -0,0 +1,284 @@
+import numpy as np
+
+EMPTY_CELL      = 0
+NO_WINNER       = 0
+
+# Direções das linhas de vitoria: linha, coluna, diagonal e diagonal inversa
+DIRECTIONS      = ((0,1),(1,0),(1,1),(1,-1))
+
+# Cache das mascaras das linhas de vitoria por (shape,win_length)
+_LINES          = {}
+
+
+def default_win_length(shape,size_max):
+    """
+    Tamanho da sequencia para vencer quando não informado: o menor lado do tabuleiro limitado a size_max
+    """
+
+    return min(min(shape),size_max)
+
+
+def win_lines(shape,win_length):
+    """
+    Lista as linhas de vitoria (sequencia de celulas) de um tabuleiro m x n com k = win_length em sequencia:
+    todos os segmentos de k celulas nas linhas, colunas e nas 2 diagonais
+    """
+
+    rows,cols   = shape
+    lines       = []
+
+    for dr,dc in DIRECTIONS:
+        for row in range(rows):
+            for col in range(cols):
+                end_row = row + dr * (win_length - 1)
+                end_col = col + dc * (win_length - 1)
+                if 0 <= end_row < rows and 0 <= end_col < cols:
+                    lines.append(tuple((row + dr * i,col + dc * i) for i in range(win_length)))
+
+    return lines
+
+
+def cell_lines(shape,lines):
+    """
+    Para cada celula (indice row * cols + col) a lista dos indices das linhas que passam por ela
+    """
+
+    cols    = shape[1]
+    cells   = [[] for i in range(shape[0] * cols)]
+
+    for index,line in enumerate(lines):
+        for r,c in line:
+            cells[r * cols + c].append(index)
+
+    return cells
+
+
+def win_masks(shape,win_length):
+    """
+    Mascaras de bits das linhas de vitoria do formato do tabuleiro e,
+    para cada celula, as mascaras das linhas que passam por ela
+    """
+
+    key = (tuple(shape),win_length)
+
+    if key not in _LINES:
+        cols    = shape[1]
+        lines   = win_lines(shape,win_length)
+        masks   = tuple(sum(1 << (r * cols + c) for r,c in line) for line in lines)
+        _LINES[key] = (masks,tuple(tuple(masks[i] for i in indexes) for indexes in cell_lines(shape,lines)))
+
+    return _LINES[key]
+
+
+class BitBoard(object):
+    """
+    Tabuleiro representado por uma mascara inteira para cada jogador.
+    O bit (row * cols + col) indica a celula ocupada
+    """
+
+    __slots__ = ("_shape","_cols","_size","_full","_lines","_cell_lines","_masks","_occupied")
+
+    def __init__(self,shape=(3,3),win_length=3):
+
+        self._shape     = tuple(shape)
+        self._cols      = self._shape[1]
+        self._size      = self._shape[0] * self._shape[1]
+        self._full      = (1 << self._size) - 1
+        (self._lines,self._cell_lines) = win_masks(self._shape,win_length)
+        self._masks     = {}
+        self._occupied  = 0
+
+    @property
+    def shape(self):
+        """
+        Formato do board
+        """
+        return self._shape
+
+    @property
+    def size(self):
+        """
+        Quantidade de celulas do board
+        """
+        return self._size
+
+    @property
+    def masks(self):
+        """
+        Mascara de bits de cada jogador
+        """
+        return self._masks
+
+    @property
+    def occupied(self):
+        """
+        Mascara das celulas ocupadas
+        """
+        return self._occupied
+
+    def copy(self):
+        """
+        Copia do tabuleiro (apenas os inteiros das mascaras)
+        """
+
+        board           = BitBoard.__new__(BitBoard)
+        board._shape    = self._shape
+        board._cols     = self._cols
+        board._size     = self._size
+        board._full     = self._full
+        board._lines    = self._lines
+        board._cell_lines = self._cell_lines
+        board._masks    = dict(self._masks)
+        board._occupied = self._occupied
+
+        return board
+
+    def bit(self,position):
+        """
+        Bit correspondente a posição (row,col)
+        """
+
+        return 1 << (position[0] * self._cols + position[1])
+
+    def __getitem__(self,position):
+
+        bit = self.bit(position)
+
+        for player_id,mask in self._masks.items():
+            if mask & bit:
+                return player_id
+
+        return EMPTY_CELL
+
+    def place(self,position,player_id):
+        """
+        Marca a celula para o jogador. Retorna False se a celula estiver ocupada
+        """
+
+        bit = self.bit(position)
+
+        if self._occupied & bit:
+            return False
+
+        self._masks[player_id]  = self._masks.get(player_id,0) | bit
+        self._occupied         |= bit
+
+        return True
+
+    def undo(self,position):
+        """
+        Desfaz a jogada da celula
+        """
+
+        bit = ~self.bit(position)
+
+        for player_id in self._masks:
+            self._masks[player_id] &= bit
+
+        self._occupied &= bit
+
+    def empty_cells(self):
+        """
+        Lista as celulas vazias na mesma ordem de np.where (linha a linha)
+        """
+
+        cols    = self._cols
+        empty   = ~self._occupied & self._full
+        cells   = []
+
+        while empty:
+            low     = empty & -empty
+            index   = low.bit_length() - 1
+            cells.append((index // cols,index % cols))
+            empty  ^= low
+
+        return cells
+
+    def is_full(self):
+        """
+        Retorna True se todas as celulas estiverem ocupadas
+        """
+
+        return self._occupied == self._full
+
+    def is_empty(self):
+        """
+        Retorna True se nenhuma celula estiver ocupada
+        """
+
+        return self._occupied == 0
+
+    def wins(self,player_id):
+        """
+        Verifica se o jogador fechou alguma linha
+        """
+
+        mask = self._masks.get(player_id,0)
+
+        for line in self._lines:
+            if mask & line == line:
+                return True
+
+        return False
+
+    def winner(self,players_id):
+        """
+        Mesmo resultado de Game.evaluate: id do ganhador (o ultimo da lista se os dois fecharam linhas), -1 para empate e 0 caso a partida não tenha acabado
+        """
+
+        winner = NO_WINNER
+
+        for player_id in players_id:
+            if self.wins(player_id):
+                winner = player_id
+
+        if winner == NO_WINNER and self._occupied == self._full:
+            winner = -1
+
+        return winner
+
+    def winner_at(self,position):
+        """
+        Verifica somente as linhas que passam pela celula da ultima jogada (O(k) em vez de O(board)).
+        Retorna o id do jogador da celula se ele fechou uma linha, -1 para empate e 0 caso a partida não tenha acabado
+        """
+
+        index = position[0] * self._cols + position[1]
+        bit   = 1 << index
+
+        for player_id,mask in self._masks.items():
+            if mask & bit:
+                for line in self._cell_lines[index]:
+                    if mask & line == line:
+                        return player_id
+                break
+
+        return -1 if self._occupied == self._full else NO_WINNER
+
+    def to_array(self):
+        """
+        Converte para o tabuleiro NumPy usado pelo Game
+        """
+
+        board = np.zeros(self._size,dtype=int)
+
+        for player_id,mask in self._masks.items():
+            for index in range(self._size):
+                if mask >> index & 1:
+                    board[index] = player_id
+
+        return board.reshape(self._shape)
+
+    @staticmethod
+    def from_array(board,win_length=3):
+        """
+        Cria o bitboard a partir de um tabuleiro NumPy
+        """
+
+        bitboard = BitBoard(board.shape,win_length)
+
+        for (row,col),value in np.ndenumerate(board):
+            if value != EMPTY_CELL:
+                bitboard.place((row,col),int(value))
+
+        return bitboard
@@ -0,0 +1,201 @@
+import json
+
+from game import Game
+from symmetry import Symmetry
+
+# Caracteres da posição no livro: jogador da vez, oponente e celula vazia
+MARK_PLAYER     = "x"
+MARK_OPPONENT   = "o"
+MARK_EMPTY      = "."
+
+
+class OpeningBook(object):
+    """
+    Livro de aberturas: melhor jogada e score das primeiras jogadas de um formato de tabuleiro.
+    A posição é guardada do ponto de vista do jogador da vez ("x" = jogador da vez, "o" = oponente, "." = vazio)
+    e na orientação canonica, portanto serve para qualquer id de jogador e para as posições simetricas
+    """
+
+    def __init__(self,shape,lines,plies=0,positions=None):
+
+        self._shape     = tuple(shape)
+        self._win_length= len(lines[0]) if len(lines) > 0 else 0
+        self._plies     = plies
+        self._positions = positions if positions is not None else {}
+        self._symmetry  = Symmetry(self._shape,lines)
+        self._hits      = 0
+        self._misses    = 0
+
+    @property
+    def shape(self):
+        """
+        Formato do tabuleiro do livro
+        """
+        return self._shape
+
+    @property
+    def win_length(self):
+        """
+        Celulas em sequencia para vencer do jogo do livro
+        """
+        return self._win_length
+
+    @property
+    def plies(self):
+        """
+        Quantidade de jogadas cobertas pelo livro
+        """
+        return self._plies
+
+    @property
+    def hits(self):
+        """
+        Quantidade de posições encontradas no livro
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Quantidade de posições não encontradas no livro
+        """
+        return self._misses
+
+    def add_counters(self,hits,misses):
+        """
+        Soma os acertos/falhas de outro livro (ex: a copia usada em outro processo)
+        """
+
+        self._hits     += hits
+        self._misses   += misses
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __key(self,board,player_id):
+        """
+        Posição canonica do ponto de vista do jogador. Retorna (chave,simetria)
+        """
+
+        rows,cols   = self._shape
+        cells       = []
+
+        for row in range(rows):
+            for col in range(cols):
+                value = board[(row,col)]
+                cells.append(MARK_EMPTY if value == 0 else MARK_PLAYER if value == player_id else MARK_OPPONENT)
+
+        return self._symmetry.canonical_string(cells)
+
+    def lookup(self,board,player_id):
+        """
+        Retorna (posição,score) da jogada do livro já na orientação do tabuleiro real ou None
+        """
+
+        if tuple(board.shape) != self._shape:
+            return None
+
+        (key,t) = self.__key(board,player_id)
+        entry   = self._positions.get(key)
+
+        if entry is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+
+        (row,col,score) = entry
+
+        return (self._symmetry.from_canonical(t,(row,col)),score)
+
+    def contains(self,board,player_id):
+        """
+        Verifica se a posição (ou uma simetrica) esta no livro
+        """
+
+        return self.__key(board,player_id)[0] in self._positions
+
+    def add(self,board,player_id,position,score):
+        """
+        Adiciona a jogada de uma posição. Retorna False se a posição (ou uma simetrica) já existir
+        """
+
+        (key,t) = self.__key(board,player_id)
+
+        if key in self._positions:
+            return False
+
+        (row,col) = self._symmetry.to_canonical(t,position)
+
+        self._positions[key] = (int(row),int(col),score)
+
+        return True
+
+    def save(self,file_name):
+        """
+        Grava o livro em JSON compacto
+        """
+
+        with open(file_name,"w") as f:
+            json.dump({
+                "shape"     : list(self._shape),
+                "win_length": self._win_length,
+                "plies"     : self._plies,
+                "positions" : {key: list(entry) for key,entry in self._positions.items()}
+            },f,separators=(",",":"))
+
+    @staticmethod
+    def load(file_name,lines):
+        """
+        Carrega um livro gravado com save. As jogadas só valem para o mesmo tamanho de sequencia (win_length) do jogo
+        """
+
+        with open(file_name) as f:
+            data = json.load(f)
+
+        positions = {key: tuple(entry) for key,entry in data["positions"].items()}
+
+        book = OpeningBook(data["shape"],lines,data["plies"],positions)
+
+        if data.get("win_length",book.win_length) != book.win_length:
+            raise ValueError("Book {} was built for win length {} (game: {})".format(file_name,data["win_length"],book.win_length))
+
+        return book
+
+
+def build_book(game,plies,output=None):
+    """
+    Busca uma unica vez as primeiras N jogadas (plies) do formato do jogo com as estrategias dos jogadores do game.
+    As posições são geradas a partir do tabuleiro vazio, alternando os jogadores na ordem de game.players
+    """
+
+    book        = OpeningBook(game.shape,game.lines,plies)
+    frontier    = [game.create_board()]
+
+    for ply in range(plies):
+
+        player      = game.players[ply % len(game.players)]
+        children    = []
+
+        for board in frontier:
+
+            if game.evaluate(board) != 0 or book.contains(board,player.id):
+                continue
+
+            game.board  = board
+
+            (pos,score) = player.strategy.move()
+
+            book.add(board,player.id,pos,score)
+
+            for cell in Game.possibilities_cells(board):
+                child = Game.copy_board(board)
+                Game.place(child,player,cell)
+                children.append(child)
+
+        frontier = children
+
+    if output is not None:
+        book.save(output)
+
+    return book
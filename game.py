@@ -1,27 +1,47 @@
 import numpy as np
 import itertools
-import matplotlib.pyplot as plt
 import time
-from register import RegisterGame
+from register import RegisterGame, QUEUE_SIZE, POLICY_BLOCK, TRACE_TEXT, TRACE_BINARY
+from bitboard import BitBoard, win_lines, cell_lines, default_win_length
 
 EMPTY_CELL      = 0
 NO_WINNER       = 0
 EVALUATE_SIZE   = 4
 
+# Largura da barra de 100 % do histograma em texto
+HISTOGRAM_WIDTH = 50
+
+# Cache dos indices (linear) das linhas de vitoria por (shape,win_length)
+_INDEXES        = {}
+
+# Representações do tabuleiro
+ENGINE_NUMPY    = 'numpy'
+ENGINE_BITBOARD = 'bitboard'
+
 class Game(object):
 
-    def __init__(self,shape=(3,3),verbose=False):
+    def __init__(self,shape=(3,3),verbose=False,engine=ENGINE_NUMPY,trace=True,trace_suffix="",seed=None,win_length=None,
+                 trace_queue=QUEUE_SIZE,trace_policy=POLICY_BLOCK,trace_format=TRACE_TEXT):
 
         self._count            = 0
         self._ntimes           = 1
         self._shape            = shape
+        self._win_length       = win_length
+        self._engine           = engine
         self._board            = self.create_board()
         self._players          = None
         self._result           = None
+        self._scores           = {}
+        self._times            = []
         self._total_time       = 0
         self._game_start_time  = 0
         self._game_end_time    = 0
-        self._register         = RegisterGame("game.txt",verbose)
+        self._seed             = seed
+        self._trace            = trace
+        self._trace_suffix     = trace_suffix
+        self._trace_format     = trace_format
+        self._trace_options    = dict(queue_size=trace_queue,policy=trace_policy,binary=trace_format == TRACE_BINARY)
+        self._register         = RegisterGame(self.trace_file("game"),verbose,**self._trace_options)
 
     @property
     def register(self):
@@ -30,6 +50,34 @@ class Game(object):
         """
         return self._register
 
+    @property
+    def trace(self):
+        """
+        Indica se os arquivos de trace (game.txt e strategyP*.txt) são gravados
+        """
+        return self._trace
+
+    @property
+    def trace_format(self):
+        """
+        Formato dos arquivos de trace (text ou binary)
+        """
+        return self._trace_format
+
+    @property
+    def trace_options(self):
+        """
+        Gravadores do trace: capacidade da fila (queue_size), politica com a fila cheia (policy) e formato binario (binary)
+        """
+        return self._trace_options
+
+    @property
+    def seed(self):
+        """
+        Semente das estrategias. Cada partida usa (seed,partida,jogador) para ter o mesmo resultado em qualquer processo
+        """
+        return self._seed
+
     @property
     def count(self):
         """
@@ -52,6 +100,13 @@ class Game(object):
 
         return self._total_time
 
+    @property
+    def times(self):
+        """
+        Tempo de execução de cada partida
+        """
+        return self._times
+
     @property
     def game_time(self):
         """
@@ -66,6 +121,13 @@ class Game(object):
         """
         return self.board.size
 
+    @property
+    def engine(self):
+        """
+        Representação do tabuleiro (numpy ou bitboard)
+        """
+        return self._engine
+
     @property
     def shape(self):
         """
@@ -78,10 +140,43 @@ class Game(object):
         self._shape = value
         self._board = self.create_board()
 
+    @property
+    def win_length(self):
+        """
+        Quantidade de celulas em sequencia para vencer (k). Padrão: menor lado do board limitado a EVALUATE_SIZE
+        """
+
+        if self._win_length is None:
+            return default_win_length(self._shape,EVALUATE_SIZE)
+
+        return self._win_length
+
+    @property
+    def lines(self):
+        """
+        Linhas de vitoria (sequencia de celulas) do formato do board
+        """
+        return win_lines(self._shape,self.win_length)
+
+    def __indexes(self):
+        """
+        Indices lineares (row * cols + col) das linhas de vitoria: matriz (linhas,k) e, por celula, a matriz das linhas que passam por ela
+        """
+
+        key = (tuple(self._shape),self.win_length)
+
+        if key not in _INDEXES:
+            cols    = self._shape[1]
+            lines   = self.lines
+            index   = np.array([[r * cols + c for r,c in line] for line in lines],dtype=np.intp).reshape(len(lines),self.win_length)
+            _INDEXES[key] = (index,[index[cells] for cells in cell_lines(self._shape,lines)])
+
+        return _INDEXES[key]
+
     @property
     def result(self):
         """
-        Lista do resultados dos jogos
+        Lista do resultados dos jogos (com o arquivo de resultados: somente o ultimo bloco)
         """
         return self._result
 
@@ -89,6 +184,13 @@ class Game(object):
     def result(self, value):
         self._result = value
 
+    @property
+    def scores(self):
+        """
+        Quantidade de partidas por resultado (id do ganhador ou -1 no empate), atualizada a cada bloco de partidas
+        """
+        return self._scores
+
     @property
     def seq_turn(self):
         """
@@ -127,13 +229,41 @@ class Game(object):
         self._board = value
 
 
+    def trace_file(self,name):
+        """
+        Nome do arquivo de trace (ex: game -> game.txt ou game.bin no formato binario) ou None se o trace estiver desativado
+        """
+
+        if not self._trace:
+            return None
+
+        return "{}{}.{}".format(name,self._trace_suffix,"bin" if self._trace_format == TRACE_BINARY else "txt")
+
+    @staticmethod
+    def engines():
+        return [ENGINE_NUMPY,ENGINE_BITBOARD]
+
     def create_board(self):
         """
         Cria o tabuleiro e iniciliza todas as posições com zero
         """
 
+        if self._engine == ENGINE_BITBOARD:
+            return BitBoard(self._shape,self.win_length)
+
         return np.zeros(self._shape,dtype=int)
 
+    @staticmethod
+    def copy_board(board):
+        """
+        Copia do tabuleiro independente da representação
+        """
+
+        if isinstance(board,BitBoard):
+            return board.copy()
+
+        return np.copy(board)
+
     def opponent(self,player):
         """
         Retorna o oponente do player
@@ -157,7 +287,7 @@ class Game(object):
 
         # inicia a estrategia de cada jogador
         for player in self._players:
-            player.strategy.start()
+            player.strategy.start(None if self._seed is None else "{}:{}:{}".format(self._seed,self._count,player.id))
         
         # registra no trace o inicio da partida
         self._register.begin_game(self)
@@ -167,7 +297,10 @@ class Game(object):
         """
         Verifca se a partida acabou verificando se o tabuleiro esta completo
         """
-        
+
+        if isinstance(self._board,BitBoard):
+            return self._board.is_full()
+
         return np.all(self._board!=0)
 
     def empty_cells(self):
@@ -183,6 +316,9 @@ class Game(object):
         Lista as celulas disponiveis de um board
         """
 
+        if isinstance(board,BitBoard):
+            return board.empty_cells()
+
         (x,y) = np.where(board==EMPTY_CELL)
         return list(zip(x, y))
 
@@ -191,82 +327,142 @@ class Game(object):
         Retorna True se o tabuleiro estiver vazio
         """
 
-        return np.all(self._board == EMPTY_CELL )
-
-    @staticmethod
-    def __row_win(board, player):
-        """
-        verifica se o jogador fechou uma linha
-        """
-
-        return np.any(np.all(board==player,axis=1))
- 
-    @staticmethod
-    def __col_win(board, player):
-        """
-        verifica se o jogador fechou uma coluna
-        """
-
-        # board is less than size_max x size_max
-        return np.any(np.all(board==player,axis=0))
+        if isinstance(self._board,BitBoard):
+            return self._board.is_empty()
 
-    @staticmethod   
-    def __diag_win(board, player):
-        """
-        verifica se o jogador fechou as 2 diagonais
-        """
-
-        return np.all(board.diagonal()==player) or np.all(np.fliplr(board).diagonal()==player)
+        return np.all(self._board == EMPTY_CELL )
 
     #@staticmethod
-    def evaluate(self,board = None):
+    def evaluate(self,board = None,empty = None):
         """
-        verifica se existe algum ganhador
+        verifica se existe algum ganhador em todas as linhas de vitoria do board.
+        empty é a quantidade de celulas vazias quando quem chama já a conhece (evita percorrer o board para o empate)
         """
 
         if board is None:
             board   = self._board 
 
+        if isinstance(board,BitBoard):
+            return board.winner([player.id for player in self._players])
+
         winner  = NO_WINNER
+        cells   = board.ravel()[self.__indexes()[0]]
 
         for player in self._players:
-            if board.size <= (EVALUATE_SIZE * EVALUATE_SIZE ):
-                # board is less than size_max x size_max
-                if Game.__row_win(board,player.id) or Game.__col_win(board,player.id) or Game.__diag_win(board,player.id):
-                    winner = player.id
-            else:
-                # board is bigegr than size_max x size_max
-                for row in range(board.shape[0]- EVALUATE_SIZE + 1):
-                    for col in range(board.shape[1] - EVALUATE_SIZE + 1):
-                        t = board[row:row + EVALUATE_SIZE , col:col + EVALUATE_SIZE ]
-
-                        winner = self.evaluate(t)
-
-        if np.all(board!=0) and winner == NO_WINNER:
+            if np.any(np.all(cells == player.id,axis=1)):
+                winner = player.id
+
+        if winner == NO_WINNER and (empty == 0 if empty is not None else np.all(board != EMPTY_CELL)):
             winner = -1
 
         return winner
 
-    def play(self,ntimes = 1):
+    def evaluate_move(self,board,position,empty):
+        """
+        verifica somente as linhas que passam pela celula da ultima jogada (O(k) em vez de O(board)).
+        Como a partida termina no primeiro ganhador, apenas o jogador da celula pode ter fechado uma linha.
+        empty é a quantidade de celulas vazias após a jogada (mantida por quem joga): o empate não percorre o board
+        """
+
+        if isinstance(board,BitBoard):
+            return board.winner_at(position)
+
+        player_id = board[position]
+        cells     = board.ravel()[self.__indexes()[1][position[0] * self._shape[1] + position[1]]]
+
+        if player_id != EMPTY_CELL and np.any(np.all(cells == player_id,axis=1)):
+            return int(player_id)
+
+        if empty == 0:
+            return -1
+
+        return NO_WINNER
+
+    def play(self,ntimes = 1,runner = None,stream = None):
         '''
         Realiza N partidas para criação da estatisiticas
         Preenche o array result com os resultados de todos os jogos
+        runner distribui as partidas (ex: runner.ProcessRunner) e devolve o resultado compacto de cada parte
+        stream (results.ResultStream) grava os resultados em blocos com checkpoint: as partidas continuam a partir do checkpoint
+        e somente o ultimo bloco fica em memoria
         '''
 
         self._ntimes = ntimes
 
         # Zera o acumulado do tempo total de processamento
         self._total_time = 0
+        self._scores     = {}
 
         # Registra no arquivo de log os parametros de entrada
         self._register.begin_game(self,True)
 
+        if stream is None:
+            self.__play_chunk(0,ntimes,runner)
+        else:
+            # Continua do checkpoint: as sementes são por partida, então as restantes são as mesmas de uma execução completa
+            self._count         = stream.count
+            self._scores        = dict(stream.scores)
+            self._total_time    = stream.total_time
 
-        self._result = np.array([self.__play_onetime() for i in range(self._ntimes)])
+            for first in range(stream.count,ntimes,stream.chunk_size):
+                self.__play_chunk(first,min(stream.chunk_size,ntimes - first),runner)
+                stream.append(self._result,self._times)
+                stream.checkpoint()
 
         # Registra no arquivo de log a estatitisca das partidas
         self._register.end_game(self,True)
 
+    def __play_chunk(self,first,ntimes,runner):
+        '''
+        Realiza as partidas first+1 ... first+ntimes no processo corrente ou pelo runner
+        '''
+
+        if runner is None:
+            self.play_games(first,ntimes,self._ntimes)
+        else:
+            self.merge(runner.run(self,ntimes,first))
+
+    def play_games(self,first,ntimes,total=None):
+        '''
+        Realiza as partidas first+1 ... first+ntimes de um total de partidas (usado diretamente por cada processo do runner)
+        '''
+
+        self._ntimes = total if total is not None else first + ntimes
+        self._count  = first
+        self._times  = []
+
+        self._result = np.array([self.__play_onetime() for i in range(ntimes)])
+
+        self.__add_scores(self._result)
+
+    def merge(self,parts):
+        '''
+        Junta os resultados compactos das partes na ordem das partidas
+        Cada parte é um dict com result, times e o board/tempo da ultima partida
+        '''
+
+        parts = sorted(parts,key=lambda part: part["first"])
+        last  = parts[-1]
+
+        self._result        = np.concatenate([part["result"] for part in parts])
+        self._times         = [t for part in parts for t in part["times"]]
+        self._total_time   += sum(self._times)
+        self._count         = last["first"] + len(last["result"])
+
+        self.__add_scores(self._result)
+
+        # Board e tempo da ultima partida para o resumo final
+        self._board             = last["board"]
+        self._game_start_time   = 0
+        self._game_end_time     = last["game_time"]
+
+    def __add_scores(self,result):
+        '''
+        Soma os resultados de um bloco de partidas aos contadores
+        '''
+
+        for value,n in zip(*np.unique(result,return_counts=True)):
+            self._scores[int(value)] = self._scores.get(int(value),0) + int(n)
 
     def __play_onetime(self):
         """
@@ -279,6 +475,9 @@ class Game(object):
         self._game_start_time = time.time()
 
         winner = 0
+
+        # Celulas vazias: cada turno ocupa uma celula (pela estrategia ou pela sequencia)
+        empty  = len(self.empty_cells())
  
         # loop de uma partida
         while winner == NO_WINNER:
@@ -300,7 +499,9 @@ class Game(object):
 
                     self._register.end_strategy(self,player.strategy,player,(pos,score))
 
-                winner = self.winner
+                empty -= 1
+
+                winner = self.evaluate_move(self._board,pos,empty)
 
                 if winner != 0:
                     break
@@ -312,6 +513,7 @@ class Game(object):
 
         # Tempo final de processamento acumulado
         self._total_time += self.game_time
+        self._times.append(self.game_time)
 
         self._register.end_game(self)
 
@@ -326,11 +528,25 @@ class Game(object):
         if position is None:
             input(" OPSSSSSSSSSSSSSSSSSSSSSSSSSSSSS - Deu ruim")
 
+        if isinstance(board,BitBoard):
+            return position is not None and board.place(position,player.id)
+
         if position is not None and board[position] == EMPTY_CELL:
             board[position] = player.id
             return True
         return False
 
+    @staticmethod
+    def undo(board,position):
+        """
+        Desfaz uma jogada
+        """
+
+        if isinstance(board,BitBoard):
+            board.undo(position)
+        else:
+            board[position] = EMPTY_CELL
+
     @staticmethod
     def place_by_seq(board,player):
         """
@@ -373,21 +589,55 @@ class Game(object):
         Plot o gráfico e cria um pdfcom as estaticas dos resultados
         """
 
-        plt.hist(self._result, bins = np.linspace(-1, 3, 16) )
-        plt.show()
+        # Importado somente aqui: o matplotlib dobra o tempo de inicio do ttt.py
+        import matplotlib.pyplot as plt
+
+        # Histograma a partir dos contadores: não precisa do resultado de todas as partidas
+        plt.hist(list(self._scores.keys()), bins = np.linspace(-1, 3, 16), weights = list(self._scores.values()) )
         plt.savefig("result.pdf")
+        plt.show()
+
+    def histogram(self):
+        """
+        Linhas (resultado,partidas,percentual) do histograma: empate (-1) e cada jogador
+        """
+
+        results = [-1] + [player.id for player in self._players] if self._players is not None else sorted(self._scores)
+
+        return [(result,) + self.score_player(result) for result in results]
+
+    def print_statistic(self,width=HISTOGRAM_WIDTH):
+        """
+        Histograma dos resultados em texto (sem o matplotlib e sem bloquear, para execuções em lote)
+        """
+
+        for result,x,percent in self.histogram():
+            label = "Draw" if result == -1 else "P{}".format(result)
+            print("{:<5} {:>10} {:>6.2f} % {}".format(label,x,percent,"#" * int(round(percent * width / 100))))
+
+    def save_statistic(self,file_name):
+        """
+        Grava o histograma dos resultados em CSV (result,games,percent)
+        """
+
+        with open(file_name,"w") as f:
+            f.write("result,games,percent\n")
+            for result,x,percent in self.histogram():
+                f.write("{},{},{:.4f}\n".format(result,x,percent))
 
     def score_player(self,player):
-        x = len(self._result[np.where(self._result==player)])
-        return (x,float(x*100/len(self._result)))
+        x     = self._scores.get(player,0)
+        total = sum(self._scores.values())
+        return (x,float(x*100/total) if total > 0 else 0.0)
 
 
-def create_game(shape,verbose):
+def create_game(shape,verbose,engine=ENGINE_NUMPY,trace=True,trace_suffix="",seed=None,win_length=None,
+                trace_queue=QUEUE_SIZE,trace_policy=POLICY_BLOCK,trace_format=TRACE_TEXT):
     """
     Cria o jogo (tabuleiro + jogadores)
     """
 
     # Cria o tabuleiro e inciailiza
-    game = Game(shape,verbose)
+    game = Game(shape,verbose,engine,trace,trace_suffix,seed,win_length,trace_queue,trace_policy,trace_format)
 
     return game
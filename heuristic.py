@@ -0,0 +1,142 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bitboard import BitBoard
+
+# Peso de uma linha aberta (sem peças do oponente) com m peças: LINE_BASE ** (m - 1)
+LINE_BASE       = 4
+
+# Ameaças (linhas abertas que faltam uma peça): peso de cada uma e do jogador da vez (vence na proxima jogada)
+THREAT_WEIGHT   = 8
+TO_MOVE_THREAT  = 64
+
+# Peso do controle do centro (soma dos pesos das celulas ocupadas, 1 no centro e 0 nos cantos)
+CENTER_WEIGHT   = 1
+
+# Escala da saturação do score: score = limit * raw / (|raw| + HEURISTIC_SCALE)
+HEURISTIC_SCALE = 32
+
+# Resolução do score: multiplos inteiros de HEURISTIC_STEP (potencia de 2, exata em ponto flutuante).
+# Scores discretos mantêm a janela nula do PVS (alpha,alpha + HEURISTIC_STEP) sem valores entre os limites
+HEURISTIC_STEP  = 1 / 64
+
+# Profundidade maxima da busca com a heuristica quando a opção depth não é informada
+HEURISTIC_DEPTH = 4
+
+
+class HeuristicEvaluator(object):
+    """
+    Avaliação heuristica de tabuleiros m x n com k em sequencia para as folhas do limite de profundidade da busca.
+    Os indices de todas as janelas de k celulas (linhas, colunas e as duas diagonais) são montados uma unica vez
+    com sliding_window_view sobre a grade dos indices; cada avaliação conta as peças de todas as janelas com um unico
+    acesso ao board. O score pontua as linhas abertas, as ameaças e o controle do centro e fica sempre
+    entre -limit e limit (abaixo do score de vitoria da busca), arredondado para multiplos de HEURISTIC_STEP
+    """
+
+    def __init__(self,shape,win_length,limit):
+
+        self._shape         = tuple(shape)
+        self._win_length    = win_length
+        self._limit         = limit
+        self._weights       = np.array([0] + [LINE_BASE ** (m - 1) for m in range(1,win_length + 1)],dtype=np.int64)
+        self._windows       = self.__windows()
+        # Bits das celulas para ler as mascaras do BitBoard sem to_array (até 64 celulas)
+        self._bits          = np.arange(self._shape[0] * self._shape[1],dtype=np.uint64)
+
+        # Peso de cada celula: 1 no centro diminuindo com a distancia até 0 na celula mais distante
+        (rows,cols)         = np.indices(self._shape)
+        distance            = np.hypot(rows - (self._shape[0] - 1) / 2,cols - (self._shape[1] - 1) / 2)
+        center              = 1 - distance / distance.max() if distance.max() > 0 else np.ones(self._shape)
+        self._center        = center.ravel()
+
+    @property
+    def shape(self):
+        """
+        Formato do tabuleiro avaliado
+        """
+        return self._shape
+
+    @property
+    def win_length(self):
+        """
+        Celulas em sequencia para vencer
+        """
+        return self._win_length
+
+    @property
+    def windows(self):
+        """
+        Indices (janelas,k) das celulas (row * cols + col) de cada janela
+        """
+        return self._windows
+
+    def __windows(self):
+        """
+        Janelas horizontais, verticais e diagonais de k celulas: sliding_window_view da grade dos indices
+        """
+
+        k       = self._win_length
+        (r,c)   = self._shape
+        grid    = np.arange(r * c).reshape(self._shape)
+        index   = np.arange(k)
+        parts   = []
+
+        if c >= k:
+            parts.append(sliding_window_view(grid,k,axis=1).reshape(-1,k))
+
+        if r >= k:
+            parts.append(sliding_window_view(grid,k,axis=0).reshape(-1,k))
+
+        if r >= k and c >= k:
+            squares = sliding_window_view(grid,(k,k))
+            parts.append(squares[...,index,index].reshape(-1,k))
+            parts.append(squares[...,index,index[::-1]].reshape(-1,k))
+
+        return np.concatenate(parts).astype(np.intp) if parts else np.zeros((0,k),dtype=np.intp)
+
+    def __cells(self,board):
+        """
+        Celulas do board em um array linear (row * cols + col)
+        """
+
+        if not isinstance(board,BitBoard):
+            return board.ravel()
+
+        if len(self._bits) > 64:
+            return board.to_array().ravel()
+
+        cells = np.zeros(len(self._bits),dtype=int)
+
+        for player_id,mask in board.masks.items():
+            cells[(np.uint64(mask) >> self._bits) & np.uint64(1) == 1] = player_id
+
+        return cells
+
+    def score(self,board,player_id,opponent_id,to_move_id):
+        """
+        Score do board (NumPy ou BitBoard) do ponto de vista de player_id; to_move_id é o jogador da vez
+        """
+
+        cells           = self.__cells(board)
+        windows         = cells[self._windows]
+        mine            = np.count_nonzero(windows == player_id,axis=1)
+        theirs          = np.count_nonzero(windows == opponent_id,axis=1)
+
+        # Linhas abertas: janelas sem nenhuma peça do oponente
+        open_mine       = theirs == 0
+        open_theirs     = mine == 0
+        raw             = float(self._weights[mine[open_mine]].sum() - self._weights[theirs[open_theirs]].sum())
+
+        threats_mine    = int(np.count_nonzero(open_mine & (mine == self._win_length - 1)))
+        threats_theirs  = int(np.count_nonzero(open_theirs & (theirs == self._win_length - 1)))
+        raw            += THREAT_WEIGHT * (threats_mine - threats_theirs)
+
+        # Ameaça do jogador da vez: vence na proxima jogada
+        if to_move_id == player_id and threats_mine > 0:
+            raw += TO_MOVE_THREAT
+        elif to_move_id == opponent_id and threats_theirs > 0:
+            raw -= TO_MOVE_THREAT
+
+        raw            += CENTER_WEIGHT * float(self._center @ ((cells == player_id).astype(float) - (cells == opponent_id)))
+
+        return round(self._limit * raw / (abs(raw) + HEURISTIC_SCALE) / HEURISTIC_STEP) * HEURISTIC_STEP
@@ -0,0 +1,175 @@
+import csv
+import json
+import time
+import numpy as np
+from collections import namedtuple
+
+# Metricas de uma jogada: partida, numero da jogada no tabuleiro, jogador, estrategia, nós, folhas, profundidade maxima,
+# fator de ramificação efetivo, taxa de cortes do alpha beta, taxa de acerto da tabela (None sem tabela) e tempo (s)
+MoveMetrics     = namedtuple("MoveMetrics",("game","move","player","strategy","nodes","leaves","max_depth","branching",
+                                            "cutoff_rate","hit_rate","time"))
+
+# Percentis da latencia das jogadas
+PERCENTILES     = (50,95,99)
+
+# Formatos do arquivo exportado (pela extensão)
+METRICS_JSON    = ".json"
+METRICS_CSV     = ".csv"
+
+
+class SearchMetrics(object):
+    """
+    Metricas de cada jogada de uma estrategia. begin/end envolvem a chamada de move()
+    e leem os contadores da estrategia (count, leaves, max_depth, cutoffs, expanded) e da tabela de transposição
+    """
+
+    def __init__(self):
+
+        self._moves     = []
+        self._start     = 0
+        self._table     = (0,0)
+
+    @property
+    def moves(self):
+        """
+        Lista das metricas (MoveMetrics) de todas as jogadas
+        """
+        return self._moves
+
+    def begin(self,strategy):
+        """
+        Inicio da jogada
+        """
+
+        table       = strategy.table
+        self._table = (table.hits,table.misses) if table is not None else (0,0)
+        self._start = time.perf_counter()
+
+    def end(self,strategy,game,move):
+        """
+        Fim da jogada: registra as metricas
+        """
+
+        elapsed     = time.perf_counter() - self._start
+        nodes       = strategy.count
+        depth       = strategy.max_depth
+        table       = strategy.table
+        hit_rate    = None
+
+        if table is not None:
+            hits    = table.hits - self._table[0]
+            total   = hits + table.misses - self._table[1]
+            hit_rate= hits / total if total > 0 else 0.0
+
+        self._moves.append(MoveMetrics(
+            game,move,strategy.player.id,strategy.name,nodes,strategy.leaves,depth,
+            # Fator de ramificação efetivo: nodes = b ** depth
+            nodes ** (1 / depth) if depth > 0 and nodes > 0 else 0.0,
+            strategy.cutoffs / strategy.expanded if strategy.expanded > 0 else 0.0,
+            hit_rate,elapsed))
+
+    def extend(self,moves):
+        """
+        Junta as metricas de outro processo (ex: uma parte do runner.ProcessRunner)
+        """
+
+        self._moves.extend(MoveMetrics(*move) for move in moves)
+
+
+def summarize(moves):
+    """
+    Resumo de um conjunto de jogadas: quantidade, medias e percentis da latencia (ms)
+    """
+
+    if len(moves) == 0:
+        return {"moves": 0}
+
+    times       = np.array([move.time for move in moves]) * 1000
+    nodes       = np.array([move.nodes for move in moves])
+    hit_rates   = [move.hit_rate for move in moves if move.hit_rate is not None]
+    summary     = {
+        "moves"         : len(moves),
+        "nodes"         : int(nodes.sum()),
+        "nodes_mean"    : float(nodes.mean()),
+        "nodes_per_s"   : float(nodes.sum() / times.sum() * 1000) if times.sum() > 0 else 0.0,
+        "leaves_mean"   : float(np.mean([move.leaves for move in moves])),
+        "max_depth"     : int(max(move.max_depth for move in moves)),
+        "branching_mean": float(np.mean([move.branching for move in moves])),
+        "cutoff_rate"   : float(np.mean([move.cutoff_rate for move in moves])),
+        "hit_rate"      : float(np.mean(hit_rates)) if hit_rates else None,
+        "time_mean_ms"  : float(times.mean()),
+        "time_max_ms"   : float(times.max()),
+    }
+
+    for p,value in zip(PERCENTILES,np.percentile(times,PERCENTILES)):
+        summary["time_p{}_ms".format(p)] = float(value)
+
+    return summary
+
+
+def group_moves(moves,key):
+    """
+    Agrupa as jogadas por key(move) mantendo a ordem da primeira ocorrencia
+    """
+
+    groups = {}
+
+    for move in moves:
+        groups.setdefault(key(move),[]).append(move)
+
+    return groups
+
+
+def run_metrics(players):
+    """
+    Metricas da execução: resumo por jogador e por partida (jogador,partida)
+    """
+
+    run     = {}
+    games   = []
+
+    for player in players:
+
+        moves = player.strategy.metrics.moves
+
+        run["P{}".format(player.id)] = dict(strategy=player.strategy.name,**summarize(moves))
+
+        for number,game_moves in group_moves(moves,lambda move: move.game).items():
+            games.append(dict(game=number,player=player.id,**summarize(game_moves)))
+
+    games.sort(key=lambda game: (game["game"],game["player"]))
+
+    return {"run": run,"games": games}
+
+
+def save_metrics(file_name,players):
+    """
+    Exporta as metricas: JSON (resumo da execução, por partida e todas as jogadas) ou CSV (uma linha por jogada)
+    """
+
+    moves = sorted((move for player in players for move in player.strategy.metrics.moves),key=lambda move: (move.game,move.move))
+
+    if file_name.endswith(METRICS_CSV):
+        with open(file_name,"w",newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(MoveMetrics._fields)
+            writer.writerows(moves)
+        return
+
+    with open(file_name,"w") as f:
+        json.dump(dict(run_metrics(players),moves=[move._asdict() for move in moves]),f,separators=(",",":"))
+
+
+def print_metrics(players):
+    """
+    Resumo das metricas de cada jogador no terminal
+    """
+
+    for name,summary in run_metrics(players)["run"].items():
+
+        if summary["moves"] == 0:
+            continue
+
+        print("{} {:<10} moves: {} nodes/move: {:.0f} depth: {} ebf: {:.2f} cutoffs: {:.1f} % latency ms p50: {:.2f} p95: {:.2f} p99: {:.2f}".format(
+            name,summary["strategy"],summary["moves"],summary["nodes_mean"],summary["max_depth"],summary["branching_mean"],
+            summary["cutoff_rate"] * 100,summary["time_p50_ms"],summary["time_p95_ms"],summary["time_p99_ms"]))
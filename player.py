@@ -14,10 +14,10 @@ class Player(object):
         Retorna  a movimentação que devera ser feita baseado na estratégia
         '''
 
-        return self.strategy.move()
+        return self.strategy.search()
 
 
-def create_players(game,players,sequences,verbose):
+def create_players(game,players,sequences,verbose,**options):
     """
     Cria um jogador com sua respectiva estrategia com os parametros passado via CL
     """
@@ -27,7 +27,7 @@ def create_players(game,players,sequences,verbose):
         index,strategy_name,mark    = player
         player                      = Player(index,mark)
         # estrategia em função da opção --sequence via CL
-        player.strategy             = create_strategy(strategy_name,game,player,verbose)
+        player.strategy             = create_strategy(strategy_name,game,player,verbose,**options)
         # adiciona na lista de retorno
         l.append(player)
 
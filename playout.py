@@ -0,0 +1,100 @@
+import time
+import numpy as np
+
+from bitboard import win_lines, cell_lines
+
+EMPTY_CELL      = 0
+NO_WINNER       = 0
+
+# Quantidade de partidas simuladas juntas em cada lote
+BATCH_SIZE      = 4096
+
+
+class BatchPlayout(object):
+    """
+    Partidas aleatorias (random x random) simuladas em lote: um array (lote,celulas) com uma partida por linha.
+    A cada turno a jogada de todas as partidas em andamento é sorteada, aplicada e verificada com operações do NumPy
+    """
+
+    def __init__(self,shape,players_id,win_length,seed=None):
+
+        self._shape         = tuple(shape)
+        self._size          = self._shape[0] * self._shape[1]
+        self._players_id    = list(players_id)
+        self._rng           = np.random.default_rng(seed)
+
+        lines               = win_lines(self._shape,win_length)
+        cols                = self._shape[1]
+        by_cell             = cell_lines(self._shape,lines)
+        width               = max(1,max(len(indexes) for indexes in by_cell))
+
+        # Linhas que passam por cada celula (celula,linhas,k) completadas com a coluna sentinela (sempre vazia)
+        self._cell_lines    = np.full((self._size,width,win_length),self._size,dtype=np.intp)
+
+        for index,indexes in enumerate(by_cell):
+            for i,line in enumerate(indexes):
+                self._cell_lines[index,i] = [r * cols + c for r,c in lines[line]]
+
+    @property
+    def shape(self):
+        """
+        Formato do tabuleiro das partidas
+        """
+        return self._shape
+
+    def play(self,ntimes):
+        """
+        Simula N partidas. Retorna (resultados,tabuleiro da ultima partida): o resultado é o id do ganhador ou -1 no empate
+        """
+
+        boards      = np.zeros((ntimes,self._size + 1),dtype=np.int8)
+        result      = np.zeros(ntimes,dtype=np.int8)
+        active      = np.arange(ntimes)
+
+        for turn in range(self._size):
+
+            if len(active) == 0:
+                break
+
+            player_id   = self._players_id[turn % len(self._players_id)]
+            cells       = boards[active,:self._size]
+
+            # Sorteio uniforme entre as celulas vazias: a maior chave aleatoria de cada partida
+            keys        = self._rng.random(cells.shape)
+            keys[cells != EMPTY_CELL] = -1
+            moves       = keys.argmax(axis=1)
+
+            boards[active,moves] = player_id
+
+            # Somente as linhas que passam pela jogada de cada partida
+            lines       = boards[active[:,None,None],self._cell_lines[moves]]
+            wins        = np.all(lines == player_id,axis=2).any(axis=1)
+
+            result[active[wins]] = player_id
+            active      = active[~wins]
+
+        # As que ainda estão em andamento com o tabuleiro cheio terminaram empatadas
+        result[active] = -1
+
+        return result,boards[-1,:self._size].reshape(self._shape).astype(int)
+
+
+def play_batch(shape,players_id,win_length,ntimes,seed=None,batch_size=BATCH_SIZE):
+    """
+    Simula N partidas em lotes de batch_size. Retorna (resultados,tempo de cada lote,tabuleiro da ultima partida)
+    """
+
+    playout = BatchPlayout(shape,players_id,win_length,seed)
+    results = []
+    times   = []
+    board   = None
+
+    for first in range(0,ntimes,batch_size):
+
+        start           = time.time()
+        (result,board)  = playout.play(min(batch_size,ntimes - first))
+
+        results.append(result)
+        times.append(time.time() - start)
+
+    return (np.concatenate(results) if len(results) > 0 else np.zeros(0,dtype=np.int8)),times,board
@@ -1,4 +1,13 @@
+import os
+import queue
+import shutil
+import struct
+import threading
 import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+from bitboard import BitBoard
 
 # Quantidade espaços que representa um tab
 SIZE_TAB = 6
@@ -12,21 +21,372 @@ SIZE_COL = 20
 # Padrão da coluna separador + quantidade espaços
 COL = "┆".ljust(SIZE_COL)
 
+# Quantidade de boards renderizados mantidos no cache (LRU)
+RENDER_CACHE    = 4096
+
+# Fila do gravador do trace: capacidade, registros gravados de uma vez e a politica com a fila cheia
+QUEUE_SIZE      = 10000
+BATCH_SIZE      = 256
+POLICY_BLOCK    = 'block'
+POLICY_DROP     = 'drop'
+
+# Formato dos arquivos de trace
+TRACE_TEXT      = 'text'
+TRACE_BINARY    = 'binary'
+
+
+# Trace binario: cada registro é o cabeçalho fixo RECORD seguido do board empacotado (2 bits por celula)
+# e, somente nos eventos de texto, do texto em UTF-8 (o tamanho vai no campo count)
+# Campos: evento, profundidade (tabs no texto), jogador, linha, coluna, ganhador, score, contador de nós
+RECORD          = struct.Struct("<BhbbbbfI")
+
+EVENT_SHAPE     = 0     # formato do board (linha,coluna) - inicio de cada arquivo
+EVENT_PLAYER    = 1     # jogador (id) e a marca (count = codigo do caractere)
+EVENT_HEADER    = 2     # cabeçalho do treeview com a profundidade maxima
+EVENT_NODE      = 3     # RegisterStrategy.node
+EVENT_RESULT    = 4     # RegisterStrategy.result
+EVENT_LOOP      = 5     # RegisterGame.loop_strategy
+EVENT_TEXT      = 6     # RegisterGame._board com o resumo
+
+# Maior id de jogador que cabe nos 2 bits de cada celula do board empacotado
+MAX_PLAYER_ID   = 3
+
+# Jogador lido do trace binario (mesmos atributos usados por board_out)
+TracePlayer     = namedtuple("TracePlayer",["id","mark"])
+
+
+def pack_board(board):
+    """
+    Empacota o board em um inteiro com 2 bits por celula (valor = id do jogador, no maximo MAX_PLAYER_ID)
+    """
+
+    packed = 0
+
+    if isinstance(board,BitBoard):
+        for player_id,mask in board.masks.items():
+            if mask and not 0 < player_id <= MAX_PLAYER_ID:
+                raise ValueError("Player id {} does not fit in the packed board (1..{})".format(player_id,MAX_PLAYER_ID))
+            while mask:
+                low     = mask & -mask
+                packed |= player_id << (2 * (low.bit_length() - 1))
+                mask   ^= low
+    else:
+        for index,value in enumerate(board.ravel().tolist()):
+            if value:
+                if not 0 < value <= MAX_PLAYER_ID:
+                    raise ValueError("Player id {} does not fit in the packed board (1..{})".format(value,MAX_PLAYER_ID))
+                packed |= value << (2 * index)
+
+    return packed
+
+
+def unpack_board(packed,shape):
+    """
+    Board NumPy a partir do inteiro empacotado por pack_board
+    """
+
+    size = shape[0] * shape[1]
+
+    return np.array([(packed >> (2 * index)) & 3 for index in range(size)],dtype=int).reshape(shape)
+
+
+@lru_cache(maxsize=None)
+def frame_template(shape,tabs):
+    """
+    Template (str.format) do board_out para o formato e a tabulação: campos 0..n-1 são as celulas
+    e os seguintes as linhas do resumo. Retorna (template,quantidade de linhas do resumo)
+    """
+
+    (rows,cols) = shape
+    size        = rows * cols
+    tab1        = " " * tabs * SIZE_TAB
+    y           = cols - 1
+    text        = size
+
+    # Linha superior do quadro
+    parts       = [tab1,"╔","═════╦" * y,"═════╗","{%d}\n" % text]
+    text       += 1
+
+    for row in range(rows):
+
+        # Linhas de divisao entre as celulas
+        if row > 0:
+            parts.extend([tab1,"╠","═════╬" * y,"═════╣","{%d}\n" % text])
+            text += 1
+
+        # Todas as celulas da linha
+        parts.extend([tab1,"║"] + ["{%d:^5}║" % (row * cols + col) for col in range(cols)] + ["{%d}\n" % text])
+        text += 1
+
+    # Linha inferior do quadro
+    parts.extend([tab1,"╚","═════╩" * y,"═════╝","{%d}" % text])
+
+    return "".join(parts),text - size + 1
+
+
+@lru_cache(maxsize=None)
+def simple_template(shape,size,deph):
+    """
+    Template (str.format) do board_out_simple para o formato e a coluna (profundidade) do treeview
+    """
+
+    (rows,cols) = shape
+    tab1        = COL * (size - deph)
+    tab2        = COL * deph
+
+    # Complemento em espcos para justificar a esquerda a tabela
+    s           = "".center(SIZE_COL - 1 - (cols * 3)," ")
+
+    return "\n".join("".join([tab1,"┆"] + ["{%d:^1}  " % (row * cols + col) for col in range(cols)] + [s,tab2])
+                     for row in range(rows))
+
+
+@lru_cache(maxsize=RENDER_CACHE)
+def board_cells(shape,packed,marks):
+    """
+    Marca de cada celula do board empacotado (pack_board). marks é ((id,marca),...) dos jogadores
+    """
+
+    marks = dict(marks)
+
+    return tuple(marks.get((packed >> (2 * index)) & 3,"-") for index in range(shape[0] * shape[1]))
+
+
+def board_marks(board,marks):
+    """
+    Marca de cada celula do board (NumPy ou BitBoard) sem o cache: aceita qualquer id de jogador
+    """
+
+    if isinstance(board,BitBoard):
+        board = board.to_array()
+
+    marks = dict(marks)
+
+    return tuple(marks.get(value,"-") for value in board.ravel().tolist())
+
+
+@lru_cache(maxsize=RENDER_CACHE)
+def render_simple(shape,size,deph,cells):
+    """
+    board_out_simple renderizado (cache dos boards repetidos da arvore de busca)
+    """
+
+    return simple_template(shape,size,deph).format(*cells)
+
+
+class TraceWriter(object):
+    """
+    Gravador do trace em uma thread separada. Cada registro é (formatador,argumentos): o texto é montado
+    e gravado em lotes pela thread, assim a busca não espera a formatação nem o disco.
+    Com a fila cheia a politica block espera uma vaga e a drop descarta o registro (contador dropped)
+    """
+
+    def __init__(self,file,queue_size=QUEUE_SIZE,policy=POLICY_BLOCK,binary=False):
+
+        self._file      = file
+        self._empty     = b"" if binary else ""
+        self._policy    = policy
+        self._queue     = queue.Queue(queue_size)
+        self._dropped   = 0
+        self._error     = None
+        self._thread    = threading.Thread(target=self.__run,daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        """
+        Quantidade de registros descartados com a fila cheia (politica drop)
+        """
+        return self._dropped
+
+    @property
+    def policy(self):
+        """
+        Politica com a fila cheia (block ou drop)
+        """
+        return self._policy
+
+    def put(self,format,*args):
+        """
+        Enfileira um registro. format(*args) retorna o texto (None = args[0] já é o texto)
+        """
+
+        if self._policy == POLICY_BLOCK:
+            self._queue.put((format,args))
+        else:
+            try:
+                self._queue.put_nowait((format,args))
+            except queue.Full:
+                self._dropped += 1
+
+    def flush(self):
+        """
+        Espera a gravação de todos os registros enfileirados
+        """
+
+        self._queue.join()
+        self._file.flush()
+
+    def close(self):
+        """
+        Grava os registros pendentes e finaliza a thread
+        """
+
+        self._queue.put(None)
+        self._thread.join()
+
+        # Erro de formatação na thread: reportado para quem finaliza o registro
+        if self._error is not None:
+            raise self._error
+
+    def __run(self):
+
+        while True:
+
+            records = [self._queue.get()]
+
+            # Junta no lote o que já estiver na fila
+            while len(records) < BATCH_SIZE and records[-1] is not None:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop  = records[-1] is None
+
+            try:
+                texts = []
+                # Somente o registro com erro é descartado; o primeiro erro é reportado pelo close
+                for format,args in records[:-1 if stop else None]:
+                    try:
+                        texts.append(args[0] if format is None else format(*args))
+                    except Exception as error:
+                        self._error = self._error or error
+                self._file.write(self._empty.join(texts))
+            except Exception as error:
+                self._error = self._error or error
+            finally:
+                for record in records:
+                    self._queue.task_done()
+
+            if stop:
+                break
+
 
 class Register(object):
 
-    def __init__(self,file_name,verbose = False):
+    def __init__(self,file_name,verbose = False,queue_size = QUEUE_SIZE,policy = POLICY_BLOCK,binary = False):
+        """
+        file_name None desativa o registro (nenhum arquivo é criado).
+        Os registros são gravados pelo TraceWriter (queue_size e policy da fila).
+        binary grava registros RECORD sem formatação (convertidos depois por render)
+        """
 
         self._verbose = verbose
-        self._file  = open(file_name,"w")
+        self._binary = binary
+        self._shape  = None
+        self._file  = open(file_name,"wb" if binary else "w") if file_name is not None else None
+        self._writer = TraceWriter(self._file,queue_size,policy,binary) if self._file is not None else None
+
+
+    @property
+    def enabled(self):
+        """
+        Indica se o registro esta sendo gravado em arquivo
+        """
+        return self._file is not None
+
+
+    @property
+    def dropped(self):
+        """
+        Registros descartados pelo gravador com a fila cheia
+        """
+        return self._writer.dropped if self._writer is not None else 0
+
+
+    def _write(self,format,*args):
+        """
+        Enfileira o registro no gravador: format(*args) é executado na thread do gravador
+        """
+
+        if self._writer is not None:
+            self._writer.put(format,*args)
+
+
+    def _record(self,event,players,board=None,deph=0,player_id=0,pos=None,winner=0,score=0,count=0,text=None):
+        """
+        Enfileira um registro binario. O board é empacotado aqui (copia de poucos bytes) e não há formatação
+        """
+
+        if self._shape is None:
+            # Inicio do arquivo: formato do board e os jogadores para o render
+            self._shape = tuple(board.shape)
+            self._write(None,RECORD.pack(EVENT_SHAPE,0,0,self._shape[0],self._shape[1],0,0,0))
+            for p in players:
+                if not 0 < p.id <= MAX_PLAYER_ID or len(p.mark) != 1:
+                    raise ValueError("Binary trace needs player ids 1..{} and single character marks (player {} mark {!r})".format(
+                        MAX_PLAYER_ID,p.id,p.mark))
+                self._write(None,RECORD.pack(EVENT_PLAYER,0,p.id,0,0,0,0,ord(p.mark)))
+
+        (row,col) = (-1,-1) if pos is None else (int(pos[0]),int(pos[1]))
+        data      = text.encode("utf-8") if text is not None else b""
+
+        record    = RECORD.pack(event,deph,player_id,row,col,winner,score,len(data) if text is not None else count)
+
+        if board is not None:
+            record += pack_board(board).to_bytes((2 * self._shape[0] * self._shape[1] + 7) // 8,"little")
+
+        self._write(None,record + data)
+
+
+    @staticmethod
+    def copy_board(board):
+        """
+        Copia do board para o registro (o board da busca continua sendo alterado)
+        """
+
+        if isinstance(board,BitBoard):
+            return board.copy()
+
+        return np.copy(board)
+
+
+    def flush(self):
+        """
+        Espera a gravação dos registros pendentes
+        """
+
+        if self._writer is not None:
+            self._writer.flush()
+
+
+    def append(self,file_name):
+        """
+        Copia no final do arquivo o conteudo de outro arquivo de trace e o remove (trace de cada processo)
+        """
+
+        if self._file is not None:
+            self.flush()
+            with open(file_name,"rb" if self._binary else "r") as f:
+                shutil.copyfileobj(f,self._file)
+
+        os.remove(file_name)
 
 
     def close(self):
         """
-        Fecha o arquivos
+        Grava os registros pendentes e fecha o arquivo
         """
 
-        self._file.close()
+        # O arquivo é fechado (e os registros já gravados ficam no disco) mesmo com o erro do gravador
+        try:
+            if self._writer is not None:
+                (writer,self._writer) = (self._writer,None)
+                writer.close()
+        finally:
+            if self._file is not None:
+                self._file.close()
 
 
     def start_game_resume(self,game):
@@ -49,7 +409,7 @@ class Register(object):
 
     def end_game_resume(self,game):
 
-        if game.result is not None:
+        if game.scores:
             p1      = game.score_player(1)
             p2      = game.score_player(2)
             rest    = game.score_player(-1)
@@ -65,6 +425,8 @@ class Register(object):
     "".join(["║","P2:   {} / {:>3.0f} % strategy: {}"    .format(p2[0],p2[1],str(game.players[1].strategy.name)).ljust(SIZE_BOX)              ,"║"]),
     "".join(["║","Draw: {} / {:>3.0f} %"                 .format(rest[0],rest[1]).ljust(SIZE_BOX)                                             ,"║"]),
     "".join(["║","Shape:{} Result: {} total time: {:.2f}".format(str(game.shape) , game.winner , game.total_time).ljust(SIZE_BOX)             ,"║"]),
+    *self.table_resume(game.players),
+    *self.dropped_resume(game.players),
     "".join(["╚",                                         (SIZE_BOX) * "═"                                                                    ,"╝"]),
 
         )) + "\n"
@@ -72,6 +434,40 @@ class Register(object):
         return resumo
 
 
+    def table_resume(self,players):
+        """
+        Linhas com os acertos/falhas da tabela de transposição e do livro de aberturas de cada jogador
+        """
+
+        lines = []
+        books = []
+
+        for p in players:
+            table = p.strategy.table
+            if table is not None:
+                lines.append("".join(["║","P{} TT: hits: {} misses: {} hit rate: {:.1f} % entries: {}/{}".format(
+                    p.id,table.hits,table.misses,table.hit_rate,table.entries,table.slots).ljust(SIZE_BOX),"║"]))
+            book = p.strategy.book
+            if book is not None and not any(book is b for b in books):
+                # O livro pode ser compartilhado pelos jogadores
+                books.append(book)
+                lines.append("".join(["║","P{} Book: hits: {} misses: {} positions: {} plies: {}".format(
+                    p.id,book.hits,book.misses,len(book),book.plies).ljust(SIZE_BOX),"║"]))
+
+        return lines
+
+    def dropped_resume(self,players):
+        """
+        Linha com os registros do trace descartados com a fila cheia (politica drop)
+        """
+
+        dropped = [("game",self.dropped)] + [("P{}".format(p.id),p.strategy.register.dropped) for p in players]
+
+        if not any(n for name,n in dropped):
+            return []
+
+        return ["".join(["║","Trace dropped: {}".format(" ".join("{}: {}".format(name,n) for name,n in dropped)).ljust(SIZE_BOX),"║"])]
+
     def board_out(self,board,players = None,resumo = None,tabs = 0):
         """
         Converte um boar em string usando caracteres unicode
@@ -88,51 +484,18 @@ class Register(object):
 
         """
 
-        tab1    = " " * tabs * SIZE_TAB
-        b       = self.board2str(board,players) 
-        
-        if resumo is not None:
-            text  = resumo.split("\n")
-        else:
-            text  = []
+        (template,nlines) = frame_template(tuple(board.shape),tabs)
+
+        text = resumo.split("\n") if resumo is not None else []
 
         # Completa com linhas vazias para evitar index invalido
-        for i in range(20 -len(text)):
-            text.append("")
-
-        lines = [] 
-
-        (x,y) = b.shape
-        x -= 1
-        y -= 1
-
-        # Linha superior do quadro
-        lines.append("".join( [ tab1, "╔" , "═════╦" * y , "═════╗" , text[0], "\n" ] ))
-        i = 1
-
-        for (row,col), value in np.ndenumerate(b):
-
-            # Linhas de divisao entre as celulas
-            if col == 0 and row >0:
-                lines.append("".join( [ tab1 , "╠" , "═════╬" * y , "═════╣" , text[i] ,"\n"]  ))
-                i+=1
-
-            # Todas as celulas da linha
-            lines.append( "".join( [ "".join( [tab1 , "║" ] ) if col == 0 else "",  "{:^5}║".format(value)  ])      )
-            
-            # Nova linha no fim do tabuleiro
-            if (col+1) % (y+1) == 0:
-                lines.append("".join([text[i] , "\n" ]))
-                i+=1
-
-        # Linha inferior do quadro
-        lines.append("".join( [ tab1, "╚" , "═════╩" * y , "═════╝", text[i]  ] ) )
-    
-        return "".join(lines)
+        text.extend([""] * (nlines - len(text)))
+
+        return template.format(*self.cells(board,players),*text[:nlines])
         
     def board_out_simple(self,board,players,col=0):
         """
-        Monta dinamicamente o board com o layout abaixo
+        Monta o board com o layout abaixo a partir do template do formato (simple_template)
 
         "{}┆{:^1} {:^1} {:^1} {}".format(tab1,b[(0,0)],b[(0,1)],b[(0,2)],tab2),
         "{}┆{:^1} {:^1} {:^1} {}".format(tab1,b[(1,0)],b[(1,1)],b[(1,2)],tab2),
@@ -140,118 +503,118 @@ class Register(object):
 
         """
 
-        tab1    = COL * (board.size-col)
-        tab2    = COL * (col)
-        b       = self.board2str(board,players)
-
-        lines = [] 
-
-        (x,y) = b.shape
-        x -=1
-        y -=1
-
-        # Complemento em espcos para justificar a esquerda a tabela 
-        s = "".center(SIZE_COL - 1 -  (b.shape[1] * 3), " ")
-
-
-        for (row,col), value in np.ndenumerate(b):
-
-            if col == 0:
-                lines.append("".join( [tab1 , "┆" ] ))
-
-            lines.append("{:^1}  ".format(value))
-            
-            if (col+1) % (y+1) == 0:
-                lines.append("".join([s ,tab2  ]))
-
-                if row < x:
-                    lines.append("\n")
-
-        return "".join(lines)
+        return render_simple(tuple(board.shape),board.size,col,self.cells(board,players))
 
-    def board2str(self,board,players):
+    def cells(self,board,players):
         """
-        Retorna uma versão do tabuleiro usando texto 
-        Player 1 = X, Player 2 = O,None     = "-"
+        Marca de cada celula (linha a linha) com cache pelo conteudo do board.
+        O cache usa o board empacotado (2 bits por celula): com ids maiores que MAX_PLAYER_ID as marcas são lidas do board
         """
 
-        b = np.empty(board.shape,dtype=str)
+        marks = tuple((p.id,p.mark[:1]) for p in players)
 
-        for p in players:
-            np.place(b,board==p.id , p.mark)
-
-        np.place(b,board==0 , "-")
+        if all(0 < p.id <= MAX_PLAYER_ID for p in players):
+            return board_cells(tuple(board.shape),pack_board(board),marks)
 
-        return b
+        return board_marks(board,marks)
 
 
 class RegisterStrategy(Register):
 
 
-    def __init__(self,deph = 9,file_name="tree.txt",verbose = False):
+    def __init__(self,deph = 9,file_name="tree.txt",verbose = False,queue_size = QUEUE_SIZE,policy = POLICY_BLOCK,binary = False):
 
-        super().__init__(file_name,verbose)
+        super().__init__(file_name,verbose,queue_size,policy,binary)
 
         self.__max_deph = deph
 
 
     def result(self,game,strategy,board,player,deph,winner,score):
         """
-        Adiciona no treeview do arquivo tree.txt o resultado do step
+        Adiciona no treeview do arquivo tree.txt o resultado do step.
+        O board é copiado: o texto é montado depois pela thread do gravador
         """
 
-        tab1    = COL * (self.__max_deph-deph)
+        if self._file is None:
+            return
+
+        if self._binary:
+            self._record(EVENT_RESULT,game.players,board,deph,player.id,None,winner,score,strategy.count)
+            return
+
+        self._write(self._result_text,game.players,Register.copy_board(board),player.id,self.__max_deph,deph,strategy.count,winner,score)
+
+
+    def _result_text(self,players,board,player_id,max_deph,deph,count,winner,score):
+
+        tab1    = COL * (max_deph-deph)
         tab2    = COL * (deph)
 
-        lines = "\n".join((
+        return "\n".join((
 
-    "".join([tab1 , "┆┄{:<2}) N: {:<11}"        .format(deph,strategy.count).ljust(SIZE_COL)   , tab2]),
-    "".join([tab1 , "┆P{:<1} Win:{:<2} {:<8}"   .format(player.id,winner,score).ljust(SIZE_COL)        , tab2]),
-    self.board_out_simple(board,game.players,deph)
+    "".join([tab1 , "┆┄{:<2}) N: {:<11}"        .format(deph,count).ljust(SIZE_COL)                   , tab2]),
+    "".join([tab1 , "┆P{:<1} Win:{:<2} {:<8}"   .format(player_id,winner,score).ljust(SIZE_COL)        , tab2]),
+    self.board_out_simple(board,players,deph)
         
         )) + "\n"
 
-        self._file.write(lines)
-
 
     def node(self,game,strategy,board,player,deph,pos):
 
-        tab1    = COL * (self.__max_deph-deph)
+        if self._file is None:
+            return
+
+        if self._binary:
+            self._record(EVENT_NODE,game.players,board,deph,player.id,pos,count=strategy.count)
+            return
+
+        self._write(self._node_text,game.players,Register.copy_board(board),player.id,self.__max_deph,deph,strategy.count,pos)
+
+
+    def _node_text(self,players,board,player_id,max_deph,deph,count,pos):
+
+        tab1    = COL * (max_deph-deph)
         tab2    = COL * (deph)
 
-        lines = "\n".join((
+        return "\n".join((
 
-    "".join([tab1 , "┆┄{:<2}) N: {:<11}"        .format(deph,strategy.count).ljust(SIZE_COL)           , tab2]),
-    "".join([tab1 , "┆P{:<1} {:<15}"            .format(player.id,str(pos)).ljust(SIZE_COL)            , tab2]),
-    self.board_out_simple(board,game.players,deph)
+    "".join([tab1 , "┆┄{:<2}) N: {:<11}"        .format(deph,count).ljust(SIZE_COL)                   , tab2]),
+    "".join([tab1 , "┆P{:<1} {:<15}"            .format(player_id,str(pos)).ljust(SIZE_COL)            , tab2]),
+    self.board_out_simple(board,players,deph)
 
         )) + "\n"
 
-        self._file.write(lines)
-
 
-    def header_tree(self,deph):
+    def header_tree(self,deph,game=None):
  
         self.__max_deph = deph
 
-        lines = "\n".join((
+        if self._file is None:
+            return
+
+        if self._binary:
+            self._record(EVENT_HEADER,game.players,game.board,deph)
+            return
+
+        self._write(None,self._header_text(deph))
+
+
+    def _header_text(self,max_deph):
 
-    "".join(["{}".format(self.__max_deph-i).ljust(SIZE_COL) for i in range(self.__max_deph+1)]),
-    COL * (self.__max_deph+1)
+        return "\n".join((
+
+    "".join(["{}".format(max_deph-i).ljust(SIZE_COL) for i in range(max_deph+1)]),
+    COL * (max_deph+1)
         
         )) + "\n"
 
-        self._file.write(lines)
-
 
 class RegisterGame(Register):
 
 
-    def __init__(self,file_name="trace.txt",verbose = False):
-
-        super().__init__(file_name,verbose)
+    def __init__(self,file_name="trace.txt",verbose = False,queue_size = QUEUE_SIZE,policy = POLICY_BLOCK,binary = False):
 
-        self._file = open(file_name,"w") 
+        super().__init__(file_name,verbose,queue_size,policy,binary)
 
 
     def begin_strategy(self,game,player):
@@ -259,6 +622,9 @@ class RegisterGame(Register):
         Registra o inicio da estrategia minimax
         """
 
+        if self._file is None:
+            return
+
         resumo = "\n".join((
 
     "Player: {} - Start strategy"       .format(player.id) ,
@@ -281,8 +647,9 @@ class RegisterGame(Register):
         resumo = "\n".join((
 
     "Player: {:d}  - End Strategy" .format(player.id),
-    "Number of loops: {:<10d}"     .format(strategy.count),
-    "Position: {} Score: {:f}"     .format(str(pos),score)
+    "Number of loops: {:<10d} {}"  .format(strategy.count,"workers: {}".format(strategy.counts) if strategy.counts else ""),
+    "Position: {} Score: {:f}"     .format(str(pos),score),
+    "TT hits: {} misses: {}"       .format(strategy.table.hits,strategy.table.misses) if strategy.table is not None else ""
         
         )) + "\n"
         
@@ -294,17 +661,29 @@ class RegisterGame(Register):
         Registra um node do minimax no aruivo trace.txt 
         """
 
-        seq = game.possibilities_cells(board)
+        if self._file is None:
+            return
+
+        if self._binary:
+            self._record(EVENT_LOOP,game.players,board,deph,player.id,pos,count=strategy.count)
+            return
+
+        self._write(self._loop_text,game.possibilities_cells,game.players,Register.copy_board(board),player.id,strategy.count,deph,pos)
+
+
+    def _loop_text(self,possibilities_cells,players,board,player_id,count,deph,pos):
+
+        seq = possibilities_cells(board)
 
         resumo = "\n".join((
 
-    "Player: {:d} - Minimax loop({:d})" .format(player.id,strategy.count),
+    "Player: {:d} - Minimax loop({:d})" .format(player_id,count),
     "Options({:d}): {}"                 .format(len(seq),str(seq)),
     "Deph: {:d} Position: {}"           .format(deph,str(pos))
 
         )) + "\n"
 
-        self._board(board, game.players,resumo,2)
+        return self.board_out(board,players,resumo,2) + "\n"
 
 
     def begin_game(self,game,verbose=False):
@@ -350,12 +729,87 @@ class RegisterGame(Register):
 
     def _board(self,board,players,resumo = None,tabs = 0):
         """
-        Registra um board no arquivo trace.txt
+        Registra um board no arquivo trace.txt.
+        Com verbose o texto é montado e impresso aqui, na thread de quem registra (mantem a ordem das demais saidas
+        do terminal); somente a gravação no arquivo passa pela fila do gravador
         """
 
-        lines = self.board_out(board,players,resumo,tabs) + "\n"
+        if self._file is None:
+            return
 
-        self._file.write(lines)
+        if self._binary:
+            self._record(EVENT_TEXT,players,board,tabs,text=resumo)
+            if self._verbose:
+                print(self._board_text(board,players,resumo,tabs))
+            return
 
         if self._verbose:
+            lines = self._board_text(board,players,resumo,tabs)
             print(lines)
+            self._write(None,lines)
+            return
+
+        self._write(self._board_text,Register.copy_board(board),players,resumo,tabs)
+
+
+    def _board_text(self,board,players,resumo,tabs):
+
+        return self.board_out(board,players,resumo,tabs) + "\n"
+
+
+def render(file_name,output):
+    """
+    Converte um trace binario (registros RECORD) nas mesmas visões do trace texto (board_out / board_out_simple)
+    """
+
+    # Game importa register: import local para evitar o ciclo
+    from game import Game
+
+    strategy    = RegisterStrategy(file_name=None)
+    game        = RegisterGame(file_name=None)
+    shape       = None
+    players     = []
+    max_deph    = 0
+    records     = 0
+
+    with open(file_name,"rb") as f, open(output,"w") as out:
+
+        while True:
+
+            header = f.read(RECORD.size)
+
+            if len(header) < RECORD.size:
+                break
+
+            (event,deph,player_id,row,col,winner,score,count) = RECORD.unpack(header)
+            pos = None if row < 0 else (row,col)
+
+            if event == EVENT_SHAPE:
+                # Inicio de um arquivo (o trace de cada processo é concatenado)
+                shape   = (row,col)
+                players = []
+                continue
+
+            if event == EVENT_PLAYER:
+                players.append(TracePlayer(player_id,chr(count)))
+                continue
+
+            board = unpack_board(int.from_bytes(f.read((2 * shape[0] * shape[1] + 7) // 8),"little"),shape)
+
+            if event == EVENT_HEADER:
+                max_deph = deph
+                out.write(strategy._header_text(max_deph))
+            elif event == EVENT_NODE:
+                out.write(strategy._node_text(players,board,player_id,max_deph,deph,count,pos))
+            elif event == EVENT_RESULT:
+                score = int(score) if score.is_integer() else score
+                out.write(strategy._result_text(players,board,player_id,max_deph,deph,count,winner,score))
+            elif event == EVENT_LOOP:
+                out.write(game._loop_text(Game.possibilities_cells,players,board,player_id,count,deph,pos))
+            elif event == EVENT_TEXT:
+                resumo = f.read(count).decode("utf-8")
+                out.write(game._board_text(board,players,resumo,deph))
+
+            records += 1
+
+    return records
@@ -0,0 +1,133 @@
+import os
+import json
+import numpy as np
+
+# Registro de cada partida no arquivo de resultados: id do ganhador (-1 empate) e tempo da partida
+RECORD          = np.dtype([("result","i1"),("time","<f4")])
+
+# Partidas gravadas entre dois checkpoints
+CHUNK_SIZE      = 1000
+
+# Extensão do arquivo de checkpoint (gravado ao lado do arquivo de resultados)
+CHECKPOINT      = ".ckpt"
+
+
+class ResultStream(object):
+    """
+    Resultados das partidas gravados em blocos (chunk_size) no arquivo de resultados, sem manter todas as partidas em memoria.
+    Apos cada bloco um checkpoint JSON guarda a quantidade de partidas, os contadores por resultado e o tempo total,
+    assim as estatisticas são atualizadas de forma incremental e uma execução interrompida pode continuar (resume)
+    """
+
+    def __init__(self,file_name,chunk_size=CHUNK_SIZE,settings=None,resume=False):
+
+        self._file_name     = file_name
+        self._chunk_size    = max(1,chunk_size)
+        self._settings      = json.loads(json.dumps(settings)) if settings is not None else {}
+        self._count         = 0
+        self._scores        = {}
+        self._total_time    = 0
+
+        if resume and os.path.exists(self.checkpoint_file):
+            self.__load()
+        elif os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+        # Descarta as partidas gravadas depois do ultimo checkpoint (ou todo o arquivo em uma nova execução)
+        with open(self._file_name,"ab") as f:
+            f.truncate(self._count * RECORD.itemsize)
+
+    @property
+    def file_name(self):
+        """
+        Arquivo de resultados
+        """
+        return self._file_name
+
+    @property
+    def checkpoint_file(self):
+        """
+        Arquivo do checkpoint
+        """
+        return self._file_name + CHECKPOINT
+
+    @property
+    def chunk_size(self):
+        """
+        Partidas gravadas entre dois checkpoints
+        """
+        return self._chunk_size
+
+    @property
+    def count(self):
+        """
+        Quantidade de partidas gravadas
+        """
+        return self._count
+
+    @property
+    def scores(self):
+        """
+        Quantidade de partidas por resultado (id do ganhador ou -1 no empate)
+        """
+        return self._scores
+
+    @property
+    def total_time(self):
+        """
+        Tempo acumulado das partidas gravadas
+        """
+        return self._total_time
+
+    def __load(self):
+        """
+        Restaura o estado do checkpoint. Os parametros da execução devem ser os mesmos
+        """
+
+        with open(self.checkpoint_file) as f:
+            data = json.load(f)
+
+        if data["settings"] != self._settings:
+            raise ValueError("Checkpoint {} was created with different settings: {}".format(self.checkpoint_file,data["settings"]))
+
+        if os.path.getsize(self._file_name) < data["count"] * RECORD.itemsize:
+            raise ValueError("Results file {} is shorter than its checkpoint ({} games)".format(self._file_name,data["count"]))
+
+        self._count         = data["count"]
+        self._scores        = {int(key): value for key,value in data["scores"].items()}
+        self._total_time    = data["total_time"]
+
+    def append(self,result,times):
+        """
+        Grava um bloco de partidas e atualiza os contadores
+        """
+
+        records             = np.empty(len(result),dtype=RECORD)
+        records["result"]   = result
+        records["time"]     = times
+
+        with open(self._file_name,"ab") as f:
+            records.tofile(f)
+
+        for value,n in zip(*np.unique(records["result"],return_counts=True)):
+            self._scores[int(value)] = self._scores.get(int(value),0) + int(n)
+
+        self._count        += len(records)
+        self._total_time   += float(np.sum(times))
+
+    def checkpoint(self):
+        """
+        Grava o checkpoint (arquivo temporario + rename, para não deixar um checkpoint incompleto)
+        """
+
+        temp = self.checkpoint_file + ".tmp"
+
+        with open(temp,"w") as f:
+            json.dump({
+                "count"     : self._count,
+                "scores"    : {str(key): value for key,value in self._scores.items()},
+                "total_time": self._total_time,
+                "settings"  : self._settings,
+            },f,separators=(",",":"))
+
+        os.replace(temp,self.checkpoint_file)
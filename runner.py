@@ -0,0 +1,167 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from game import create_game
+from player import create_players
+from book import OpeningBook
+from playout import play_batch, BATCH_SIZE
+
+
+def play_part(settings,worker,first,ntimes,total):
+    """
+    Executa em um processo do pool as partidas first+1 ... first+ntimes com seu proprio Game, jogadores e sementes.
+    O trace é gravado em arquivos do processo (ex: game.w0.txt) que são juntados depois pelo ProcessRunner
+    """
+
+    game = create_game(settings["shape"],False,settings["engine"],settings["trace"],".w{}".format(worker),settings["seed"],
+                        settings["win_length"],settings["trace_queue"],settings["trace_policy"],settings["trace_format"])
+
+    options = dict(settings["options"])
+
+    if settings["book"] is not None:
+        options["book"] = OpeningBook.load(settings["book"],game.lines)
+
+    game.players = create_players(game,settings["players"],settings["sequence"],False,**options)
+
+    game.play_games(first,ntimes,total)
+
+    game.deinit()
+
+    # Contadores da tabela de transposição e do livro de cada jogador
+    counters = {}
+
+    for player in game.players:
+        table,book = player.strategy.table,player.strategy.book
+        counters[player.id] = (
+            (table.hits,table.misses) if table is not None else None,
+            (book.hits,book.misses) if book is not None else None,
+        )
+
+    # Metricas das jogadas de cada jogador (opção metrics)
+    metrics = {player.id: [tuple(move) for move in player.strategy.metrics.moves]
+               for player in game.players if player.strategy.metrics is not None}
+
+    return {
+        "worker"    : worker,
+        "first"     : first,
+        "result"    : game.result.astype(np.int8),
+        "times"     : game.times,
+        "board"     : game.board,
+        "game_time" : game.game_time,
+        "counters"  : counters,
+        "metrics"   : metrics,
+    }
+
+
+class ProcessRunner(object):
+    """
+    Distribui as partidas de Game.play em um pool de processos.
+    Cada processo recebe um bloco continuo de partidas, assim com a mesma semente (--seed)
+    o resultado é igual ao de uma execução em um unico processo
+    """
+
+    def __init__(self,settings,workers):
+
+        self._settings  = settings
+        self._workers   = workers
+
+    @property
+    def workers(self):
+        """
+        Quantidade de processos
+        """
+        return self._workers
+
+    def parts(self,ntimes,first=0):
+        """
+        Divide as N partidas a partir de first em blocos continuos (first,ntimes) por processo
+        """
+
+        size,rest   = divmod(ntimes,self._workers)
+        parts       = []
+
+        for worker in range(self._workers):
+            n = size + (1 if worker < rest else 0)
+            if n > 0:
+                parts.append((worker,first,n))
+            first += n
+
+        return parts
+
+    def run(self,game,ntimes,first=0):
+        """
+        Executa as partidas first+1 ... first+ntimes e junta os arquivos de trace de cada processo na ordem das partidas
+        """
+
+        parts = self.parts(ntimes,first)
+
+        with ProcessPoolExecutor(max_workers=len(parts)) as pool:
+            futures = [pool.submit(play_part,self._settings,worker,start,n,game.ntimes) for worker,start,n in parts]
+            results = [future.result() for future in futures]
+
+        for result in results:
+            books = []
+            for player in game.players:
+                (table,book) = result["counters"][player.id]
+                if table is not None:
+                    player.strategy.table.add_counters(*table)
+                # O livro é compartilhado pelos jogadores: soma uma unica vez
+                if book is not None and not any(player.strategy.book is b for b in books):
+                    books.append(player.strategy.book)
+                    player.strategy.book.add_counters(*book)
+                if player.id in result["metrics"]:
+                    player.strategy.metrics.extend(result["metrics"][player.id])
+
+        if game.trace:
+            for worker,first,n in parts:
+                suffix = ".w{}".format(worker)
+                game.register.append(game.trace_file("game{}".format(suffix)))
+                for player in game.players:
+                    player.strategy.register.append(game.trace_file("strategyP{}{}".format(player.id,suffix)))
+
+        return results
+
+
+class BatchRunner(object):
+    """
+    Caminho rapido de Game.play quando todos os jogadores são random (sem sequencia):
+    as partidas são simuladas em lote pelo playout.BatchPlayout, sem o loop de cada partida.
+    O lote não grava o trace nem a saida verbose das partidas
+    """
+
+    def __init__(self,seed=None,batch_size=BATCH_SIZE):
+
+        self._seed          = seed
+        self._batch_size    = batch_size
+
+    @property
+    def batch_size(self):
+        """
+        Quantidade de partidas de cada lote
+        """
+        return self._batch_size
+
+    def run(self,game,ntimes,first=0):
+        """
+        Simula as partidas first+1 ... first+ntimes e devolve uma unica parte no formato do ProcessRunner
+        """
+
+        # Cada bloco de partidas (ex: entre os checkpoints do arquivo de resultados) tem a sua propria semente
+        seed                    = [self._seed,first] if self._seed is not None and first > 0 else self._seed
+        players_id              = [player.id for player in game.players]
+        (result,times,board)    = play_batch(game.shape,players_id,game.win_length,ntimes,seed,self._batch_size)
+
+        # O tempo de cada lote é dividido igualmente entre as suas partidas
+        sizes = [min(self._batch_size,ntimes - first) for first in range(0,ntimes,self._batch_size)]
+
+        return [{
+            "worker"    : 0,
+            "first"     : first,
+            "result"    : result,
+            "times"     : [t / n for t,n in zip(times,sizes) for i in range(n)],
+            "board"     : board,
+            "game_time" : times[-1] / sizes[-1] if len(times) > 0 else 0,
+            # Jogadores random: sem tabela de transposição, livro ou metricas
+            "counters"  : {player.id: (None,None) for player in game.players},
+            "metrics"   : {},
+        }]
@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import random
+import asyncio
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from game import create_game, EMPTY_CELL, NO_WINNER
+from player import create_players
+from strategy import StrategyGame
+
+# Endereço padrão do servidor TCP
+SERVER_HOST     = "127.0.0.1"
+SERVER_PORT     = 7777
+
+# Quantidade de resultados mantidos no cache compartilhado pelas conexões
+CACHE_SIZE      = 100000
+
+# Opções das estrategias aceitas na requisição (a busca paralela não é permitida dentro do pool)
+SEARCH_OPTIONS  = ("depth","heuristic","tt_size","symmetry","time_limit","node_limit","iterations")
+
+# Estrategias do servidor
+SERVER_STRATEGIES = [name for name in StrategyGame.options() if name != StrategyGame.HUMAN]
+
+# Maior tabela de transposição (MB) aceita na requisição: cada jogo do processo tem as suas tabelas
+MAX_TT_SIZE     = 64
+
+# Jogos mantidos em cada processo do pool (os menos usados são finalizados)
+ENGINE_CACHE    = 8
+
+# Jogos (Game + jogadores) de cada processo do pool por (formato,k,estrategia,opções) em ordem de uso (LRU):
+# as tabelas de transposição continuam valendo entre as requisições atendidas pelo processo
+_engines        = OrderedDict()
+
+
+def normalize(request):
+    """
+    Valida a requisição e retorna a forma canonica {board,shape,strategy,player,win_length,options}.
+    board é uma lista de linhas com 0 (vazio), 1 e 2; player (padrão: quem tem menos jogadas, 1 no empate) é o jogador da vez
+    """
+
+    strategy = request.get("strategy",StrategyGame.ALPHA_BETA)
+
+    if strategy not in SERVER_STRATEGIES:
+        raise ValueError("Unknown strategy {!r} (options: {})".format(strategy,", ".join(SERVER_STRATEGIES)))
+
+    board = np.array(request["board"],dtype=int)
+    shape = tuple(request.get("shape",board.shape))
+
+    if board.ndim != 2 or board.shape != shape:
+        raise ValueError("Board does not match shape {}".format(list(shape)))
+
+    if not np.isin(board,(EMPTY_CELL,1,2)).all():
+        raise ValueError("Board cells must be 0 (empty), 1 or 2")
+
+    counts  = [int(np.sum(board == player_id)) for player_id in (1,2)]
+    player  = request.get("player",1 if counts[0] <= counts[1] else 2)
+
+    if player not in (1,2):
+        raise ValueError("Player must be 1 or 2")
+
+    options = {key: value for key,value in request.get("options",{}).items() if key in SEARCH_OPTIONS}
+
+    tt_size = options.get("tt_size",0)
+
+    if not isinstance(tt_size,(int,float)) or not 0 <= tt_size <= MAX_TT_SIZE:
+        raise ValueError("tt_size must be between 0 and {} MB".format(MAX_TT_SIZE))
+
+    return dict(board=board.tolist(),shape=list(shape),strategy=strategy,player=player,win_length=request.get("win_length"),
+                options=options)
+
+
+def request_key(request):
+    """
+    Chave do cache e das buscas em andamento (requisição normalizada)
+    """
+
+    return json.dumps(request,sort_keys=True,separators=(",",":"))
+
+
+def search_move(request):
+    """
+    Executa em um processo do pool: StrategyGame.move do jogador da vez para o board da requisição.
+    Retorna (jogada,score,nós) ou o erro da requisição (qualquer exceção da busca vira a resposta de erro)
+    """
+
+    try:
+        return engine_move(request)
+    except Exception as e:
+        return {"error": "{}: {}".format(type(e).__name__,e)}
+
+
+def engine_move(request):
+    """
+    Busca da requisição no jogo (Game + jogadores) do processo para o formato, k, estrategia e opções
+    """
+
+    engine_key = (tuple(request["shape"]),request["win_length"],request["strategy"],json.dumps(request["options"],sort_keys=True))
+
+    if engine_key not in _engines:
+        game            = create_game(tuple(request["shape"]),False,trace=False,win_length=request["win_length"])
+        game.players    = create_players(game,((1,request["strategy"],"X"),(2,request["strategy"],"O")),None,False,
+                                         **request["options"])
+        _engines[engine_key] = game
+
+        # Libera as tabelas do jogo usado há mais tempo
+        if len(_engines) > ENGINE_CACHE:
+            _engines.popitem(last=False)[1].deinit()
+
+    _engines.move_to_end(engine_key)
+
+    game        = _engines[engine_key]
+    game.board  = np.array(request["board"],dtype=int)
+
+    if game.evaluate() != NO_WINNER:
+        return {"error": "Game is over"}
+
+    strategy = game.players[request["player"] - 1].strategy
+
+    # Mesma requisição, mesma semente: a resposta não depende do processo nem da ordem das requisições
+    strategy.start(request_key(request))
+
+    (pos,score) = strategy.move()
+
+    return {"move": [int(pos[0]),int(pos[1])],"score": float(score),"nodes": strategy.count}
+
+
+class MoveServer(object):
+    """
+    Servidor asyncio de jogadas: uma requisição JSON por linha e uma resposta JSON por linha.
+    As buscas rodam no pool de processos; requisições iguais em andamento esperam a mesma busca
+    e os resultados ficam em um cache LRU compartilhado por todas as conexões
+    """
+
+    def __init__(self,workers=None,cache_size=CACHE_SIZE):
+
+        self._workers       = workers or os.cpu_count()
+        self._cache_size    = cache_size
+        self._cache         = OrderedDict()
+        self._running       = {}
+        self._pool          = None
+        self._stats         = dict(requests=0,searches=0,cache_hits=0,merged=0,errors=0)
+
+    @property
+    def stats(self):
+        """
+        Contadores: requisições, buscas executadas, respostas do cache, requisições unidas a uma busca em andamento e erros
+        """
+        return dict(self._stats,cache_entries=len(self._cache),running=len(self._running))
+
+    async def move(self,request):
+        """
+        Resposta de uma requisição de jogada
+        """
+
+        self._stats["requests"] += 1
+
+        request = normalize(request)
+        key     = request_key(request)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self._stats["cache_hits"] += 1
+            return dict(self._cache[key],cached=True)
+
+        if key in self._running:
+            self._stats["merged"] += 1
+            return dict(await asyncio.shield(self._running[key]),cached=False)
+
+        future = asyncio.get_running_loop().run_in_executor(self._pool,search_move,request)
+        self._running[key] = future
+        self._stats["searches"] += 1
+
+        try:
+            result = await asyncio.shield(future)
+        except BrokenProcessPool:
+            # Um processo do pool morreu: as proximas buscas vão para um novo pool
+            self.__restart_pool()
+            raise
+        finally:
+            del self._running[key]
+
+        if "error" not in result:
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+        return dict(result,cached=False)
+
+    def __restart_pool(self):
+        """
+        Troca o pool quebrado por um novo (as buscas em andamento no pool antigo recebem o erro)
+        """
+
+        broken      = self._pool
+        self._pool  = ProcessPoolExecutor(max_workers=self._workers)
+
+        broken.shutdown(wait=False)
+
+    async def handle(self,reader,writer):
+        """
+        Conexão de um cliente: as requisições da conexão são respondidas na ordem.
+        {"command": "stats"} retorna os contadores do servidor. Toda requisição recebe uma resposta:
+        um erro da requisição ou da busca vira {"error": ...} sem fechar a conexão
+        """
+
+        try:
+            while True:
+
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                start   = time.perf_counter()
+                request = None
+
+                try:
+                    request = json.loads(line)
+                    if request.get("command") == "stats":
+                        response = self.stats
+                    else:
+                        response = await self.move(request)
+                except (ValueError,KeyError,TypeError) as e:
+                    self._stats["errors"] += 1
+                    response = {"error": str(e)}
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    response = {"error": "{}: {}".format(type(e).__name__,e)}
+
+                if isinstance(request,dict) and "id" in request:
+                    response["id"] = request["id"]
+
+                response["time"] = time.perf_counter() - start
+
+                writer.write(json.dumps(response,separators=(",",":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self,host=SERVER_HOST,port=SERVER_PORT,unix=None,ready=None):
+        """
+        Atende as conexões TCP (host,port) ou do socket Unix até ser interrompido
+        """
+
+        self._pool = ProcessPoolExecutor(max_workers=self._workers)
+
+        try:
+            if unix is not None:
+                server = await asyncio.start_unix_server(self.handle,unix)
+            else:
+                server = await asyncio.start_server(self.handle,host,port)
+
+            if ready is not None:
+                ready(server)
+
+            async with server:
+                await server.serve_forever()
+        finally:
+            # O pool pode ter sido trocado por __restart_pool
+            self._pool.shutdown()
+
+
+def random_positions(shape,count,win_length=None,seed=None):
+    """
+    Posições de partidas aleatorias ainda em andamento (para o gerador de carga)
+    """
+
+    rng         = random.Random(seed)
+    game        = create_game(tuple(shape),False,trace=False,win_length=win_length)
+    game.players= create_players(game,((1,StrategyGame.RANDOM,"X"),(2,StrategyGame.RANDOM,"O")),None,False)
+    positions   = []
+
+    while len(positions) < count:
+
+        board   = game.create_board()
+        cells   = game.possibilities_cells(board)
+        plies   = rng.randrange(len(cells))
+
+        rng.shuffle(cells)
+
+        for ply,pos in enumerate(cells[:plies]):
+            board[pos] = 1 + ply % 2
+
+        if game.evaluate(board) == NO_WINNER:
+            positions.append(board.tolist())
+
+    return positions
+
+
+async def load_client(positions,requests,strategy,options,host,port,unix,latencies,rng):
+    """
+    Uma conexão do gerador de carga: envia as requisições uma a uma e guarda a latencia de cada resposta
+    """
+
+    if unix is not None:
+        (reader,writer) = await asyncio.open_unix_connection(unix)
+    else:
+        (reader,writer) = await asyncio.open_connection(host,port)
+
+    errors = 0
+
+    for i in range(requests):
+
+        request = dict(board=rng.choice(positions),strategy=strategy,options=options)
+        start   = time.perf_counter()
+
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+
+        response = json.loads(await reader.readline())
+
+        latencies.append(time.perf_counter() - start)
+
+        if "error" in response:
+            errors += 1
+
+    writer.close()
+
+    return errors
+
+
+async def load_generator(shape=(3,3),connections=8,requests=100,positions=50,strategy=StrategyGame.ALPHA_BETA,options=None,
+                         host=SERVER_HOST,port=SERVER_PORT,unix=None,seed=None):
+    """
+    Gerador de carga: connections conexões simultaneas com requests requisições cada, sorteadas entre positions posições.
+    Retorna o resumo: vazão (requisições/s), latencias p50/p95/p99 (ms), erros e os contadores do servidor
+    """
+
+    rng         = random.Random(seed)
+    boards      = random_positions(shape,positions,seed=seed)
+    latencies   = []
+    start       = time.perf_counter()
+
+    errors      = await asyncio.gather(*[load_client(boards,requests,strategy,options or {},host,port,unix,latencies,
+                                                     random.Random(rng.random())) for i in range(connections)])
+
+    elapsed     = time.perf_counter() - start
+    times       = np.array(latencies) * 1000
+
+    if unix is not None:
+        (reader,writer) = await asyncio.open_unix_connection(unix)
+    else:
+        (reader,writer) = await asyncio.open_connection(host,port)
+
+    writer.write(b'{"command":"stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+
+    summary = dict(requests=len(latencies),errors=sum(errors),time=elapsed,throughput=len(latencies) / elapsed,
+                   latency_mean_ms=float(times.mean()),latency_max_ms=float(times.max()),server=stats)
+
+    for p,value in zip((50,95,99),np.percentile(times,(50,95,99))):
+        summary["latency_p{}_ms".format(p)] = float(value)
+
+    return summary
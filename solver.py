@@ -0,0 +1,284 @@
+import mmap
+import struct
+import numpy as np
+
+from bitboard import BitBoard, win_lines, default_win_length
+from game import EVALUATE_SIZE
+
+# Valor de cada estado do ponto de vista do jogador da vez (2 bits)
+VALUE_UNKNOWN   = 0
+VALUE_WIN       = 1
+VALUE_DRAW      = 2
+VALUE_LOSS      = 3
+
+# Cabeçalho do arquivo: assinatura, versão, linhas, colunas, k e quantidade de estados (3 ** celulas)
+TABLE_HEADER    = struct.Struct("<4sBBBBQ")
+TABLE_MAGIC     = b"TTTS"
+TABLE_VERSION   = 1
+
+# Estados processados de cada vez (limita a memoria dos arrays de digitos de cada camada)
+SOLVE_CHUNK     = 1 << 20
+
+
+def table_file(shape,win_length):
+    """
+    Nome padrão da tabela resolvida do formato (ex: solved_3x3_k3.bin)
+    """
+
+    return "solved_{}x{}_k{}.bin".format(shape[0],shape[1],win_length)
+
+
+class Solver(object):
+    """
+    Resolve o jogo por analise retrograda. Cada estado é indexado pelo hash perfeito na base 3:
+    indice = soma(celula * 3 ** (row * cols + col)) com 0 vazio, 1 quem começa e 2 o segundo jogador.
+    Os estados alcançaveis são listados por camadas (quantidade de jogadas) a partir do tabuleiro vazio
+    e os valores (vitoria/empate/derrota do jogador da vez e distancia até o fim) calculados da ultima camada para a primeira
+    """
+
+    def __init__(self,shape,win_length=None):
+
+        self._shape         = tuple(shape)
+        self._cells         = self._shape[0] * self._shape[1]
+        self._win_length    = win_length if win_length is not None else default_win_length(self._shape,EVALUATE_SIZE)
+        self._pow3          = 3 ** np.arange(self._cells,dtype=np.int64)
+        cols                = self._shape[1]
+        self._lines         = np.array([[r * cols + c for r,c in line] for line in win_lines(self._shape,self._win_length)],
+                                       dtype=np.intp).reshape(-1,self._win_length)
+        self._values        = np.zeros(3 ** self._cells,dtype=np.uint8)
+        self._distances     = np.zeros(3 ** self._cells,dtype=np.uint8)
+        self._layers        = []
+
+    @property
+    def shape(self):
+        """
+        Formato do tabuleiro
+        """
+        return self._shape
+
+    @property
+    def win_length(self):
+        """
+        Celulas em sequencia para vencer
+        """
+        return self._win_length
+
+    @property
+    def values(self):
+        """
+        Valor de cada indice (VALUE_*) do ponto de vista do jogador da vez; VALUE_UNKNOWN nos estados não alcançaveis
+        """
+        return self._values
+
+    @property
+    def distances(self):
+        """
+        Jogadas até o fim da partida com jogo perfeito (a vitoria mais rapida e a derrota mais longa)
+        """
+        return self._distances
+
+    @property
+    def states(self):
+        """
+        Quantidade de estados alcançaveis
+        """
+        return sum(len(layer) for layer in self._layers)
+
+    def __digits(self,indexes):
+        """
+        Celulas (N,celulas) dos indices
+        """
+
+        return (indexes[:,None] // self._pow3[None,:] % 3).astype(np.int8)
+
+    def __wins(self,digits,player):
+        """
+        Estados em que o jogador fechou alguma linha
+        """
+
+        return np.all(digits[:,self._lines] == player,axis=2).any(axis=1)
+
+    def __children(self,indexes,digits,player):
+        """
+        Filhos (indice pai na camada, indice do filho) das jogadas do jogador em todas as celulas vazias
+        """
+
+        (rows,cells) = np.nonzero(digits == 0)
+
+        return rows,indexes[rows] + player * self._pow3[cells]
+
+    def solve(self):
+        """
+        Lista os estados alcançaveis e calcula o valor e a distancia de todos eles
+        """
+
+        layer = np.zeros(1,dtype=np.int64)
+
+        # Camadas: estados com ply jogadas, o jogador da vez é 1 nas camadas pares
+        for ply in range(self._cells + 1):
+
+            self._layers.append(layer)
+            player  = 1 if ply % 2 == 0 else 2
+            nexts   = []
+
+            for first in range(0,len(layer),SOLVE_CHUNK):
+
+                indexes = layer[first:first + SOLVE_CHUNK]
+                digits  = self.__digits(indexes)
+
+                # Fim da partida: o jogador anterior venceu (derrota do jogador da vez) ou o tabuleiro está cheio
+                lost    = self.__wins(digits,3 - player) if ply > 0 else np.zeros(len(indexes),dtype=bool)
+                full    = ~lost & np.all(digits != 0,axis=1)
+
+                self._values[indexes[lost]] = VALUE_LOSS
+                self._values[indexes[full]] = VALUE_DRAW
+
+                active  = ~(lost | full)
+
+                (rows,children) = self.__children(indexes[active],digits[active],player)
+                nexts.append(children)
+
+            layer = np.unique(np.concatenate(nexts)) if nexts else np.zeros(0,dtype=np.int64)
+
+            if len(layer) == 0:
+                break
+
+        # Analise retrograda: cada camada a partir dos valores da camada seguinte
+        for ply in range(len(self._layers) - 1,-1,-1):
+
+            player = 1 if ply % 2 == 0 else 2
+
+            for first in range(0,len(self._layers[ply]),SOLVE_CHUNK):
+
+                indexes = self._layers[ply][first:first + SOLVE_CHUNK]
+                indexes = indexes[self._values[indexes] == VALUE_UNKNOWN]
+
+                if len(indexes) > 0:
+                    self.__backup(indexes,player)
+
+        return self
+
+    def __backup(self,indexes,player):
+        """
+        Valor dos estados não terminais a partir dos filhos (valores do ponto de vista do oponente):
+        vence se algum filho é derrota do oponente (a mais rapida), empata se algum filho é empate, senão perde (a mais longa)
+        """
+
+        n               = len(indexes)
+        (rows,children) = self.__children(indexes,self.__digits(indexes),player)
+        values          = self._values[children]
+        distances       = self._distances[children].astype(np.int64)
+
+        win             = np.full(n,np.iinfo(np.int64).max)
+        draw            = np.full(n,-1)
+        loss            = np.full(n,-1)
+
+        np.minimum.at(win,rows[values == VALUE_LOSS],distances[values == VALUE_LOSS])
+        np.maximum.at(draw,rows[values == VALUE_DRAW],distances[values == VALUE_DRAW])
+        np.maximum.at(loss,rows,distances)
+
+        result          = np.full(n,VALUE_LOSS,dtype=np.uint8)
+        distance        = loss + 1
+
+        is_draw         = draw >= 0
+        result[is_draw] = VALUE_DRAW
+        distance[is_draw] = draw[is_draw] + 1
+
+        is_win          = win < np.iinfo(np.int64).max
+        result[is_win]  = VALUE_WIN
+        distance[is_win] = win[is_win] + 1
+
+        self._values[indexes]       = result
+        self._distances[indexes]    = distance
+
+    def save(self,file_name):
+        """
+        Grava a tabela: cabeçalho, valores com 2 bits por estado (4 estados por byte) e a distancia com 1 byte por estado
+        """
+
+        values = np.zeros((len(self._values) + 3) // 4 * 4,dtype=np.uint8)
+        values[:len(self._values)] = self._values
+        values = values.reshape(-1,4)
+        packed = values[:,0] | values[:,1] << 2 | values[:,2] << 4 | values[:,3] << 6
+
+        with open(file_name,"wb") as f:
+            f.write(TABLE_HEADER.pack(TABLE_MAGIC,TABLE_VERSION,self._shape[0],self._shape[1],self._win_length,len(self._values)))
+            f.write(packed.astype(np.uint8).tobytes())
+            f.write(self._distances.tobytes())
+
+
+class SolvedTable(object):
+    """
+    Tabela gravada pelo Solver aberta com mmap (somente leitura, sem copiar para a memoria):
+    cada consulta lê o byte dos 2 bits do estado e o byte da distancia
+    """
+
+    def __init__(self,file_name):
+
+        self._file      = open(file_name,"rb")
+        self._mmap      = mmap.mmap(self._file.fileno(),0,access=mmap.ACCESS_READ)
+
+        (magic,version,rows,cols,win_length,states) = TABLE_HEADER.unpack_from(self._mmap,0)
+
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError("{} is not a solved table".format(file_name))
+
+        self._shape         = (rows,cols)
+        self._win_length    = win_length
+        self._values        = TABLE_HEADER.size
+        self._distances     = TABLE_HEADER.size + (states + 3) // 4
+        self._pow3          = [3 ** i for i in range(rows * cols)]
+
+    @property
+    def shape(self):
+        """
+        Formato do tabuleiro da tabela
+        """
+        return self._shape
+
+    @property
+    def win_length(self):
+        """
+        Celulas em sequencia para vencer da tabela
+        """
+        return self._win_length
+
+    def index(self,board,first_id):
+        """
+        Indice base 3 do tabuleiro (numpy ou BitBoard): o jogador first_id (quem começou) é 1 e o outro é 2
+        """
+
+        if isinstance(board,BitBoard):
+            board = board.to_array()
+
+        index = 0
+
+        for cell,value in enumerate(board.ravel()):
+            if value != 0:
+                index += (1 if value == first_id else 2) * self._pow3[cell]
+
+        return index
+
+    def child(self,index,cell,digit):
+        """
+        Indice após a jogada do jogador (digit 1 ou 2) na celula (row * cols + col)
+        """
+
+        return index + digit * self._pow3[cell]
+
+    def lookup(self,index):
+        """
+        (valor,distancia) do estado do ponto de vista do jogador da vez
+        """
+
+        value = self._mmap[self._values + (index >> 2)] >> ((index & 3) * 2) & 3
+
+        return value,self._mmap[self._distances + index]
+
+    def close(self):
+        """
+        Fecha o mmap e o arquivo
+        """
+
+        self._mmap.close()
+        self._file.close()
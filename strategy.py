@@ -1,30 +1,71 @@
+import os
+import time
 import random
 import numpy as np
 import copy
-from math import inf as infinity
-from scipy.special import factorial
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from math import inf as infinity, sqrt, log, factorial
 
-from game import Game
+from game import Game, create_game
+from bitboard import BitBoard
 from register import RegisterStrategy
+from transposition import Zobrist, TranspositionTable, EXACT, LOWER, UPPER
+from symmetry import Symmetry
+from metrics import SearchMetrics
+from heuristic import HeuristicEvaluator, HEURISTIC_DEPTH, HEURISTIC_STEP
+from solver import SolvedTable, table_file, VALUE_WIN, VALUE_DRAW, VALUE_LOSS
+
+# Score de vitoria/derrota retornado por _calc_score
+WIN_SCORE = 10
+
+# MCTS: iterações por jogada quando nenhum limite é informado e a constante de exploração do UCT
+MCTS_ITERATIONS = 1000
+MCTS_EXPLORATION = sqrt(2)
+
+# PVS: meia largura da janela de aspiração em torno do score da iteração anterior
+ASPIRATION_WINDOW = 1
+
+
+class SearchTimeout(Exception):
+    """
+    Interrompe a iteração corrente do aprofundamento iterativo (tempo ou nós esgotados)
+    """
+    pass
+
 
 class StrategyGame(object):
 
     RANDOM      = 'random'
     MINIMAX     = 'minimax'
     ALPHA_BETA  = 'alpha_beta'
+    PVS         = 'pvs'
+    MCTS        = 'mcts'
+    SOLVED      = 'solved'
     HUMAN       = 'human'
 
-    game        = None
-
-    def __init__(self,game,player,verbose=False):
-        StrategyGame.game = game
+    def __init__(self,game,player,verbose=False,metrics=False,**options):
+        self._game      = game
         self._player    = player
         self._name      = ""
         self._current_sequence = []
         self._sequence  = []
-        # Registra o número de interações feitas
+        # Registra o número de interações feitas (e por processo na busca paralela)
         self._count     = 0
-        self._register  = RegisterStrategy(game.size,"strategyP{}.txt".format(self._player.id),verbose)
+        self._counts    = []
+        # Contadores da jogada: folhas, maior ply, nós expandidos (com filhos) e cortes do alpha beta
+        self._leaves    = 0
+        self._max_ply   = 0
+        self._expanded  = 0
+        self._cutoffs   = 0
+        # Metricas de cada jogada (opção metrics)
+        self._metrics   = SearchMetrics() if metrics else None
+        # Tabela de transposição e livro de aberturas (somente nas estrategias de busca)
+        self._table     = None
+        self._book      = None
+        # Gerador de numeros aleatorios da estrategia (semeado a cada partida por Game.start)
+        self._random    = random.Random()
+        self._register  = RegisterStrategy(game.size,game.trace_file("strategyP{}".format(self._player.id)),verbose,**game.trace_options)
 
     @property
     def count(self):
@@ -33,6 +74,83 @@ class StrategyGame(object):
         """
         return self._count
 
+    @property
+    def counts(self):
+        """
+        Contador de testes de cada processo da busca paralela (vazio na busca em um unico processo)
+        """
+        return self._counts
+
+    @property
+    def game(self):
+        """
+        Jogo da estrategia: cada Game tem as suas estrategias, assim varias partidas podem rodar no mesmo processo
+        """
+        return self._game
+
+    @property
+    def player(self):
+        """
+        Jogador da estrategia
+        """
+        return self._player
+
+    @property
+    def leaves(self):
+        """
+        Folhas (fim da partida ou limite de profundidade) avaliadas na ultima jogada
+        """
+        return self._leaves
+
+    @property
+    def max_depth(self):
+        """
+        Maior profundidade alcançada na ultima jogada
+        """
+        return self._max_ply
+
+    @property
+    def expanded(self):
+        """
+        Nós com filhos buscados na ultima jogada
+        """
+        return self._expanded
+
+    @property
+    def cutoffs(self):
+        """
+        Nós em que o alpha beta cortou os filhos restantes na ultima jogada
+        """
+        return self._cutoffs
+
+    @property
+    def metrics(self):
+        """
+        Metricas de cada jogada (metrics.SearchMetrics) ou None se a opção metrics estiver desativada
+        """
+        return self._metrics
+
+    @property
+    def register(self):
+        """
+        Registrador da arvore de busca (strategyP{id}.txt)
+        """
+        return self._register
+
+    @property
+    def table(self):
+        """
+        Tabela de transposição da estrategia (None se não utilizar)
+        """
+        return self._table
+
+    @property
+    def book(self):
+        """
+        Livro de aberturas consultado antes da busca (None se não utilizar)
+        """
+        return self._book
+
     @property
     def current_sequence(self):
         return self._current_sequence
@@ -55,29 +173,58 @@ class StrategyGame(object):
         """
         return self._name
 
-    def start(self):
+    def start(self,seed=None):
         self._current_sequence = copy.deepcopy(self._sequence)
 
+        if seed is not None:
+            self._random.seed(seed)
+
     def move(self):
         raise NotImplementedError()
 
+    def search(self):
+        """
+        Executa move() zerando os contadores da jogada e registrando as metricas (quando ativadas)
+        """
+
+        self._leaves    = 0
+        self._max_ply   = 0
+        self._expanded  = 0
+        self._cutoffs   = 0
+
+        if self._metrics is None:
+            return self.move()
+
+        game = self._game
+        ply  = game.size - len(game.empty_cells()) + 1
+
+        self._metrics.begin(self)
+
+        result = self.move()
+
+        self._metrics.end(self,game.count,ply)
+
+        return result
+
     @staticmethod
     def options():
-        return [StrategyGame.RANDOM,StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA,StrategyGame.HUMAN]
+        return [StrategyGame.RANDOM,StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA,StrategyGame.PVS,StrategyGame.MCTS,StrategyGame.SOLVED,StrategyGame.HUMAN]
 
-    def _calc_score(self,board,player):
+    def _calc_score(self,board,player,winner=None):
         """
         Faz a avaliação theuristica do estado que está o tabuleiro.
+        winner é o resultado já calculado pela busca (evita avaliar o board novamente)
         :Retorna +10 se o player  ganhar ; -1 0 se o adversário ganhar ; e 0  nas demais situações
         """
 
-        winner = StrategyGame.game.evaluate(board)
+        if winner is None:
+            winner = self._game.evaluate(board)
 
         if winner == player.id:
-            score = +10
-        elif winner == StrategyGame.game.opponent(player).id:
+            score = +WIN_SCORE
+        elif winner == self._game.opponent(player).id:
             # Oponente ganhou
-            score = -10
+            score = -WIN_SCORE
         else:
             score = 0
 
@@ -91,8 +238,8 @@ class StrategyGame(object):
         #all_empty   = self.empty_cells()
         #return list(itertools.permutations(all_empty,len(all_empty)))
 
-        # With exact=False the factorial is approximated using the gamma function:
-        return factorial(len(StrategyGame.game.empty_cells()),exact = True)
+        # Fatorial exato (inteiro) da biblioteca padrão: o mesmo de scipy.special.factorial(exact=True) sem importar o scipy
+        return factorial(len(self._game.empty_cells()))
 
 
     def deinit(self):
@@ -105,13 +252,13 @@ class StrategyGame(object):
 
 class StrategyHuman(StrategyGame):
 
-    def __init__(self,game,player,verbose=False):
-        super().__init__(game, player,verbose)
+    def __init__(self,game,player,verbose=False,**options):
+        super().__init__(game, player,verbose,**options)
         self._name = StrategyGame.HUMAN
 
     def move(self):
 
-        print(self._player.board_out(StrategyGame.game.board,StrategyGame.game.players))
+        print(self._register.board_out(self._game.board,self._game.players))
         
         pos = input("Enter the row,col \n")
         pos = tuple(int(x.strip()) for x in pos.split(','))
@@ -121,8 +268,8 @@ class StrategyHuman(StrategyGame):
 class StrategyRandom(StrategyGame):
 
 
-    def __init__(self,game,player,verbose=False):
-        super().__init__(game, player,verbose)
+    def __init__(self,game,player,verbose=False,**options):
+        super().__init__(game, player,verbose,**options)
         self._name = StrategyGame.RANDOM
 
     def move(self):
@@ -130,17 +277,271 @@ class StrategyRandom(StrategyGame):
         Sem nenhuma strategy
         """
 
-        empty_cells = StrategyGame.game.empty_cells()
-        pos = random.choice(empty_cells)
+        empty_cells = self._game.empty_cells()
+        pos = self._random.choice(empty_cells)
         
         return (pos,0)
 
 class StrategyMinimax(StrategyGame):
 
 
-    def __init__(self,game,player,verbose=False):
-        super().__init__(game, player,verbose)
-        self._name = StrategyGame.MINIMAX
+    def __init__(self,game,player,verbose=False,tt_size=0,symmetry=True,book=None,depth=None,time_limit=None,node_limit=None,
+                 heuristic=False,**options):
+        super().__init__(game, player,verbose,**options)
+        self._name      = StrategyGame.MINIMAX
+        self._book      = book
+        # Profundidade maxima da busca (None = até o fim da partida)
+        self._depth     = depth
+        # Avaliação heuristica das folhas do limite de profundidade (com HEURISTIC_DEPTH se depth não for informado)
+        self._heuristic = HeuristicEvaluator(game.shape,game.win_length,WIN_SCORE - 1) if heuristic else None
+        if heuristic and depth is None:
+            self._depth = HEURISTIC_DEPTH
+        # Menor diferença entre dois scores: 1 com o resultado da partida e HEURISTIC_STEP com a heuristica
+        self._score_step    = HEURISTIC_STEP if heuristic else 1
+        # Aprofundamento iterativo: limite de tempo (s) e de nós por jogada
+        self._time_limit    = time_limit
+        self._node_limit    = node_limit
+        self._limited       = False
+        self._deadline      = None
+        self._root_deph     = 0
+        self._depth_reached = 0
+        # Variação principal da ultima iteração completa e a da iteração corrente (por ply)
+        self._pv            = []
+        self._pv_table      = []
+        self._zobrist   = None
+        self._symmetry  = None
+        self._use_symmetry = symmetry
+        # A tabela dura todo o play (todas as jogadas de todas as partidas)
+        self._table     = TranspositionTable(tt_size) if tt_size > 0 else None
+        # Celulas vazias do board da busca (_begin_search)
+        self._empty     = []
+
+
+    def _book_move(self):
+        """
+        Jogada do livro de aberturas para o tabuleiro atual ou None para realizar a busca
+        """
+
+        if self._book is None:
+            return None
+
+        return self._book.lookup(self._game.board,self._player.id)
+
+
+    def _search_deph(self):
+        """
+        Profundidade da busca: todas as celulas vazias limitada pela opção depth
+        """
+
+        deph = len(self._game.empty_cells())
+
+        return deph if self._depth is None else min(deph,self._depth)
+
+
+    @property
+    def depth_reached(self):
+        """
+        Ultima profundidade completa do aprofundamento iterativo
+        """
+        return self._depth_reached
+
+
+    def _iterative(self):
+        """
+        Verifica se a busca é por aprofundamento iterativo (opções time_limit ou node_limit)
+        """
+
+        return self._time_limit is not None or self._node_limit is not None
+
+
+    def _deepening(self,deph,search):
+        """
+        Aprofundamento iterativo: search(d) com d = 1,2,...,deph até esgotar o tempo ou os nós da jogada.
+        Cada iteração testa primeiro a variação principal da anterior.
+        Retorna a jogada da ultima profundidade completa (a profundidade 1 sempre é completada)
+        """
+
+        self._limited   = True
+        self._deadline  = time.time() + self._time_limit if self._time_limit is not None else None
+        self._pv        = []
+        move            = None
+
+        for d in range(1,deph + 1):
+
+            self._root_deph = d
+            self._pv_table  = [[] for i in range(d + 2)]
+
+            try:
+                result = search(d)
+            except SearchTimeout:
+                break
+
+            move                = result
+            self._depth_reached = d
+            self._pv            = self._pv_table[0]
+
+            # Vitoria ou derrota forçada: as proximas profundidades não mudam o resultado
+            if abs(move[1]) >= WIN_SCORE:
+                break
+
+        self._limited = False
+
+        return move
+
+
+    def _check_limits(self):
+        """
+        Interrompe a iteração quando o tempo ou os nós da jogada acabarem
+        """
+
+        if self._root_deph > 1:
+            if self._deadline is not None and time.time() > self._deadline:
+                raise SearchTimeout()
+            if self._node_limit is not None and self._count > self._node_limit:
+                raise SearchTimeout()
+
+
+    def _pv_first(self,cells,ply):
+        """
+        Coloca a jogada da variação principal da iteração anterior na frente
+        """
+
+        if ply < len(self._pv) and self._pv[ply] in cells:
+            pos = self._pv[ply]
+            cells.remove(pos)
+            cells.insert(0,pos)
+
+        return cells
+
+
+    def _on_pv(self,pv,ply,pos):
+        """
+        Verifica se o filho continua na variação principal da iteração anterior
+        """
+
+        return pv and ply < len(self._pv) and pos == self._pv[ply]
+
+
+    def _root_keys(self,board):
+        """
+        Hashes de Zobrist da raiz da busca em cada orientação do tabuleiro.
+        Os filhos são atualizados com XOR a cada jogada
+        """
+
+        if self._table is None and not self._use_symmetry:
+            return None
+
+        if self._zobrist is None:
+            game            = self._game
+            self._zobrist   = Zobrist(game.shape,[p.id for p in game.players])
+            self._symmetry  = Symmetry(game.shape,game.lines,self._use_symmetry)
+
+        if self._table is not None:
+            self._table.new_search()
+
+        return self._symmetry.hashes(self._zobrist,board)
+
+
+    def _leaf_score(self,board,player,to_move,deph,winner):
+        """
+        Score da folha do ponto de vista de player: a heuristica no limite de profundidade (partida em andamento)
+        ou o resultado da partida (_calc_score). to_move é o jogador da vez na folha
+        """
+
+        if winner == 0 and deph <= 0 and self._heuristic is not None:
+            return self._heuristic.score(board,player.id,self._game.opponent(player).id,to_move.id)
+
+        return self._calc_score(board,player,winner)
+
+    def _evaluate(self,board,last):
+        """
+        Resultado do board da busca: apenas as linhas da ultima jogada (last) ou o board todo na raiz
+        """
+
+        if last is None:
+            return self._game.evaluate(board,len(self._empty))
+
+        return self._game.evaluate_move(board,last,len(self._empty))
+
+    def _begin_search(self,board):
+        """
+        Board da busca: uma unica copia do tabuleiro do jogo alterada por _make/_unmake em todos os nós
+        e a lista das celulas vazias (na ordem natural) atualizada a cada jogada
+        """
+
+        board       = Game.copy_board(board)
+        self._empty = Game.possibilities_cells(board)
+
+        return board
+
+    def _make(self,board,player,pos):
+        """
+        Jogada no board da busca. Retorna a posição da celula na lista das vazias (para o _unmake)
+        """
+
+        index = self._empty.index(pos)
+
+        del self._empty[index]
+
+        Game.place(board,player,pos)
+
+        return index
+
+    def _unmake(self,board,pos,index):
+        """
+        Desfaz a jogada do _make: o proximo irmão parte do mesmo board
+        """
+
+        Game.undo(board,pos)
+
+        self._empty.insert(index,pos)
+
+    def _children(self,board,keys):
+        """
+        Jogadas possiveis sem as equivalentes por simetria
+        """
+
+        cells = list(self._empty)
+
+        if self._use_symmetry:
+            cells = self._symmetry.unique(cells,keys)
+
+        return cells
+
+
+    def _child_keys(self,keys,player,pos):
+        """
+        Hashes do tabuleiro após a jogada
+        """
+
+        if keys is None:
+            return None
+
+        return self._symmetry.play(keys,self._zobrist,player.id,pos)
+
+
+    def _probe(self,keys,player):
+        """
+        Consulta a tabela pela posição canonica. Retorna (tt_key,simetria,entry) com a jogada já na orientação real
+        """
+
+        (h,t)   = self._symmetry.canonical(keys)
+        tt_key  = h ^ self._zobrist.turn(player.id)
+        entry   = self._table.probe(tt_key)
+
+        if entry is not None:
+            (deph,flag,score,move) = entry
+            entry = (deph,flag,score,self._symmetry.from_canonical(t,move))
+
+        return tt_key,t,entry
+
+
+    def _store(self,tt_key,t,deph,flag,score,move):
+        """
+        Guarda a posição na tabela com a jogada na orientação canonica
+        """
+
+        self._table.store(tt_key,deph,flag,score,self._symmetry.to_canonical(t,move))
 
 
     def move(self):
@@ -150,64 +551,110 @@ class StrategyMinimax(StrategyGame):
 
         self._count = 0
 
-        self._register.header_tree(self.game.size)
+        book_move = self._book_move()
 
-        deph = len(StrategyGame.game.empty_cells())
+        if book_move is not None:
+            return book_move
 
-        strategy_result   =  self.__minimax(StrategyGame.game.board,deph,self._player)
+        self._register.header_tree(self._game.size,self._game)
+
+        deph  = self._search_deph()
+
+        keys  = self._root_keys(self._game.board)
+
+        board = self._game.board
+
+        # Cada iteração parte de um novo board da busca: a iteração interrompida deixa jogadas no anterior
+        if self._iterative():
+            return self._deepening(deph,lambda d: self.__minimax(self._begin_search(board),d,self._player,True,keys,True))
+
+        # Ply dos nós (root - deph) também nas buscas sem aprofundamento iterativo
+        self._root_deph = deph
+
+        strategy_result   =  self.__minimax(self._begin_search(board),deph,self._player,True,keys)
 
         return strategy_result
 
 
-    def __minimax(self,origin,deph,player,maximizingPlayer=True):
+    def __minimax(self,board,deph,player,maximizingPlayer=True,keys=None,pv=False,last=None):
         """
         Algoritmo minimax: https://en.wikipedia.org/wiki/Minimax 
+        board é o board da busca (_begin_search), alterado e restaurado pelos filhos.
+        last é a jogada que gerou o board (None na raiz)
         Retorna o melhor score com a posição
         """
 
         self._count += 1
 
-        board   = np.copy(origin)
+        ply = self._root_deph - deph
+
+        if self._limited:
+            self._check_limits()
+            self._pv_table[ply] = []
 
-        winner  = StrategyGame.game.evaluate(board)
+        if self._table is not None:
+            (tt_key,t,entry) = self._probe(keys,player)
+            if entry is not None and entry[0] >= deph:
+                return (entry[3],entry[2])
+
+        winner  = self._evaluate(board,last)
         
         if deph<=0 or winner !=0:
-            score = self._calc_score(board,player)
-            self._register.result(StrategyGame.game,self,board,player,deph,winner,score)
+            # Score sempre do ponto de vista do jogador da raiz (o que maximiza)
+            score = self._leaf_score(board,self._player,player,deph,winner)
+            self._register.result(self._game,self,board,player,deph,winner,score)
+            self._leaves += 1
+            if ply > self._max_ply:
+                self._max_ply = ply
             return (None,score)
 
+        self._expanded += 1
+
         # Incializa bestValue com o valor do limite oposto
         best =  -infinity if maximizingPlayer else  infinity
         move = (None,best)
 
-        for pos in Game.possibilities_cells(board):
+        cells = self._children(board,keys)
 
-            Game.place(board, player, pos)
+        if pv:
+            cells = self._pv_first(cells,ply)
 
-            StrategyGame.game.register.loop_strategy(StrategyGame.game,self,board, player,deph,pos)
-            self._register.node(StrategyGame.game,self,board,player,deph,pos)
+        for pos in cells:
 
-            (p,score) = self.__minimax(board,deph-1,StrategyGame.game.opponent(player),not maximizingPlayer)
+            index = self._make(board,player,pos)
 
-            if maximizingPlayer:
-                # max
-                if score > best:
-                    best = score
-                    move = (pos,best)
-            else:
-                # min
-                if score < best:
-                    best = score
-                    move = (pos,best)
+            child_keys = self._child_keys(keys,player,pos)
+
+            self._game.register.loop_strategy(self._game,self,board, player,deph,pos)
+            self._register.node(self._game,self,board,player,deph,pos)
+
+            (p,score) = self.__minimax(board,deph-1,self._game.opponent(player),not maximizingPlayer,child_keys,self._on_pv(pv,ply,pos),pos)
+
+            self._unmake(board,pos,index)
+
+            if (maximizingPlayer and score > best) or (not maximizingPlayer and score < best):
+                # max / min
+                best = score
+                move = (pos,best)
+                if self._limited:
+                    self._pv_table[ply] = [pos] + self._pv_table[ply + 1]
+
+        if self._table is not None:
+            self._store(tt_key,t,deph,EXACT,move[1],move[0])
 
         return  move
 
 class StrategyAlphaBeta(StrategyMinimax):
 
 
-    def __init__(self,game,player,verbose=False):
-        super().__init__(game, player,verbose)
+    def __init__(self,game,player,verbose=False,search_workers=1,**options):
+        super().__init__(game, player,verbose,**options)
         self._name = StrategyGame.ALPHA_BETA
+        # Busca paralela na raiz: pool de processos e o alpha da raiz compartilhado entre eles
+        self._search_workers    = search_workers
+        self._pool              = None
+        self._shared_alpha      = None
+        self._options           = options
 
 
     def move(self):
@@ -215,76 +662,784 @@ class StrategyAlphaBeta(StrategyMinimax):
         Estrategia alpha beta
         """
 
-        self._count = 0
+        self._count  = 0
+        self._counts = []
+
+        book_move = self._book_move()
+
+        if book_move is not None:
+            return book_move
+
+        self._register.header_tree(self._game.size,self._game)
+
+        deph = self._search_deph()
 
-        self._register.header_tree(self.game.size)
+        keys = self._root_keys(self._game.board)
 
-        deph = len(StrategyGame.game.empty_cells())
+        if self._search_workers > 1:
+            return self.__parallel_move(deph,keys)
 
-        strategy_result  = self.__alpha_beta(StrategyGame.game.board , deph , self._player)
+        board = self._game.board
+
+        if self._iterative():
+            return self._deepening(deph,lambda d: self.__alpha_beta(self._begin_search(board) , d , self._player , keys = keys , pv = True))
+
+        self._root_deph = deph
+
+        strategy_result  = self.__alpha_beta(self._begin_search(board) , deph , self._player , keys = keys)
 
 
         return strategy_result
 
 
-    def __alpha_beta(self,origin,deph , player , alpha = -infinity,beta = infinity , maximizingPlayer = True):
+    def __parallel_move(self,deph,keys):
+        """
+        Distribui as jogadas da raiz entre os processos do pool.
+        O melhor score exato encontrado na raiz (alpha) é compartilhado: cada tarefa lê o alpha uma unica vez ao começar
+        e busca a sua subarvore com essa janela fixa (os limites da tabela de transposição ficam validos).
+        A janela começa um passo de score abaixo do alpha, assim as jogadas empatadas com a melhor também são exatas
+        e no empate vence a primeira celula, qualquer que seja a ordem em que as tarefas terminam
+        """
+
+        board   = self._begin_search(self._game.board)
+        cells   = self._children(board,keys)
+        pool    = self.__search_pool()
+
+        self._shared_alpha.value = -infinity
+        self._root_deph          = deph
+
+        futures = [pool.submit(search_root_move,board,pos,deph) for pos in cells]
+
+        move    = (cells[0],-infinity)
+        workers = {}
+        failed  = []
+
+        for pos,future in zip(cells,futures):
+
+            (score,exact,count,hits,misses,worker) = future.result()
+
+            workers[worker] = workers.get(worker,0) + count
+
+            if self._table is not None:
+                self._table.add_counters(hits,misses)
+
+            if not exact:
+                failed.append((pos,score))
+            elif score > move[1]:
+                move = (pos,score)
+
+        self._counts = list(workers.values())
+        self._count  = sum(self._counts) + 1
+
+        # Uma jogada que falhou baixo só é descartada se o limite dela fica abaixo da melhor jogada exata;
+        # senão ela é buscada de novo (neste processo) com a janela completa
+        for pos,score in failed:
+            if score >= move[1]:
+                score = self.__search_child(board,keys,pos,deph,-infinity)
+                if score > move[1] or (score == move[1] and cells.index(pos) < cells.index(move[0])):
+                    move = (pos,score)
+
+        return move
+
+
+    def __search_pool(self):
+        """
+        Cria (uma unica vez) o pool de processos da busca paralela
+        """
+
+        if self._pool is None:
+
+            game                = self._game
+            self._shared_alpha  = multiprocessing.Value('d',-infinity)
+            players             = [(p.id,p.mark) for p in game.players]
+            # O livro só é consultado na raiz (neste processo)
+            options             = {key: value for key,value in self._options.items() if key != "book"}
+            settings            = dict(shape=game.shape,engine=game.engine,win_length=game.win_length,players=players,
+                                       player=self._player.id,options=options)
+
+            self._pool          = ProcessPoolExecutor(max_workers=self._search_workers,initializer=init_search_worker,
+                                                      initargs=(settings,self._shared_alpha))
+
+        return self._pool
+
+
+    def _search_root(self,board,pos,deph,shared_alpha):
+        """
+        Busca (em um processo do pool) a subarvore de uma jogada da raiz com a janela fixa lida do alpha compartilhado.
+        Retorna (score,exato,contador,acertos,falhas): o score é exato quando é maior que o alpha da janela.
+        Acertos e falhas são os da tabela de transposição do processo nesta busca
+        """
+
+        table               = self._table
+        (hits,misses)       = (table.hits,table.misses) if table is not None else (0,0)
+
+        self._count         = 0
+        self._root_deph     = deph
+
+        game        = self._game
+        game.board  = board
+
+        keys        = self._root_keys(board)
+        child       = self._begin_search(board)
+
+        # Janela fixa durante toda a tarefa: um passo abaixo do melhor score exato das outras jogadas
+        alpha       = shared_alpha.value - self._score_step
+
+        score       = self.__search_child(child,keys,pos,deph,alpha)
+
+        exact       = score > alpha
+
+        if exact:
+            with shared_alpha.get_lock():
+                if score > shared_alpha.value:
+                    shared_alpha.value = score
+
+        if table is not None:
+            (hits,misses) = (table.hits - hits,table.misses - misses)
+
+        return (score,exact,self._count,hits,misses)
+
+
+    def __search_child(self,board,keys,pos,deph,alpha):
+        """
+        Score da jogada pos da raiz buscada com a janela (alpha,infinito). board é o board da busca
+        """
+
+        index       = self._make(board,self._player,pos)
+
+        child_keys  = self._child_keys(keys,self._player,pos)
+
+        (p,score)   = self.__alpha_beta(board,deph-1,self._game.opponent(self._player),alpha,infinity,False,child_keys,last=pos)
+
+        self._unmake(board,pos,index)
+
+        return score
+
+
+    def deinit(self):
+        """
+        Finaliza a estrategia e o pool da busca paralela
+        """
+
+        if self._pool is not None:
+            self._pool.shutdown()
+
+        super().deinit()
+
+
+    def __alpha_beta(self,board,deph , player , alpha = -infinity,beta = infinity , maximizingPlayer = True , keys = None , pv = False , last = None):
         """
         Algoritmo alpha beta pruning: https://en.wikipedia.org/wiki/Alpha%E2%80%93beta_pruning 
+        board é o board da busca (_begin_search), alterado e restaurado pelos filhos.
+        last é a jogada que gerou o board (None na raiz)
         Retorna o melhor score com a posição
         """
 
         self._count += 1
 
-        board = np.copy(origin)
-
-        winner = StrategyGame.game.evaluate(board)
+        ply = self._root_deph - deph
+
+        if self._limited:
+            self._check_limits()
+            self._pv_table[ply] = []
+
+        tt_move = None
+
+        # A raiz é sempre buscada na ordem natural das celulas: assim a jogada escolhida
+        # não depende do que as partidas anteriores deixaram na tabela
+        if self._table is not None:
+            (tt_key,t,entry) = self._probe(keys,player)
+            if entry is not None and last is not None:
+                (tt_deph,flag,tt_score,tt_move) = entry
+                if tt_deph >= deph:
+                    if flag == EXACT:
+                        return (tt_move,tt_score)
+                    elif flag == LOWER:
+                        alpha = max(alpha,tt_score)
+                    elif flag == UPPER:
+                        beta  = min(beta,tt_score)
+                    if beta <= alpha:
+                        return (tt_move,tt_score)
+
+        alpha_origin,beta_origin = alpha,beta
+
+        winner = self._evaluate(board,last)
         
         if deph<=0 or winner !=0:
-            score = self._calc_score(board,player)
-            self._register.result(StrategyGame.game,self,board,player,deph,winner,score)
+            # Score sempre do ponto de vista do jogador da raiz (o que maximiza)
+            score = self._leaf_score(board,self._player,player,deph,winner)
+            self._register.result(self._game,self,board,player,deph,winner,score)
+            self._leaves += 1
+            if ply > self._max_ply:
+                self._max_ply = ply
             return (None,score)
 
-        # Incializa bestValue com o valor do limite oposto
-        move = (None,-infinity if maximizingPlayer else  infinity)
+        self._expanded += 1
+
+        # Fail-hard: sem jogada melhor que a janela o resultado é o proprio limite (alpha ou beta)
+        move = (None,alpha if maximizingPlayer else beta)
 
-        for pos in Game.possibilities_cells(board):
+        cells = self._children(board,keys)
 
-            Game.place(board, player, pos)
+        # A melhor jogada guardada na tabela é testada primeiro (depois da variação principal)
+        if tt_move in cells:
+            cells.remove(tt_move)
+            cells.insert(0,tt_move)
 
-            StrategyGame.game.register.loop_strategy(StrategyGame.game,self,board, player,deph,pos)
+        if pv:
+            cells = self._pv_first(cells,ply)
+
+        for pos in cells:
+
+            index = self._make(board,player,pos)
+
+            child_keys = self._child_keys(keys,player,pos)
+
+            self._game.register.loop_strategy(self._game,self,board, player,deph,pos)
             
-            self._register.node(StrategyGame.game,self,board,player,deph,pos)
+            self._register.node(self._game,self,board,player,deph,pos)
 
-            (p,score)= self.__alpha_beta(board,deph-1,StrategyGame.game.opponent(player),alpha,beta, not maximizingPlayer)
+            (p,score)= self.__alpha_beta(board,deph-1,self._game.opponent(player),alpha,beta, not maximizingPlayer,child_keys,self._on_pv(pv,ply,pos),pos)
+
+            self._unmake(board,pos,index)
 
             if maximizingPlayer:
 
                 if score  > alpha :
                     alpha = score
                     move = (pos,alpha)
+                    if self._limited:
+                        self._pv_table[ply] = [pos] + self._pv_table[ply + 1]
             else:
 
                 if score < beta:
                     beta = score
                     move = (pos,beta)
+                    if self._limited:
+                        self._pv_table[ply] = [pos] + self._pv_table[ply + 1]
 
             if beta <= alpha:
+                self._cutoffs += 1
+                break
+
+        if self._table is not None:
+            self.__store_bound(tt_key,t,deph,move,alpha_origin,beta_origin)
+
+        return move
+
+
+    def __store_bound(self,key,t,deph,move,alpha,beta):
+        """
+        Guarda o resultado na tabela de transposição com o tipo do limite em relação a janela (alpha,beta) recebida.
+        Um resultado sem jogada (None) indica que nenhum filho superou o limite da janela
+        """
+
+        (pos,score) = move
+
+        if score <= alpha:
+            self._store(key,t,deph,UPPER,alpha if pos is None else score,pos)
+        elif score >= beta:
+            self._store(key,t,deph,LOWER,beta if pos is None else score,pos)
+        else:
+            self._store(key,t,deph,EXACT,score,pos)
+
+
+class StrategyPVS(StrategyMinimax):
+    """
+    Negamax com principal variation search: https://en.wikipedia.org/wiki/Principal_variation_search
+    O score é sempre do ponto de vista do jogador da vez (_calc_score do nó). Somente a primeira jogada
+    de cada nó é buscada com a janela completa; as demais com janela nula e nova busca se superarem alpha.
+    A busca é sempre por aprofundamento iterativo com janela de aspiração em torno do score da iteração anterior.
+    A janela nula (alpha,alpha+w) supõe scores discretos: w = 1 com os scores inteiros do resultado da partida
+    e w = HEURISTIC_STEP com a heuristica (multiplos de HEURISTIC_STEP)
+    """
+
+    def __init__(self,game,player,verbose=False,**options):
+        super().__init__(game, player,verbose,**options)
+        self._name  = StrategyGame.PVS
+        # Score da ultima iteração completa (centro da janela de aspiração)
+        self._score = None
+
+    def start(self,seed=None):
+        """
+        Nova partida: a janela de aspiração não parte do score da partida (ou requisição) anterior
+        """
+
+        super().start(seed)
+
+        self._score = None
+
+    def move(self):
+        """
+        Estrategia PVS
+        """
+
+        self._count = 0
+
+        book_move = self._book_move()
+
+        if book_move is not None:
+            return book_move
+
+        self._register.header_tree(self._game.size,self._game)
+
+        deph    = self._search_deph()
+        board   = self._game.board
+        keys    = self._root_keys(board)
+
+        if self._iterative():
+            self._score = None
+            return self._deepening(deph,lambda d: self.__aspiration(self._begin_search(board),d,keys))
+
+        # Busca completa: a janela de aspiração fica em torno do score da jogada anterior da partida
+        self._root_deph = deph
+
+        return self.__aspiration(self._begin_search(board),deph,keys)
+
+
+    def __aspiration(self,board,deph,keys):
+        """
+        Busca da raiz com a janela de aspiração. Se o score sair da janela o lado que falhou é aberto e a busca repetida
+        """
+
+        if self._score is None:
+            (alpha,beta) = (-infinity,infinity)
+        else:
+            (alpha,beta) = (self._score - ASPIRATION_WINDOW,self._score + ASPIRATION_WINDOW)
+
+        while True:
+
+            move = self.__pvs(board,deph,self._player,alpha,beta,keys,self._limited)
+
+            if move[1] <= alpha and alpha > -infinity:
+                alpha = -infinity
+            elif move[1] >= beta and beta < infinity:
+                beta  = infinity
+            else:
+                break
+
+        self._score = move[1]
+
+        return move
+
+
+    def __pvs(self,board,deph,player,alpha,beta,keys=None,pv=False,last=None):
+        """
+        Negamax com janela nula para as jogadas fora da variação principal (fail-hard).
+        board é o board da busca (_begin_search), alterado e restaurado pelos filhos.
+        last é a jogada que gerou o board (None na raiz)
+        Retorna o melhor score do jogador da vez com a posição
+        """
+
+        self._count += 1
+
+        ply = self._root_deph - deph
+
+        if self._limited:
+            self._check_limits()
+            self._pv_table[ply] = []
+
+        tt_move = None
+
+        # A raiz é sempre buscada (não usa o score da tabela)
+        if self._table is not None:
+            (tt_key,t,entry) = self._probe(keys,player)
+            if entry is not None and last is not None:
+                (tt_deph,flag,tt_score,tt_move) = entry
+                if tt_deph >= deph:
+                    if flag == EXACT:
+                        return (tt_move,tt_score)
+                    elif flag == LOWER:
+                        alpha = max(alpha,tt_score)
+                    elif flag == UPPER:
+                        beta  = min(beta,tt_score)
+                    if beta <= alpha:
+                        return (tt_move,tt_score)
+
+        alpha_origin = alpha
+
+        winner  = self._evaluate(board,last)
+
+        if deph<=0 or winner !=0:
+            score = self._leaf_score(board,player,player,deph,winner)
+            self._register.result(self._game,self,board,player,deph,winner,score)
+            self._leaves += 1
+            if ply > self._max_ply:
+                self._max_ply = ply
+            return (None,score)
+
+        self._expanded += 1
+
+        # Fail-hard: sem jogada melhor que alpha o resultado é o proprio alpha
+        move     = (None,alpha)
+        opponent = self._game.opponent(player)
+
+        cells = self._children(board,keys)
+
+        if tt_move in cells:
+            cells.remove(tt_move)
+            cells.insert(0,tt_move)
+
+        if pv:
+            cells = self._pv_first(cells,ply)
+
+        for i,pos in enumerate(cells):
+
+            index = self._make(board,player,pos)
+
+            child_keys = self._child_keys(keys,player,pos)
+
+            self._game.register.loop_strategy(self._game,self,board, player,deph,pos)
+
+            self._register.node(self._game,self,board,player,deph,pos)
+
+            if i == 0:
+                score = -self.__pvs(board,deph-1,opponent,-beta,-alpha,child_keys,self._on_pv(pv,ply,pos),pos)[1]
+            else:
+                # Janela nula: apenas verifica se a jogada supera alpha
+                score = -self.__pvs(board,deph-1,opponent,-alpha-self._score_step,-alpha,child_keys,False,pos)[1]
+                if alpha < score < beta:
+                    # Nova busca a partir do limite inferior provado pela janela nula
+                    score = -self.__pvs(board,deph-1,opponent,-beta,-score,child_keys,False,pos)[1]
+
+            self._unmake(board,pos,index)
+
+            if score > alpha:
+                alpha = score
+                move  = (pos,score)
+                if self._limited:
+                    self._pv_table[ply] = [pos] + self._pv_table[ply + 1]
+
+            if alpha >= beta:
+                self._cutoffs += 1
                 break
 
+        if self._table is not None:
+            if move[0] is None:
+                self._store(tt_key,t,deph,UPPER,alpha_origin,None)
+            elif alpha >= beta:
+                self._store(tt_key,t,deph,LOWER,alpha,move[0])
+            else:
+                self._store(tt_key,t,deph,EXACT,alpha,move[0])
+
         return move
 
-def create_strategy(strategy,game,player,verbose):
+
+class MCTSNode(object):
+    """
+    Nó da arvore do MCTS. player é o jogador que fez a jogada (move) que leva ao nó
+    e wins acumula o resultado das simulações do ponto de vista dele (vitoria 1, empate 0.5)
+    """
+
+    __slots__ = ("move","player","parent","children","untried","visits","wins","winner")
+
+    def __init__(self,move,player,parent,untried,winner):
+
+        self.move       = move
+        self.player     = player
+        self.parent     = parent
+        self.children   = []
+        self.untried    = untried
+        self.visits     = 0
+        self.wins       = 0.0
+        self.winner     = winner
+
+    def uct(self,exploration):
+        """
+        Filho com o maior UCT: taxa de vitorias + exploração
+        """
+
+        logn = log(self.visits)
+
+        return max(self.children,key=lambda child: child.wins / child.visits + exploration * sqrt(logn / child.visits))
+
+    def child(self,move):
+        """
+        Filho da jogada move (None se ainda não foi expandido)
+        """
+
+        for child in self.children:
+            if child.move == move:
+                return child
+
+        return None
+
+
+class StrategyMCTS(StrategyGame):
+    """
+    Monte Carlo Tree Search (UCT): https://en.wikipedia.org/wiki/Monte_Carlo_tree_search
+    A arvore é mantida entre as jogadas da partida: a raiz passa para o nó da jogada do oponente
+    """
+
+    def __init__(self,game,player,verbose=False,iterations=None,time_limit=None,exploration=MCTS_EXPLORATION,**options):
+        super().__init__(game, player,verbose,**options)
+        self._name          = StrategyGame.MCTS
+        # Orçamento de cada jogada: iterações e/ou tempo (s)
+        self._iterations    = iterations if iterations is not None or time_limit is not None else MCTS_ITERATIONS
+        self._time_limit    = time_limit
+        self._exploration   = exploration
+        # Raiz da arvore (após a ultima jogada deste jogador) e o board correspondente
+        self._root          = None
+        self._root_board    = None
+
+    def start(self,seed=None):
+        """
+        Nova partida: descarta a arvore
+        """
+
+        super().start(seed)
+
+        self._root          = None
+        self._root_board    = None
+
+    def move(self):
+        """
+        Estrategia MCTS: seleção (UCT), expansão, simulação aleatoria e retropropagação
+        """
+
+        game        = self._game
+        board       = game.board
+        root        = self.__reroot(board)
+        deadline    = time.time() + self._time_limit if self._time_limit is not None else None
+        empty       = len(game.empty_cells())
+
+        self._count = 0
+
+        # Ao menos uma iteração para que a raiz tenha um filho
+        while self._count == 0 or ((self._iterations is None or self._count < self._iterations) and
+                                   (deadline is None or time.time() < deadline)):
+            self.__iteration(root,Game.copy_board(board),empty)
+            self._count += 1
+
+        best = max(root.children,key=lambda child: child.visits)
+
+        # Mantem a subarvore da jogada escolhida para a proxima jogada
+        self._root          = best
+        self._root_board    = Game.copy_board(board)
+        Game.place(self._root_board,self._player,best.move)
+        best.parent         = None
+
+        # Score no intervalo [-WIN_SCORE,WIN_SCORE] a partir da taxa de vitorias
+        return (best.move,(2 * best.wins / best.visits - 1) * WIN_SCORE)
+
+    def __reroot(self,board):
+        """
+        Reaproveita a subarvore da jogada do oponente ou cria uma nova raiz
+        """
+
+        game = self._game
+
+        if self._root is not None:
+
+            played = [pos for pos in Game.possibilities_cells(self._root_board) if board[pos] != 0]
+
+            if len(played) == 1:
+                child = self._root.child(played[0])
+                if child is not None:
+                    child.parent = None
+                    return child
+
+        return MCTSNode(None,game.opponent(self._player),None,Game.possibilities_cells(board),0)
+
+    def __iteration(self,root,board,empty):
+        """
+        Uma iteração do MCTS sobre a copia do board da raiz (empty celulas vazias)
+        """
+
+        game  = self._game
+        node  = root
+        depth = 0
+
+        # Seleção: desce pelos nós completamente expandidos
+        while node.winner == 0 and not node.untried and node.children:
+            node   = node.uct(self._exploration)
+            depth += 1
+            Game.place(board,node.player,node.move)
+
+        # Expansão: uma jogada ainda não testada
+        if node.winner == 0 and node.untried:
+            pos     = node.untried.pop(self._random.randrange(len(node.untried)))
+            player  = game.opponent(node.player)
+            Game.place(board,player,pos)
+            depth  += 1
+            winner  = game.evaluate_move(board,pos,empty - depth)
+            child   = MCTSNode(pos,player,node,Game.possibilities_cells(board) if winner == 0 else [],winner)
+            node.children.append(child)
+            node    = child
+            self._expanded += 1
+
+        if depth > self._max_ply:
+            self._max_ply = depth
+
+        winner = self.__rollout(board,node)
+        self._leaves += 1
+
+        # Retropropagação
+        while node is not None:
+            node.visits += 1
+            if winner == node.player.id:
+                node.wins += 1
+            elif winner == -1:
+                node.wins += 0.5
+            node = node.parent
+
+    def __rollout(self,board,node):
+        """
+        Simulação aleatoria até o fim da partida. Retorna o ganhador (-1 empate)
+        """
+
+        game    = self._game
+        winner  = node.winner
+        player  = node.player
+
+        while winner == 0:
+            player  = game.opponent(player)
+            cells   = Game.possibilities_cells(board)
+            pos     = self._random.choice(cells)
+            Game.place(board,player,pos)
+            winner  = game.evaluate_move(board,pos,len(cells) - 1)
+
+        return winner
+
+class StrategySolved(StrategyGame):
+    """
+    Jogo perfeito pela tabela do solver (ttt.py solve) aberta com mmap: uma consulta por jogada candidata.
+    Escolhe a vitoria mais rapida, senão o empate e, perdido, a derrota mais longa
+    """
+
+    def __init__(self,game,player,verbose=False,solved_table=None,**options):
+        super().__init__(game, player,verbose,**options)
+        self._name      = StrategyGame.SOLVED
+        file_name       = solved_table if solved_table is not None else table_file(game.shape,game.win_length)
+
+        if not os.path.exists(file_name):
+            raise ValueError("Solved table {} not found for shape {} and win length {}: create it with "
+                             "ttt.py solve --shape {} {} --win-length {}".format(file_name,tuple(game.shape),game.win_length,
+                                                                                 game.shape[0],game.shape[1],game.win_length))
+
+        self._solved    = SolvedTable(file_name)
+
+        if self._solved.shape != tuple(game.shape) or self._solved.win_length != game.win_length:
+            self._solved.close()
+            raise ValueError("Solved table {} is for shape {} and win length {}".format(
+                file_name,self._solved.shape,self._solved.win_length))
+
+    @property
+    def solved(self):
+        """
+        Tabela resolvida (solver.SolvedTable)
+        """
+        return self._solved
+
+    def move(self):
+        """
+        Consulta o valor do estado após cada jogada (do ponto de vista do oponente, que passa a ser o jogador da vez)
+        """
+
+        game        = self._game
+        board       = game.board.to_array() if isinstance(game.board,BitBoard) else game.board
+        cells       = game.empty_cells()
+        mine        = int(np.sum(board == self._player.id))
+        theirs      = game.size - len(cells) - mine
+
+        self._count = 0
+
+        # Quem começou é 1 na tabela: o jogador da vez começou se os dois jogadores têm o mesmo numero de jogadas
+        if mine == theirs:
+            (digit,first_id) = (1,self._player.id)
+        elif mine + 1 == theirs:
+            (digit,first_id) = (2,game.opponent(self._player).id)
+        else:
+            # Posição impossivel na partida (fora da tabela)
+            return (self._random.choice(cells),0)
+
+        index       = self._solved.index(board,first_id)
+        best        = None
+
+        for pos in cells:
+
+            (value,distance) = self._solved.lookup(self._solved.child(index,pos[0] * game.shape[1] + pos[1],digit))
+            self._count += 1
+
+            # Ordem: vitoria (oponente perde) mais rapida, empate, derrota mais longa
+            if value == VALUE_LOSS:
+                rank = (2,-distance)
+            elif value == VALUE_DRAW:
+                rank = (1,0)
+            else:
+                rank = (0 if value == VALUE_WIN else -1,distance)
+
+            if best is None or rank > best[0]:
+                best = (rank,pos)
+
+        self._leaves    = self._count
+        self._max_ply   = 1
+
+        score = {2: WIN_SCORE,1: 0,0: -WIN_SCORE}.get(best[0][0],0)
+
+        return (best[1],score)
+
+    def deinit(self):
+        """
+        Finaliza a estrategia: fecha o mmap e o arquivo da tabela
+        """
+
+        self._solved.close()
+
+        super().deinit()
+
+# Estrategia do processo da busca paralela (criada por init_search_worker)
+_search_worker = None
+
+
+def init_search_worker(settings,shared_alpha):
+    """
+    Inicializa um processo do pool da busca paralela: jogo sem trace e a estrategia alpha beta do jogador da raiz
+    """
+
+    global _search_worker
+
+    # player importa strategy: import local para evitar o ciclo
+    from player import Player
+
+    game            = create_game(settings["shape"],False,settings["engine"],trace=False,win_length=settings["win_length"])
+    game.players    = [Player(id,mark) for id,mark in settings["players"]]
+
+    for player in game.players:
+        if player.id == settings["player"]:
+            player.strategy = StrategyAlphaBeta(game,player,False,**settings["options"])
+            _search_worker  = (player.strategy,shared_alpha)
+
+
+def search_root_move(board,pos,deph):
+    """
+    Tarefa do pool: busca a subarvore da jogada pos da raiz
+    """
+
+    (strategy,shared_alpha) = _search_worker
+
+    return strategy._search_root(board,pos,deph,shared_alpha) + (os.getpid(),)
+
+
+def create_strategy(strategy,game,player,verbose,**options):
     """
     Cria a estrategia que será adotada no jogo para o player
+    Options são os parametros das estrategias de busca passados via CL (ex: tt_size)
     """
 
     if strategy == StrategyGame.RANDOM:
-        strategy = StrategyRandom(game,player,verbose)
+        strategy = StrategyRandom(game,player,verbose,**options)
     elif strategy == StrategyGame.MINIMAX:
-        strategy = StrategyMinimax(game,player,verbose)
+        strategy = StrategyMinimax(game,player,verbose,**options)
     elif strategy == StrategyGame.ALPHA_BETA:
-        strategy = StrategyAlphaBeta(game,player,verbose)
+        strategy = StrategyAlphaBeta(game,player,verbose,**options)
+    elif strategy == StrategyGame.PVS:
+        strategy = StrategyPVS(game,player,verbose,**options)
+    elif strategy == StrategyGame.MCTS:
+        strategy = StrategyMCTS(game,player,verbose,**options)
+    elif strategy == StrategyGame.SOLVED:
+        strategy = StrategySolved(game,player,verbose,**options)
     elif strategy == StrategyGame.HUMAN:
-        strategy = StrategyHuman(game,player)
+        strategy = StrategyHuman(game,player,**options)
 
     return strategy
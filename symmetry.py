@@ -0,0 +1,162 @@
+class Symmetry(object):
+    """
+    Simetrias do tabuleiro (rotações e reflexões) que preservam as linhas de vitoria.
+    Um tabuleiro quadrado tem até 8 simetrias e um retangular até 4.
+    Cada simetria é uma permutação dos indices das celulas (row * cols + col); a primeira é a identidade
+    """
+
+    def __init__(self,shape,lines,enabled=True):
+
+        rows,cols       = shape
+
+        self._cols      = cols
+        self._perms     = []
+
+        for transform in Symmetry.transforms(shape) if enabled else [lambda r,c: (r,c)]:
+
+            perm = tuple(self.__index(transform(index // cols,index % cols)) for index in range(rows * cols))
+
+            if Symmetry.__keep_lines(perm,lines,cols):
+                self._perms.append(perm)
+
+        self._inverses  = [tuple(sorted(range(len(perm)),key=perm.__getitem__)) for perm in self._perms]
+
+    @staticmethod
+    def transforms(shape):
+        """
+        Transformações do grupo diedral para o formato do tabuleiro
+        """
+
+        rows,cols = shape
+        R,C       = rows - 1,cols - 1
+
+        transforms = [
+            lambda r,c: (r,c),
+            lambda r,c: (R - r,c),
+            lambda r,c: (r,C - c),
+            lambda r,c: (R - r,C - c),
+        ]
+
+        if rows == cols:
+            transforms.extend([
+                lambda r,c: (c,r),
+                lambda r,c: (C - c,R - r),
+                lambda r,c: (c,R - r),
+                lambda r,c: (C - c,r),
+            ])
+
+        return transforms
+
+    @staticmethod
+    def __keep_lines(perm,lines,cols):
+        """
+        Verifica se a permutação leva o conjunto de linhas de vitoria nele mesmo
+        """
+
+        indexes = set(frozenset(r * cols + c for r,c in line) for line in lines)
+
+        return set(frozenset(perm[i] for i in line) for line in indexes) == indexes
+
+    def __index(self,position):
+        return position[0] * self._cols + position[1]
+
+    def __position(self,index):
+        return (index // self._cols,index % self._cols)
+
+    def __len__(self):
+        return len(self._perms)
+
+    def hashes(self,zobrist,board):
+        """
+        Hash de Zobrist do tabuleiro em cada orientação
+        """
+
+        hashes = [0] * len(self._perms)
+
+        for player_id,position in zobrist.occupied(board):
+            hashes = self.play(hashes,zobrist,player_id,position)
+
+        return tuple(hashes)
+
+    def play(self,hashes,zobrist,player_id,position):
+        """
+        Atualiza os hashes de todas as orientações com a jogada
+        """
+
+        index = self.__index(position)
+
+        return tuple(h ^ zobrist.cell(player_id,perm[index]) for h,perm in zip(hashes,self._perms))
+
+    def canonical(self,hashes):
+        """
+        Retorna (hash,simetria) da orientação canonica (menor hash)
+        """
+
+        t = min(range(len(hashes)),key=hashes.__getitem__)
+
+        return hashes[t],t
+
+    def canonical_string(self,cells):
+        """
+        Retorna (texto,simetria) da orientação com o menor texto.
+        cells é a sequencia de caracteres das celulas pelo indice (row * cols + col)
+        """
+
+        best = None
+
+        for t,perm in enumerate(self._perms):
+
+            s = [None] * len(perm)
+
+            for index,value in enumerate(cells):
+                s[perm[index]] = value
+
+            s = "".join(s)
+
+            if best is None or s < best[0]:
+                best = (s,t)
+
+        return best
+
+    def to_canonical(self,t,position):
+        """
+        Leva a posição do tabuleiro real para a orientação canonica
+        """
+
+        if position is None:
+            return None
+
+        return self.__position(self._perms[t][self.__index(position)])
+
+    def from_canonical(self,t,position):
+        """
+        Leva a posição da orientação canonica para o tabuleiro real
+        """
+
+        if position is None:
+            return None
+
+        return self.__position(self._inverses[t][self.__index(position)])
+
+    def unique(self,cells,hashes):
+        """
+        Remove as jogadas equivalentes: duas celulas são equivalentes se uma simetria que mantem
+        o tabuleiro inalterado (mesmo hash) leva uma na outra
+        """
+
+        stabilizer = [perm for h,perm in zip(hashes,self._perms) if h == hashes[0]]
+
+        if len(stabilizer) == 1:
+            return cells
+
+        seen    = set()
+        result  = []
+
+        for pos in cells:
+            index = self.__index(pos)
+            if index in seen:
+                continue
+            result.append(pos)
+            seen.update(perm[index] for perm in stabilizer)
+
+        return result
@@ -0,0 +1,99 @@
+import random
+import unittest
+import numpy as np
+
+from bitboard import BitBoard
+from game import create_game, ENGINE_NUMPY, ENGINE_BITBOARD
+from player import Player
+
+# Formatos e k (None = padrão do jogo) comparados e partidas aleatorias de cada um
+SHAPES          = (((3,3),None),((3,4),None),((4,4),None),((4,4),3),((4,5),None))
+GAMES           = 30
+
+
+def create_engine_game(shape,win_length,engine):
+    """
+    Jogo sem trace com os jogadores 1 e 2 (sem estrategia: as jogadas são feitas pelo teste)
+    """
+
+    game            = create_game(shape,False,engine,trace=False,win_length=win_length)
+    game.players    = [Player(1,"X"),Player(2,"O")]
+    game.board      = game.create_board()
+
+    return game
+
+
+class TestBitBoard(unittest.TestCase):
+    """
+    BitBoard com o mesmo resultado do board NumPy em todas as operações do Game (place, undo, celulas vazias e ganhador)
+    """
+
+    def check_same(self,numpy_game,bit_game):
+
+        (board,bits) = (numpy_game.board,bit_game.board)
+
+        np.testing.assert_array_equal(bits.to_array(),board)
+        self.assertEqual(numpy_game.empty_cells(),bit_game.empty_cells())
+        self.assertEqual(numpy_game.evaluate(),bit_game.evaluate())
+        self.assertEqual(numpy_game.is_game_over(),bit_game.is_game_over())
+        self.assertEqual(numpy_game.is_board_empty(),bit_game.is_board_empty())
+
+    def test_random_games_match_numpy(self):
+
+        rng = random.Random(0)
+
+        for shape,win_length in SHAPES:
+            for number in range(GAMES):
+                with self.subTest(shape=shape,win_length=win_length,game=number):
+
+                    numpy_game  = create_engine_game(shape,win_length,ENGINE_NUMPY)
+                    bit_game    = create_engine_game(shape,win_length,ENGINE_BITBOARD)
+                    players     = numpy_game.players
+                    turn        = 0
+
+                    self.check_same(numpy_game,bit_game)
+
+                    while numpy_game.evaluate() == 0:
+
+                        player  = players[turn % 2]
+                        cells   = numpy_game.empty_cells()
+                        pos     = tuple(int(i) for i in rng.choice(cells))
+
+                        # Jogada desfeita e refeita: o board volta ao mesmo estado nos dois motores
+                        for game in (numpy_game,bit_game):
+                            self.assertTrue(game.place(game.board,player,pos))
+                            game.undo(game.board,pos)
+
+                        self.check_same(numpy_game,bit_game)
+
+                        for game in (numpy_game,bit_game):
+                            self.assertTrue(game.place(game.board,player,pos))
+                            self.assertFalse(game.place(game.board,players[(turn + 1) % 2],pos))
+
+                        empty = len(cells) - 1
+
+                        self.assertEqual(numpy_game.evaluate_move(numpy_game.board,pos,empty),
+                                         bit_game.evaluate_move(bit_game.board,pos,empty))
+                        self.assertEqual(numpy_game.evaluate_move(numpy_game.board,pos,empty),numpy_game.evaluate())
+
+                        self.check_same(numpy_game,bit_game)
+
+                        turn += 1
+
+    def test_from_array_and_copy(self):
+
+        board = np.array([[1,0,2],[0,1,0],[2,0,0]])
+        bits  = BitBoard.from_array(board,3)
+        copy  = bits.copy()
+
+        copy.place((2,2),1)
+
+        np.testing.assert_array_equal(bits.to_array(),board)
+        self.assertEqual(copy.winner([1,2]),1)
+        self.assertEqual(bits.winner([1,2]),0)
+        self.assertEqual(bits[(0,2)],2)
+        self.assertEqual(bits[(1,0)],0)
+
+
+if __name__ == "__main__":
+    unittest.main()
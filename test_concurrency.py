@@ -0,0 +1,137 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from game import create_game
+from player import create_players
+from strategy import StrategyGame
+
+# Confrontos alternados entre as partidas e estrategias que nunca perdem no 3x3
+PAIRINGS        = ((StrategyGame.ALPHA_BETA,StrategyGame.RANDOM),
+                   (StrategyGame.RANDOM,StrategyGame.PVS),
+                   (StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA),
+                   (StrategyGame.MCTS,StrategyGame.RANDOM))
+PERFECT         = (StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA,StrategyGame.PVS)
+
+# Jogos executados ao mesmo tempo, threads e partidas de cada jogo
+GAMES           = 16
+THREADS         = 8
+NTIMES          = 4
+
+# Busca paralela na raiz: posições do 3x3 (celulas de X e de O, O joga quando as quantidades são iguais),
+# processos do pool, tamanho da tabela de transposição e repetições de cada busca
+POSITIONS       = (((),()),(((1,1),),()),(((0,0),),()),(((1,1),(0,1)),((0,0),)))
+SEARCH_WORKERS  = 2
+SEARCH_TT_SIZE  = 8
+SEARCH_RUNS     = 10
+
+
+def create_check_game(number,pairing):
+    """
+    Jogo da verificação (sem trace) com a semente number
+    """
+
+    game            = create_game((3,3),False,trace=False,seed=number)
+    game.players    = create_players(game,((1,pairing[0],"X"),(2,pairing[1],"O")),None,False,tt_size=1,iterations=200)
+
+    return game
+
+
+def root_search(position,workers,tt_size):
+    """
+    Jogada (posição,score) do alpha beta do jogador da vez na posição, com a busca em workers processos
+    """
+
+    (xs,os)         = position
+    game            = create_game((3,3),False,trace=False,seed=0)
+    game.players    = create_players(game,((1,StrategyGame.ALPHA_BETA,"X"),(2,StrategyGame.ALPHA_BETA,"O")),None,False,
+                                     tt_size=tt_size,search_workers=workers)
+    game.start()
+
+    for cells,player_id in ((xs,1),(os,2)):
+        for cell in cells:
+            game.board[cell] = player_id
+
+    strategy        = game.players[0 if len(xs) == len(os) else 1].strategy
+
+    try:
+        (pos,score) = strategy.move()
+    finally:
+        strategy.deinit()
+
+    return tuple(int(i) for i in pos),score
+
+
+def play_check_game(number,pairing):
+    """
+    Executa as partidas do jogo. Retorna (jogo,resultado de cada partida)
+    """
+
+    game = create_check_game(number,pairing)
+
+    game.play_games(0,NTIMES)
+
+    return game,[int(result) for result in game.result]
+
+
+class TestConcurrentGames(unittest.TestCase):
+    """
+    Varios Game no mesmo processo: o estado das estrategias é de cada instancia (sem atributo de classe compartilhado)
+    """
+
+    def setUp(self):
+
+        self.tasks = [(number,PAIRINGS[number % len(PAIRINGS)]) for number in range(GAMES)]
+
+    def test_strategies_keep_their_game(self):
+
+        games = [create_check_game(number,pairing) for number,pairing in self.tasks[:2]]
+
+        for game in games:
+            for player in game.players:
+                self.assertIs(player.strategy.game,game)
+
+        self.assertIsNot(games[0].players[0].strategy.game,games[1].players[0].strategy.game)
+
+    def test_threads_match_games_played_alone(self):
+
+        alone = [play_check_game(*task)[1] for task in self.tasks]
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            together = list(pool.map(lambda task: play_check_game(*task),self.tasks))
+
+        for (number,pairing),expected,(game,result) in zip(self.tasks,alone,together):
+
+            with self.subTest(game=number,pairing="-".join(pairing)):
+
+                self.assertEqual(result,expected)
+
+                # Cada estrategia terminou com o proprio jogo
+                for player in game.players:
+                    self.assertIs(player.strategy.game,game)
+
+                for index,strategy in enumerate(pairing):
+                    if strategy in PERFECT:
+                        self.assertNotIn(2 - index,result)
+
+
+class TestParallelSearch(unittest.TestCase):
+    """
+    Busca da raiz em varios processos (search_workers) com a tabela de transposição: mesmo resultado da busca sequencial
+    em todas as repetições (a ordem em que as tarefas terminam não muda a jogada)
+    """
+
+    def test_parallel_matches_sequential(self):
+
+        for position in POSITIONS:
+
+            expected = root_search(position,1,SEARCH_TT_SIZE)
+
+            for run in range(SEARCH_RUNS):
+                with self.subTest(position=position,run=run):
+                    self.assertEqual(root_search(position,SEARCH_WORKERS,SEARCH_TT_SIZE),expected)
+
+            self.assertEqual(root_search(position,1,0),expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
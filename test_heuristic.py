@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+
+from game import create_game
+from player import create_players
+from strategy import StrategyGame, WIN_SCORE
+from heuristic import HeuristicEvaluator, HEURISTIC_STEP
+
+# Posições comparadas: formato, k, profundidade da busca e sementes (jogadas aleatorias antes da busca)
+SHAPE           = (5,5)
+WIN_LENGTH      = 4
+DEPH            = 3
+SEEDS           = range(4)
+
+
+def create_position(strategy,seed):
+    """
+    Jogo sem tabela de transposição com a heuristica e 2 ou 4 peças em celulas aleatorias (X é o jogador da vez)
+    """
+
+    game            = create_game(SHAPE,False,"numpy",trace=False,seed=seed,win_length=WIN_LENGTH)
+    game.players    = create_players(game,((1,strategy,"X"),(2,StrategyGame.RANDOM,"O")),None,False,
+                                     tt_size=0,depth=DEPH,heuristic=True)
+    game.start()
+
+    rng             = np.random.default_rng(seed)
+    cells           = np.argwhere(game.board == 0)
+
+    for ply,cell in enumerate(cells[rng.permutation(len(cells))[:2 * (1 + seed % 2)]]):
+        game.board[tuple(cell)] = 1 + ply % 2
+
+    return game
+
+
+def search_nodes(strategy,seed):
+    """
+    Nós visitados pela busca da jogada do jogador X
+    """
+
+    game        = create_position(strategy,seed)
+    strategy    = game.players[0].strategy
+
+    strategy.move()
+
+    return strategy.count
+
+
+class TestHeuristic(unittest.TestCase):
+    """
+    Scores da heuristica discretos e a janela nula do PVS do tamanho da resolução deles
+    """
+
+    def test_scores_are_steps_below_win(self):
+
+        evaluator = HeuristicEvaluator(SHAPE,WIN_LENGTH,WIN_SCORE - 1)
+
+        for seed in SEEDS:
+
+            board = create_position(StrategyGame.ALPHA_BETA,seed).board
+
+            for to_move in (1,2):
+                score = evaluator.score(board,1,2,to_move)
+                self.assertEqual(score % HEURISTIC_STEP,0)
+                self.assertLess(abs(score),WIN_SCORE)
+
+    def test_pvs_visits_no_more_nodes_than_alpha_beta(self):
+
+        alpha_beta  = sum(search_nodes(StrategyGame.ALPHA_BETA,seed) for seed in SEEDS)
+        pvs         = sum(search_nodes(StrategyGame.PVS,seed) for seed in SEEDS)
+
+        self.assertLessEqual(pvs,alpha_beta)
+
+
+if __name__ == "__main__":
+    unittest.main()
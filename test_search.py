@@ -0,0 +1,187 @@
+import random
+import unittest
+import numpy as np
+from functools import lru_cache
+
+from bitboard import BitBoard
+from game import create_game, ENGINE_NUMPY, ENGINE_BITBOARD
+from player import create_players
+from strategy import StrategyGame, WIN_SCORE
+from transposition import Zobrist, TranspositionTable, EXACT, LOWER
+
+# Estrategias de busca completa comparadas com a força bruta no 3x3
+STRATEGIES      = (StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA,StrategyGame.PVS)
+
+# Tamanhos (MB) da tabela de transposição: sem tabela, com poucos slots (substituições) e grande
+TT_SIZES        = (0,0.01,1)
+
+# Posições sorteadas (2 a 5 jogadas, partida em andamento) buscadas em sequencia pelos mesmos jogadores
+POSITIONS       = 12
+POSITION_SEED   = 0
+
+# Linhas de vitoria do 3x3 (sem win_lines: a força bruta não depende do codigo testado)
+LINES           = [[(r,c) for c in range(3)] for r in range(3)] + [[(r,c) for r in range(3)] for c in range(3)] + \
+                  [[(i,i) for i in range(3)],[(i,2 - i) for i in range(3)]]
+
+
+def winner(cells):
+    """
+    Ganhador (1 ou 2) do board 3x3 em tupla (linha a linha) ou 0
+    """
+
+    for line in LINES:
+        values = {cells[r * 3 + c] for r,c in line}
+        if len(values) == 1 and 0 not in values:
+            return values.pop()
+
+    return 0
+
+
+@lru_cache(maxsize=None)
+def brute_force(cells,to_move):
+    """
+    Valor (1 vitoria, 0 empate, -1 derrota) do board para o jogador da vez com jogo perfeito
+    """
+
+    won = winner(cells)
+
+    if won != 0:
+        return 1 if won == to_move else -1
+
+    if 0 not in cells:
+        return 0
+
+    return max(-brute_force(cells[:i] + (to_move,) + cells[i + 1:],3 - to_move) for i,value in enumerate(cells) if value == 0)
+
+
+def random_positions(count,seed):
+    """
+    Boards 3x3 (tuplas) com 2 a 5 jogadas e a partida em andamento
+    """
+
+    rng         = random.Random(seed)
+    positions   = []
+
+    while len(positions) < count:
+
+        cells = [0] * 9
+
+        for ply in range(rng.randint(2,5)):
+            cells[rng.choice([i for i,value in enumerate(cells) if value == 0])] = 1 + ply % 2
+
+        if winner(tuple(cells)) == 0 and tuple(cells) not in positions:
+            positions.append(tuple(cells))
+
+    return positions
+
+
+def search_positions(strategy,engine,positions,**options):
+    """
+    (jogada,score,jogador da vez) da busca de cada posição, todas pelos mesmos jogadores (a tabela dura todas as buscas)
+    """
+
+    game            = create_game((3,3),False,engine,trace=False,seed=0)
+    game.players    = create_players(game,((1,strategy,"X"),(2,strategy,"O")),None,False,**options)
+    game.start()
+
+    moves = []
+
+    for cells in positions:
+
+        board       = np.array(cells).reshape(3,3)
+        game.board  = BitBoard.from_array(board,3) if engine == ENGINE_BITBOARD else board
+        to_move     = 1 if cells.count(1) == cells.count(2) else 2
+        (pos,score) = game.players[to_move - 1].strategy.move()
+
+        moves.append(((int(pos[0]),int(pos[1])),score,to_move))
+
+    game.deinit()
+
+    return moves
+
+
+class TestSearch(unittest.TestCase):
+    """
+    Minimax, alpha beta e PVS com o valor da força bruta e uma jogada otima em cada posição,
+    com e sem a tabela de transposição (mantida entre as buscas) e a simetria nos dois motores do board
+    """
+
+    def setUp(self):
+
+        self.positions = random_positions(POSITIONS,POSITION_SEED)
+
+    def check_search(self,symmetry):
+
+        for strategy in STRATEGIES:
+            for engine in (ENGINE_NUMPY,ENGINE_BITBOARD):
+                for tt_size in TT_SIZES:
+
+                    moves = search_positions(strategy,engine,self.positions,tt_size=tt_size,symmetry=symmetry)
+
+                    for cells,(pos,score,to_move) in zip(self.positions,moves):
+                        with self.subTest(strategy=strategy,engine=engine,tt_size=tt_size,symmetry=symmetry,board=cells):
+
+                            value = brute_force(cells,to_move)
+                            index = pos[0] * 3 + pos[1]
+
+                            self.assertEqual(score,value * WIN_SCORE)
+                            self.assertEqual(cells[index],0)
+                            self.assertEqual(-brute_force(cells[:index] + (to_move,) + cells[index + 1:],3 - to_move),value)
+
+    def test_transposition_matches_brute_force(self):
+
+        self.check_search(False)
+
+    def test_symmetry_matches_brute_force(self):
+
+        self.check_search(True)
+
+
+class TestTransposition(unittest.TestCase):
+    """
+    Hash de Zobrist incremental e a tabela de transposição
+    """
+
+    def test_incremental_hash_matches_board(self):
+
+        zobrist = Zobrist((3,3),[1,2])
+        rng     = random.Random(0)
+        board   = np.zeros((3,3),dtype=int)
+        h       = 0
+
+        for ply,index in enumerate(rng.sample(range(9),9)):
+
+            (player_id,pos) = (1 + ply % 2,(index // 3,index % 3))
+            board[pos]      = player_id
+            h              ^= zobrist.key(player_id,pos)
+
+            full = 0
+            for cell_player,cell in zobrist.occupied(board):
+                full ^= zobrist.key(cell_player,cell)
+
+            self.assertEqual(h,full)
+            self.assertEqual(sorted(zobrist.occupied(BitBoard.from_array(board,3))),sorted(zobrist.occupied(board)))
+
+    def test_store_and_replace(self):
+
+        table   = TranspositionTable(0.001)
+        slots   = table.slots
+
+        table.store(5,3,EXACT,10,(0,0))
+        self.assertEqual(table.probe(5),(3,EXACT,10,(0,0)))
+        self.assertIsNone(table.probe(5 + slots))
+
+        # Mesma busca: a entrada mais profunda de outra posição não é substituida
+        table.store(5 + slots,1,LOWER,0,(1,1))
+        self.assertEqual(table.probe(5),(3,EXACT,10,(0,0)))
+
+        # Nova busca: as entradas antigas podem ser substituidas
+        table.new_search()
+        table.store(5 + slots,1,LOWER,0,(1,1))
+        self.assertEqual(table.probe(5 + slots),(1,LOWER,0,(1,1)))
+        self.assertIsNone(table.probe(5))
+        self.assertEqual((table.hits,table.misses),(3,2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from functools import lru_cache
+
+from bitboard import BitBoard
+from game import create_game
+from player import create_players
+from strategy import StrategyGame
+from solver import Solver, SolvedTable, table_file, VALUE_WIN, VALUE_DRAW, VALUE_LOSS
+
+# Linhas de vitoria do 3x3 (sem win_lines: a força bruta não depende do codigo testado)
+LINES           = [[r * 3 + c for c in range(3)] for r in range(3)] + [[r * 3 + c for r in range(3)] for c in range(3)] + \
+                  [[0,4,8],[2,4,6]]
+
+
+def won(cells,player):
+    """
+    Verifica se o jogador (1 quem começa, 2 o segundo) fechou alguma linha
+    """
+
+    return any(all(cells[i] == player for i in line) for line in LINES)
+
+
+@lru_cache(maxsize=None)
+def brute_force(cells,to_move):
+    """
+    (valor,distancia) do board para o jogador da vez: a vitoria mais rapida, o empate e a derrota mais longos
+    """
+
+    if won(cells,3 - to_move):
+        return VALUE_LOSS,0
+
+    if 0 not in cells:
+        return VALUE_DRAW,0
+
+    children = [brute_force(cells[:i] + (to_move,) + cells[i + 1:],3 - to_move) for i,value in enumerate(cells) if value == 0]
+    wins     = [distance for value,distance in children if value == VALUE_LOSS]
+    draws    = [distance for value,distance in children if value == VALUE_DRAW]
+
+    if wins:
+        return VALUE_WIN,min(wins) + 1
+
+    if draws:
+        return VALUE_DRAW,max(draws) + 1
+
+    return VALUE_LOSS,max(distance for value,distance in children) + 1
+
+
+def reachable(cells=(0,) * 9,to_move=1,states=None):
+    """
+    Estados alcançaveis a partir do board vazio: {board: jogador da vez}
+    """
+
+    states = {} if states is None else states
+
+    if cells in states:
+        return states
+
+    states[cells] = to_move
+
+    if not won(cells,3 - to_move) and 0 in cells:
+        for i,value in enumerate(cells):
+            if value == 0:
+                reachable(cells[:i] + (to_move,) + cells[i + 1:],3 - to_move,states)
+
+    return states
+
+
+def state_index(cells):
+    """
+    Indice base 3 do board (o mesmo hash perfeito do Solver)
+    """
+
+    return sum(value * 3 ** i for i,value in enumerate(cells))
+
+
+class TestSolver(unittest.TestCase):
+    """
+    Valores e distancias do Solver iguais aos da força bruta em todos os estados do 3x3 e a tabela gravada igual a resolvida
+    """
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.solver = Solver((3,3)).solve()
+        cls.states = reachable()
+
+    def test_values_match_brute_force(self):
+
+        self.assertEqual(self.solver.states,len(self.states))
+
+        for cells,to_move in self.states.items():
+            with self.subTest(board=cells):
+                index = state_index(cells)
+                self.assertEqual((int(self.solver.values[index]),int(self.solver.distances[index])),brute_force(cells,to_move))
+
+        self.assertEqual(brute_force((0,) * 9,1),(VALUE_DRAW,9))
+
+    def test_saved_table_matches_solver(self):
+
+        with tempfile.TemporaryDirectory() as folder:
+
+            file_name = os.path.join(folder,table_file((3,3),self.solver.win_length))
+
+            self.solver.save(file_name)
+
+            table = SolvedTable(file_name)
+
+            try:
+                self.assertEqual((table.shape,table.win_length),((3,3),3))
+
+                for cells,to_move in self.states.items():
+
+                    # O jogador 2 como quem começou: o indice troca os ids
+                    board   = np.array(cells).reshape(3,3)
+                    swapped = np.where(board == 0,0,3 - board)
+                    index   = state_index(cells)
+
+                    self.assertEqual(table.index(board,1),index)
+                    self.assertEqual(table.index(BitBoard.from_array(swapped,3),2),index)
+                    self.assertEqual(table.lookup(index),(int(self.solver.values[index]),int(self.solver.distances[index])))
+
+                    for i,value in enumerate(cells):
+                        if value == 0:
+                            self.assertEqual(table.child(index,i,to_move),state_index(cells[:i] + (to_move,) + cells[i + 1:]))
+            finally:
+                table.close()
+
+
+class TestStrategySolved(unittest.TestCase):
+    """
+    Estrategia solved: jogada otima pela tabela gravada e erro claro sem a tabela certa
+    """
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.folder      = tempfile.TemporaryDirectory()
+        cls.file_name   = os.path.join(cls.folder.name,table_file((3,3),3))
+        cls.states      = reachable()
+
+        Solver((3,3)).solve().save(cls.file_name)
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.folder.cleanup()
+
+    def create_solved_game(self,shape,file_name):
+
+        game            = create_game(shape,False,trace=False,win_length=3)
+        game.players    = create_players(game,((1,StrategyGame.SOLVED,"X"),(2,StrategyGame.SOLVED,"O")),None,False,
+                                         solved_table=file_name)
+
+        return game
+
+    def test_moves_keep_the_value(self):
+
+        game = self.create_solved_game((3,3),self.file_name)
+
+        try:
+            for cells,to_move in self.states.items():
+
+                (value,distance) = brute_force(cells,to_move)
+
+                if distance == 0:
+                    continue
+
+                with self.subTest(board=cells):
+
+                    game.board  = np.array(cells).reshape(3,3)
+                    (pos,score) = game.players[to_move - 1].strategy.move()
+                    index       = int(pos[0]) * 3 + int(pos[1])
+
+                    self.assertEqual(cells[index],0)
+
+                    # Valor do filho do ponto de vista do oponente, com a distancia de jogo perfeito
+                    child = brute_force(cells[:index] + (to_move,) + cells[index + 1:],3 - to_move)
+                    after = {VALUE_WIN: VALUE_LOSS,VALUE_DRAW: VALUE_DRAW,VALUE_LOSS: VALUE_WIN}[value]
+
+                    self.assertEqual(child,(after,distance - 1))
+        finally:
+            game.deinit()
+
+    def test_missing_table(self):
+
+        with self.assertRaisesRegex(ValueError,"ttt.py solve"):
+            self.create_solved_game((3,3),os.path.join(self.folder.name,"missing.bin"))
+
+    def test_table_of_another_shape(self):
+
+        with self.assertRaisesRegex(ValueError,"is for shape"):
+            self.create_solved_game((3,4),self.file_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
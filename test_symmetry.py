@@ -0,0 +1,120 @@
+import random
+import unittest
+import numpy as np
+
+from bitboard import win_lines
+from symmetry import Symmetry
+from transposition import Zobrist
+
+# Formato, k e quantidade de simetrias que preservam as linhas de vitoria
+GROUPS          = (((3,3),3,8),((4,4),3,8),((4,4),4,8),((3,4),3,4),((4,5),4,4))
+
+# Boards aleatorios testados em cada formato
+BOARDS          = 20
+
+
+def random_board(shape,rng):
+    """
+    Board com uma quantidade aleatoria de jogadas alternadas dos jogadores 1 e 2
+    """
+
+    board   = np.zeros(shape,dtype=int)
+    cells   = [(r,c) for r in range(shape[0]) for c in range(shape[1])]
+
+    for ply,pos in enumerate(rng.sample(cells,rng.randint(0,len(cells)))):
+        board[pos] = 1 + ply % 2
+
+    return board
+
+
+def transform_board(board,transform):
+    """
+    Board com cada celula levada pela transformação (r,c) -> transform(r,c)
+    """
+
+    result = np.zeros_like(board)
+
+    for (r,c),value in np.ndenumerate(board):
+        result[transform(r,c)] = value
+
+    return result
+
+
+class TestSymmetry(unittest.TestCase):
+    """
+    Simetrias do formato, hash canonico igual nos boards equivalentes e a poda das jogadas equivalentes
+    """
+
+    def test_group_size(self):
+
+        for shape,win_length,size in GROUPS:
+            with self.subTest(shape=shape,win_length=win_length):
+                lines = win_lines(shape,win_length)
+                self.assertEqual(len(Symmetry(shape,lines)),size)
+                self.assertEqual(len(Symmetry(shape,lines,False)),1)
+
+    def test_canonical_hash_of_equivalent_boards(self):
+
+        rng = random.Random(0)
+
+        for shape,win_length,size in GROUPS:
+
+            symmetry    = Symmetry(shape,win_lines(shape,win_length))
+            zobrist     = Zobrist(shape,[1,2])
+            transforms  = Symmetry.transforms(shape)
+
+            for number in range(BOARDS):
+                with self.subTest(shape=shape,win_length=win_length,board=number):
+
+                    board       = random_board(shape,rng)
+                    (h,t)       = symmetry.canonical(symmetry.hashes(zobrist,board))
+
+                    for transform in transforms:
+                        self.assertEqual(symmetry.canonical(symmetry.hashes(zobrist,transform_board(board,transform)))[0],h)
+
+                    # Jogada levada para a orientação canonica e de volta
+                    for pos in [(r,c) for r in range(shape[0]) for c in range(shape[1])]:
+                        self.assertEqual(symmetry.from_canonical(t,symmetry.to_canonical(t,pos)),pos)
+
+    def test_incremental_hashes(self):
+
+        shape       = (3,3)
+        symmetry    = Symmetry(shape,win_lines(shape,3))
+        zobrist     = Zobrist(shape,[1,2])
+        rng         = random.Random(0)
+        board       = np.zeros(shape,dtype=int)
+        hashes      = symmetry.hashes(zobrist,board)
+
+        for ply,index in enumerate(rng.sample(range(9),9)):
+
+            pos         = (index // 3,index % 3)
+            board[pos]  = 1 + ply % 2
+            hashes      = symmetry.play(hashes,zobrist,1 + ply % 2,pos)
+
+            self.assertEqual(hashes,symmetry.hashes(zobrist,board))
+
+    def test_unique_moves(self):
+
+        shape       = (3,3)
+        symmetry    = Symmetry(shape,win_lines(shape,3))
+        zobrist     = Zobrist(shape,[1,2])
+        board       = np.zeros(shape,dtype=int)
+        cells       = [(r,c) for r in range(3) for c in range(3)]
+
+        # Tabuleiro vazio: canto, borda e centro
+        self.assertEqual(symmetry.unique(cells,symmetry.hashes(zobrist,board)),[(0,0),(0,1),(1,1)])
+
+        # X no centro: canto e borda
+        board[1,1] = 1
+        cells.remove((1,1))
+        self.assertEqual(symmetry.unique(cells,symmetry.hashes(zobrist,board)),[(0,0),(0,1)])
+
+        # X em um canto: só a diagonal é simetria
+        board[1,1] = 0
+        board[0,0] = 1
+        cells      = [(r,c) for r in range(3) for c in range(3) if (r,c) != (0,0)]
+        self.assertEqual(len(symmetry.unique(cells,symmetry.hashes(zobrist,board))),5)
+
+
+if __name__ == "__main__":
+    unittest.main()
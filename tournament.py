@@ -0,0 +1,201 @@
+import os
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from game import create_game
+from player import create_players
+from strategy import StrategyGame
+
+# Estrategias do torneio por padrão (o minimax sem limite de profundidade é lento a partir do 3x4)
+TOURNAMENT_STRATEGIES   = (StrategyGame.RANDOM,StrategyGame.ALPHA_BETA,StrategyGame.PVS,StrategyGame.MCTS)
+
+# Custo relativo de uma jogada de cada estrategia: ordena os jobs do mais longo para o mais curto
+STRATEGY_COST           = {StrategyGame.RANDOM: 1,StrategyGame.MCTS: 50,StrategyGame.PVS: 100,StrategyGame.ALPHA_BETA: 100,
+                           StrategyGame.MINIMAX: 1000,StrategyGame.SOLVED: 1,StrategyGame.HUMAN: 0}
+
+# Rating Elo: valor inicial, passos do ajuste e tamanho de cada passo
+ELO_START               = 1500
+ELO_ITERATIONS          = 500
+ELO_STEP                = 50
+
+
+def schedule(strategies,shapes,ntimes,seed=None,options=None):
+    """
+    Jobs do torneio: cada par de estrategias diferentes nas duas ordens (quem começa) em cada formato.
+    options são as opções das estrategias e do jogo (depth, heuristic, tt_size, win_length, ...) de todos os jobs
+    """
+
+    jobs = []
+
+    for shape in shapes:
+        for first in strategies:
+            for second in strategies:
+                if first != second:
+                    jobs.append(dict(shape=list(shape),players=[first,second],ntimes=ntimes,seed=seed,options=dict(options or {})))
+
+    return jobs
+
+
+def job_key(job):
+    """
+    Identificação do job no arquivo do torneio (para continuar uma execução interrompida).
+    Inclui todas as opções: um resume com outras opções não reaproveita os resultados gravados
+    """
+
+    return "{}x{}:{}-{}:{}:{}:{}".format(*job["shape"],*job["players"],job["ntimes"],job["seed"],
+                                         json.dumps(job["options"],sort_keys=True,separators=(",",":")))
+
+
+def job_cost(job):
+    """
+    Estimativa do tempo do job: partidas x custo das estrategias x celulas ao quadrado (jogadas x tamanho das buscas)
+    """
+
+    cells = job["shape"][0] * job["shape"][1]
+
+    return job["ntimes"] * sum(STRATEGY_COST.get(name,1) for name in job["players"]) * cells ** 2
+
+
+def play_job(job):
+    """
+    Executa um job em um processo do pool: as partidas do confronto sem trace e com as metricas das jogadas.
+    Retorna o job com a quantidade de vitorias de cada lugar, empates e o tempo das jogadas de cada lugar
+    """
+
+    options         = job["options"]
+    game            = create_game(tuple(job["shape"]),False,trace=False,seed=job["seed"],win_length=options.get("win_length"))
+    players         = [(index + 1,name,mark) for index,(name,mark) in enumerate(zip(job["players"],("X","O")))]
+    search          = {key: value for key,value in options.items() if key != "win_length"}
+    game.players    = create_players(game,players,None,False,metrics=True,**search)
+
+    game.play_games(0,job["ntimes"])
+
+    game.deinit()
+
+    moves = [player.strategy.metrics.moves for player in game.players]
+
+    return dict(job,
+        key     = job_key(job),
+        wins    = [game.scores.get(player.id,0) for player in game.players],
+        draws   = game.scores.get(-1,0),
+        moves   = [len(m) for m in moves],
+        time    = [sum(move.time for move in m) for m in moves],
+    )
+
+
+def load_results(file_name):
+    """
+    Jobs já executados (uma linha JSON por job)
+    """
+
+    results = []
+
+    if os.path.exists(file_name):
+        with open(file_name) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    # Linha incompleta de uma execução interrompida: o job é executado novamente
+                    pass
+
+    return results
+
+
+def run_tournament(jobs,workers=1,output=None,resume=False,progress=None):
+    """
+    Executa os jobs no pool de processos (os mais longos primeiro) gravando cada job terminado no arquivo output.
+    Com resume os jobs já gravados não são executados novamente. Retorna o resultado de todos os jobs
+    """
+
+    done    = {result["key"]: result for result in load_results(output)} if output is not None and resume else {}
+    pending = sorted((job for job in jobs if job_key(job) not in done),key=job_cost,reverse=True)
+    results = [done[job_key(job)] for job in jobs if job_key(job) in done]
+
+    # Regrava somente os jobs completos (descarta a linha incompleta de uma execução interrompida)
+    if output is not None:
+        with open(output,"w") as f:
+            for result in done.values():
+                f.write(json.dumps(result,separators=(",",":")) + "\n")
+
+    if len(pending) == 0:
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        futures = [pool.submit(play_job,job) for job in pending]
+
+        for future in as_completed(futures):
+
+            result = future.result()
+            results.append(result)
+
+            if output is not None:
+                with open(output,"a") as f:
+                    f.write(json.dumps(result,separators=(",",":")) + "\n")
+
+            if progress is not None:
+                progress(result,len(results),len(jobs))
+
+    return results
+
+
+def standings(results):
+    """
+    Vitorias, empates, derrotas e latencia media das jogadas (ms) de cada estrategia somando os dois lugares e os formatos
+    """
+
+    table = {}
+
+    for result in results:
+        for seat,name in enumerate(result["players"]):
+            row = table.setdefault(name,dict(games=0,wins=0,draws=0,losses=0,moves=0,time=0.0))
+            row["games"]   += result["ntimes"]
+            row["wins"]    += result["wins"][seat]
+            row["draws"]   += result["draws"]
+            row["losses"]  += result["wins"][1 - seat]
+            row["moves"]   += result["moves"][seat]
+            row["time"]    += result["time"][seat]
+
+    for row in table.values():
+        row["latency_ms"] = row["time"] * 1000 / row["moves"] if row["moves"] > 0 else 0.0
+
+    return table
+
+
+def elo(results):
+    """
+    Rating Elo ajustado a todos os jogos do torneio (vitoria 1, empate 0.5).
+    Cada estrategia recebe também um empate virtual contra a media, o que mantem o rating finito com 100 % de vitorias
+    """
+
+    names   = sorted({name for result in results for name in result["players"]})
+    ratings = {name: float(ELO_START) for name in names}
+    pairs   = []
+
+    for result in results:
+        (a,b) = result["players"]
+        pairs.append((a,b,result["wins"][0] + result["draws"] / 2,result["ntimes"]))
+
+    expected = lambda ra,rb: 1 / (1 + 10 ** ((rb - ra) / 400))
+
+    for i in range(ELO_ITERATIONS):
+
+        mean  = sum(ratings.values()) / len(ratings) if ratings else ELO_START
+        score = {name: [0.5 - expected(ratings[name],mean),1] for name in names}
+
+        for (a,b,points,n) in pairs:
+            e = expected(ratings[a],ratings[b]) * n
+            score[a][0] += points - e
+            score[b][0] += e - points
+            score[a][1] += n
+            score[b][1] += n
+
+        for name in names:
+            ratings[name] += ELO_STEP * score[name][0] / math.sqrt(score[name][1])
+
+    # Media fixa em ELO_START
+    shift = ELO_START - sum(ratings.values()) / len(ratings) if ratings else 0
+
+    return {name: rating + shift for name,rating in ratings.items()}
@@ -0,0 +1,183 @@
+import random
+import numpy as np
+
+from bitboard import BitBoard
+
+# Tipo do score armazenado
+EXACT           = 0
+LOWER           = 1
+UPPER           = 2
+
+# Estimativa em bytes de uma entrada da tabela (tupla + inteiros + slot da lista)
+ENTRY_SIZE      = 128
+
+# Semente fixa para que as chaves sejam as mesmas em todas as execuções
+ZOBRIST_SEED    = 0x7A7
+
+
+class Zobrist(object):
+    """
+    Chaves de Zobrist: um inteiro aleatório de 64 bits por (jogador,celula) e por jogador da vez.
+    O hash de um tabuleiro é o XOR das chaves das celulas ocupadas e pode ser atualizado a cada jogada
+    """
+
+    def __init__(self,shape,players_id,seed=ZOBRIST_SEED):
+
+        rng             = random.Random(seed)
+        size            = shape[0] * shape[1]
+
+        self._cols      = shape[1]
+        self._cells     = {player_id: [rng.getrandbits(64) for i in range(size)] for player_id in players_id}
+        self._turn      = {player_id: rng.getrandbits(64) for player_id in players_id}
+
+    def key(self,player_id,position):
+        """
+        Chave da jogada do jogador na posição (row,col)
+        """
+
+        return self._cells[player_id][position[0] * self._cols + position[1]]
+
+    def turn(self,player_id):
+        """
+        Chave do jogador da vez
+        """
+
+        return self._turn[player_id]
+
+    def cell(self,player_id,index):
+        """
+        Chave da jogada do jogador na celula de indice (row * cols + col)
+        """
+
+        return self._cells[player_id][index]
+
+    def occupied(self,board):
+        """
+        Lista (player_id,(row,col)) das celulas ocupadas do tabuleiro
+        """
+
+        cells = []
+
+        if isinstance(board,BitBoard):
+            for player_id,mask in board.masks.items():
+                index = 0
+                while mask:
+                    if mask & 1:
+                        cells.append((player_id,(index // self._cols,index % self._cols)))
+                    mask  >>= 1
+                    index  += 1
+        else:
+            for (row,col),value in np.ndenumerate(board):
+                if value != 0:
+                    cells.append((int(value),(row,col)))
+
+        return cells
+
+
+class TranspositionTable(object):
+    """
+    Tabela de transposição com tamanho fixo em memoria.
+    Cada slot guarda (key,depth,flag,score,move,generation) e o indice é key % slots.
+    Substituição: slot vazio, mesma posição, entrada de uma busca anterior ou profundidade maior/igual
+    """
+
+    def __init__(self,size_mb=64):
+
+        self._slots         = max(1,int(size_mb * 2**20) // ENTRY_SIZE)
+        self._table         = [None] * self._slots
+        self._generation    = 0
+        self._entries       = 0
+        self._hits          = 0
+        self._misses        = 0
+
+    @property
+    def hits(self):
+        """
+        Quantidade de consultas que encontraram a posição
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Quantidade de consultas que não encontraram a posição
+        """
+        return self._misses
+
+    @property
+    def entries(self):
+        """
+        Quantidade de slots ocupados
+        """
+        return self._entries
+
+    @property
+    def slots(self):
+        """
+        Capacidade da tabela
+        """
+        return self._slots
+
+    @property
+    def hit_rate(self):
+        """
+        Percentual de acertos das consultas
+        """
+
+        total = self._hits + self._misses
+
+        return self._hits * 100 / total if total > 0 else 0
+
+    def add_counters(self,hits,misses):
+        """
+        Soma os acertos/falhas de outra tabela (ex: a copia usada em outro processo)
+        """
+
+        self._hits     += hits
+        self._misses   += misses
+
+    def new_search(self):
+        """
+        Inicia uma nova busca: as entradas antigas passam a ter prioridade para substituição
+        """
+
+        self._generation += 1
+
+    def probe(self,key):
+        """
+        Retorna (depth,flag,score,move) da posição ou None
+        """
+
+        entry = self._table[key % self._slots]
+
+        if entry is not None and entry[0] == key:
+            self._hits += 1
+            return entry[1:5]
+
+        self._misses += 1
+
+        return None
+
+    def store(self,key,depth,flag,score,move):
+        """
+        Armazena o resultado da busca de uma posição
+        """
+
+        index = key % self._slots
+        entry = self._table[index]
+
+        if entry is None:
+            self._entries += 1
+        elif entry[0] != key and entry[5] == self._generation and entry[1] > depth:
+            # Mantem a entrada mais profunda da busca corrente
+            return
+
+        self._table[index] = (key,depth,flag,score,move,self._generation)
+
+    def clear(self):
+        """
+        Esvazia a tabela
+        """
+
+        self._table     = [None] * self._slots
+        self._entries   = 0
@@ -4,10 +4,18 @@ import locale
 import sys
 import click
 import time, string, copy
+import json
 
+# Somente os modulos que todo comando carrega (o game já importa o register).
+# Os modulos de cada comando (server, analyze, tournament, bench, solver, ...) são importados dentro dele,
+# assim o play não paga o import do asyncio e dos outros comandos; os padrões das opções destes modulos são None
 from strategy import StrategyGame
-from game import create_game
+from game import Game, create_game
 from player import create_players
+from register import QUEUE_SIZE, POLICY_BLOCK, POLICY_DROP, TRACE_TEXT, TRACE_BINARY
+
+# Estrategias das buscas do servidor, do analyze e do torneio (todas menos a humana)
+SEARCH_STRATEGIES = [name for name in StrategyGame.options() if name != StrategyGame.HUMAN]
 
 locale.setlocale(locale.LC_ALL, '')
 
@@ -27,25 +35,376 @@ def cli(ctx, debug, verbose):
 @click.option('--shape', type = (int,int) ,  default=None)
 @click.option('--player' , multiple=True , type = (int,click.Choice(StrategyGame.options()), str) , default=(1,"random","X"))
 @click.option('--sequence' , multiple=True , type = (int,str) , default = None)
+@click.option('--engine' , type = click.Choice(Game.engines()) , default = Game.engines()[0])
+@click.option('--tt-size' , type = float , default = 64 , help = 'Memoria (MB) da tabela de transposição de cada jogador. 0 desativa')
+@click.option('--symmetry/--no-symmetry' , default = True , help = 'Poda das jogadas equivalentes por rotação/reflexão do tabuleiro')
+@click.option('--book' , 'book_file' , type = click.Path(exists=True) , default = None , help = 'Livro de aberturas gerado pelo comando book')
+@click.option('--seed' , type = int , default = None , help = 'Semente das estrategias: mesma semente, mesmo resultado')
+@click.option('--workers' , default = 1 , help = 'Quantidade de processos que dividem as partidas')
+@click.option('--search-workers' , default = 1 , help = 'Processos da busca paralela na raiz do alpha beta')
+@click.option('--time-limit' , type = float , default = None , help = 'Aprofundamento iterativo: tempo maximo (s) de cada jogada')
+@click.option('--node-limit' , type = int , default = None , help = 'Aprofundamento iterativo: quantidade maxima de nós de cada jogada')
+@click.option('--iterations' , type = int , default = None , help = 'MCTS: iterações por jogada (padrão: 1000 se --time-limit não for informado)')
+@click.option('--depth' , type = int , default = None , help = 'Profundidade maxima das buscas (padrão: até o fim da partida ou 4 com --heuristic)')
+@click.option('--heuristic/--no-heuristic' , default = False , help = 'Avaliação heuristica (linhas abertas, ameaças e centro) das folhas do limite de profundidade')
+@click.option('--win-length' , type = int , default = None , help = 'Celulas em sequencia para vencer (padrão: menor lado do tabuleiro até 4)')
+@click.option('--trace-queue' , default = QUEUE_SIZE , help = 'Capacidade da fila de cada gravador do trace')
+@click.option('--trace-policy' , type = click.Choice([POLICY_BLOCK,POLICY_DROP]) , default = POLICY_BLOCK , help = 'Fila do trace cheia: espera (block) ou descarta o registro (drop)')
+@click.option('--trace-format' , type = click.Choice([TRACE_TEXT,TRACE_BINARY]) , default = TRACE_TEXT , help = 'Trace texto (.txt) ou binario (.bin, convertido pelo comando render)')
+@click.option('--batch-size' , type = int , default = None , help = 'Partidas simuladas juntas quando todos os jogadores são random (padrão: BATCH_SIZE do playout). 0 desativa')
+@click.option('--results' , 'results_file' , default = None , help = 'Grava o resultado de cada partida neste arquivo com checkpoints (ex: results.bin)')
+@click.option('--checkpoint-every' , type = int , default = None , help = 'Partidas gravadas entre dois checkpoints do arquivo de resultados (padrão: CHUNK_SIZE do results)')
+@click.option('--resume/--no-resume' , default = False , help = 'Continua a partir do ultimo checkpoint do arquivo de resultados')
+@click.option('--plot/--no-plot' , default = True , help = 'Histograma no matplotlib (result.pdf) ou em texto no terminal')
+@click.option('--histogram' , 'histogram_file' , default = None , help = 'Grava o histograma dos resultados em CSV')
+@click.option('--metrics' , 'metrics_file' , default = None , help = 'Metricas de cada jogada das estrategias em JSON ou CSV (pela extensão, ex: metrics.json)')
+@click.option('--solved-table' , type = click.Path(exists=True) , default = None , help = 'Tabela do comando solve da estrategia solved (padrão: solved_{linhas}x{colunas}_k{k}.bin)')
 @click.pass_context
-def play(ctx,ntimes,player,sequence,shape):
+def play(ctx,ntimes,player,sequence,shape,engine,tt_size,symmetry,book_file,seed,workers,search_workers,time_limit,node_limit,iterations,depth,heuristic,win_length,trace_queue,trace_policy,trace_format,batch_size,
+         results_file,checkpoint_every,resume,plot,histogram_file,metrics_file,solved_table):
 
-    verbose = ctx.obj['VERBOSE']
+    from book import OpeningBook
+    from runner import ProcessRunner, BatchRunner
+    from playout import BATCH_SIZE
+    from results import ResultStream, CHUNK_SIZE
+    from metrics import save_metrics, print_metrics
+
+    verbose          = ctx.obj['VERBOSE']
+    batch_size       = batch_size if batch_size is not None else BATCH_SIZE
+    checkpoint_every = checkpoint_every if checkpoint_every is not None else CHUNK_SIZE
+
+    if resume and results_file is None:
+        raise click.UsageError("--resume requires --results")
 
     # Cria o jogo
-    game = create_game(shape,verbose)
+    game = create_game(shape,verbose,engine,seed=seed,win_length=win_length,trace_queue=trace_queue,trace_policy=trace_policy,
+                       trace_format=trace_format)
+
+    # Livro de aberturas compartilhado pelos jogadores
+    book = OpeningBook.load(book_file,game.lines) if book_file is not None else None
+
+    options = dict(tt_size=tt_size,symmetry=symmetry,search_workers=search_workers,time_limit=time_limit,node_limit=node_limit,
+                   iterations=iterations,depth=depth,heuristic=heuristic,metrics=metrics_file is not None,solved_table=solved_table)
 
     # Cria os jogadores
-    game.players = create_players(game,player,sequence,verbose)
+    game.players = create_players(game,player,sequence,verbose,book=book,**options)
+
+    runner = None
+
+    if batch_size > 0 and not sequence and not verbose and metrics_file is None and \
+       all(p.strategy.name == StrategyGame.RANDOM for p in game.players):
+        # Random x random: partidas simuladas em lote com NumPy (sem saida verbose nem metricas das jogadas)
+        runner = BatchRunner(seed,batch_size)
+        if game.trace:
+            click.echo("Warning: batch mode (all players random) does not write the trace files, use --batch-size 0 to write them",
+                       err=True)
+    elif workers > 1:
+        # Cada processo recria o jogo e os jogadores com estes parametros
+        runner = ProcessRunner(dict(shape=game.shape,engine=engine,win_length=win_length,trace=game.trace,seed=seed,players=player,
+                                    trace_queue=trace_queue,trace_policy=trace_policy,trace_format=trace_format,
+                                    sequence=sequence,options=options,book=book_file),workers)
+
+    stream = None
+
+    if results_file is not None:
+        # O checkpoint só continua uma execução com os mesmos parametros (no lote a semente também depende dos blocos)
+        batch    = (batch_size,checkpoint_every) if isinstance(runner,BatchRunner) else None
+        settings = dict(shape=game.shape,engine=engine,win_length=game.win_length,seed=seed,players=player,sequence=sequence,
+                        options=options,book=book_file,batch=batch)
+        try:
+            stream = ResultStream(results_file,checkpoint_every,settings,resume)
+        except ValueError as e:
+            raise click.UsageError(str(e))
 
     # Realiza N partidas
-    game.play(ntimes)
+    game.play(ntimes,runner,stream)
 
     # Cria um histogram e um arquiv opdf com a estatisitica de todos os jogos 
-    game.show_statistic()
+    if plot:
+        game.show_statistic()
+    else:
+        game.print_statistic()
+
+    if histogram_file is not None:
+        game.save_statistic(histogram_file)
+
+    if metrics_file is not None:
+        print_metrics(game.players)
+        save_metrics(metrics_file,game.players)
 
     # Finaliza o jogo
     game.deinit()
     
+@cli.command()
+@click.option('--shape', type = (int,int) ,  default=(3,3))
+@click.option('--plies', default=2 , help = 'Quantidade de jogadas iniciais cobertas pelo livro')
+@click.option('--strategy', type = click.Choice([StrategyGame.MINIMAX,StrategyGame.ALPHA_BETA]) , default=StrategyGame.ALPHA_BETA)
+@click.option('--depth', type = int , default=None , help = 'Profundidade maxima da busca (padrão: até o fim da partida)')
+@click.option('--engine' , type = click.Choice(Game.engines()) , default = Game.engines()[-1])
+@click.option('--tt-size' , type = float , default = 256)
+@click.option('--win-length' , type = int , default = None , help = 'Celulas em sequencia para vencer (padrão: menor lado do tabuleiro até 4)')
+@click.option('--output', default='book.json')
+@click.pass_context
+def book(ctx,shape,plies,strategy,depth,engine,tt_size,win_length,output):
+
+    from book import build_book
+
+    verbose = ctx.obj['VERBOSE']
+
+    # Jogo sem arquivos de trace: apenas as buscas das posições iniciais
+    game = create_game(shape,verbose,engine,trace=False,win_length=win_length)
+
+    game.players = create_players(game,((1,strategy,"X"),(2,strategy,"O")),None,verbose,tt_size=tt_size,depth=depth)
+
+    start = time.time()
+
+    opening = build_book(game,plies,output)
+
+    print("Book: {} positions {} plies shape {} time: {:.2f} -> {}".format(len(opening),plies,shape,time.time()-start,output))
+
+    game.deinit()
+
+@cli.command()
+@click.option('--shape', type = (int,int) ,  default=(3,3))
+@click.option('--win-length' , type = int , default = None , help = 'Celulas em sequencia para vencer (padrão: menor lado do tabuleiro até 4)')
+@click.option('--output', default=None , help = 'Tabela gravada (padrão: solved_{linhas}x{colunas}_k{k}.bin)')
+@click.pass_context
+def solve(ctx,shape,win_length,output):
+
+    from solver import Solver, table_file
+
+    start = time.time()
+
+    # Tabela com 3 ** celulas estados: viavel até 4x4 (43 milhões de estados)
+    solver = Solver(shape,win_length).solve()
+    output = output if output is not None else table_file(shape,solver.win_length)
+
+    solver.save(output)
+
+    names = {1: "win",2: "draw",3: "loss"}
+    (value,distance) = (names[int(solver.values[0])],int(solver.distances[0]))
+
+    print("Solved: {} states shape {} k {} first player: {} in {} plies time: {:.2f} -> {}".format(
+        solver.states,shape,solver.win_length,value,distance,time.time()-start,output))
+
+@cli.command()
+@click.argument('trace_file' , type = click.Path(exists=True))
+@click.option('--output' , default = None , help = 'Arquivo texto gerado (padrão: o nome do trace com .txt)')
+@click.pass_context
+def render(ctx,trace_file,output):
+
+    from register import render as render_trace
+
+    if output is None:
+        output = os.path.splitext(trace_file)[0] + ".txt"
+
+    start   = time.time()
+
+    records = render_trace(trace_file,output)
+
+    print("Render: {} records time: {:.2f} -> {}".format(records,time.time()-start,output))
+
+@cli.command()
+@click.option('--shape', 'shapes' , multiple = True , type = (int,int) , help = 'Formatos medidos (padrão: BENCH_SHAPES do bench)')
+@click.option('--min-time' , type = float , default = None , help = 'Tempo minimo (s) de cada medida (padrão: BENCH_TIME do bench)')
+@click.option('--depth' , type = int , default = None , help = 'Profundidade das buscas do minimax/alpha beta (padrão: BENCH_DEPTH do bench)')
+@click.option('--output' , default = None , help = 'Grava o resultado em JSON')
+@click.option('--baseline' , type = click.Path(exists=True) , default = None , help = 'Resultado gravado para comparação')
+@click.option('--threshold' , type = float , default = None , help = 'Piora (fração) considerada regressão (padrão: REGRESSION do bench)')
+@click.pass_context
+def bench(ctx,shapes,min_time,depth,output,baseline,threshold):
+
+    from bench import run_bench, compare, save_bench, load_bench, BENCH_SHAPES, BENCH_TIME, BENCH_DEPTH, REGRESSION
+
+    shapes    = shapes if shapes else BENCH_SHAPES
+    min_time  = min_time if min_time is not None else BENCH_TIME
+    depth     = depth if depth is not None else BENCH_DEPTH
+    threshold = threshold if threshold is not None else REGRESSION
+
+    progress = lambda name,result: print("{:<40} {:>14.2f} {}".format(name,result["value"],result["unit"]))
+
+    results = run_bench([tuple(shape) for shape in shapes],min_time=min_time,depth=depth,progress=progress)
+
+    if output is not None:
+        save_bench(results,output)
+
+    if baseline is None:
+        return
+
+    regressions = []
+
+    print("\nBaseline: {}".format(baseline))
+
+    for name,base,value,change in compare(results,load_bench(baseline),threshold):
+        flag = "REGRESSION" if change > threshold else ""
+        print("{:<40} {:>14.2f} {:>14.2f} {:>+8.1f} % {}".format(name,base,value,change * 100,flag))
+        if change > threshold:
+            regressions.append(name)
+
+    if regressions:
+        raise click.ClickException("{} regression(s) above {:.0f} %: {}".format(len(regressions),threshold * 100," ".join(regressions)))
+
+@cli.command()
+@click.option('--strategy', 'strategies' , multiple = True , type = click.Choice(SEARCH_STRATEGIES) ,
+              help = 'Estrategias do torneio (padrão: TOURNAMENT_STRATEGIES do tournament)')
+@click.option('--shape', 'shapes' , multiple = True , type = (int,int) , default = ((3,3),))
+@click.option('--ntimes', default = 10 , help = 'Partidas de cada confronto (par de estrategias e lugar) em cada formato')
+@click.option('--seed' , type = int , default = None)
+@click.option('--workers' , default = os.cpu_count() , help = 'Processos que executam os confrontos')
+@click.option('--depth', type = int , default = None , help = 'Profundidade maxima das buscas')
+@click.option('--heuristic/--no-heuristic' , default = False , help = 'Avaliação heuristica das folhas do limite de profundidade')
+@click.option('--tt-size' , type = float , default = 64)
+@click.option('--time-limit' , type = float , default = None)
+@click.option('--iterations' , type = int , default = None)
+@click.option('--win-length' , type = int , default = None)
+@click.option('--output' , default = 'tournament.jsonl' , help = 'Resultado de cada confronto (uma linha JSON por confronto)')
+@click.option('--resume/--no-resume' , default = False , help = 'Continua o torneio: não repete os confrontos já gravados em --output')
+@click.pass_context
+def tournament(ctx,strategies,shapes,ntimes,seed,workers,depth,heuristic,tt_size,time_limit,iterations,win_length,output,resume):
+
+    from tournament import schedule, run_tournament, standings, elo, TOURNAMENT_STRATEGIES
+
+    strategies = strategies if strategies else TOURNAMENT_STRATEGIES
+    options = dict(depth=depth,heuristic=heuristic,tt_size=tt_size,time_limit=time_limit,iterations=iterations,win_length=win_length)
+    jobs    = schedule(strategies,[tuple(shape) for shape in shapes],ntimes,seed,options)
+    start   = time.time()
+
+    progress = lambda result,done,total: print("[{}/{}] {}x{} {} x {}: {} / {} / draws {}".format(
+        done,total,*result["shape"],*result["players"],*result["wins"],result["draws"]))
+
+    results = run_tournament(jobs,workers,output,resume,progress)
+    table   = standings(results)
+    ratings = elo(results)
+
+    print("\n{:<12} {:>7} {:>7} {:>7} {:>7} {:>8} {:>12}".format("Strategy","Games","Wins","Draws","Losses","Elo","Latency ms"))
+
+    for name in sorted(table,key=lambda name: -ratings[name]):
+        row = table[name]
+        print("{:<12} {:>7} {:>7} {:>7} {:>7} {:>8.0f} {:>12.3f}".format(name,row["games"],row["wins"],row["draws"],row["losses"],
+                                                                      ratings[name],row["latency_ms"]))
+
+    print("\nTournament: {} matches time: {:.2f} -> {}".format(len(results),time.time() - start,output))
+
+@cli.command()
+@click.option('--host' , default = None , help = 'Endereço TCP (padrão: SERVER_HOST do server)')
+@click.option('--port' , type = int , default = None , help = 'Porta TCP (padrão: SERVER_PORT do server)')
+@click.option('--unix' , default = None , help = 'Socket Unix em vez de TCP')
+@click.option('--workers' , default = os.cpu_count() , help = 'Processos que executam as buscas')
+@click.option('--cache-size' , type = int , default = None , help = 'Respostas mantidas no cache compartilhado (padrão: CACHE_SIZE do server)')
+@click.pass_context
+def serve(ctx,host,port,unix,workers,cache_size):
+
+    import asyncio
+    from server import MoveServer, SERVER_HOST, SERVER_PORT, CACHE_SIZE
+
+    host       = host if host is not None else SERVER_HOST
+    port       = port if port is not None else SERVER_PORT
+    cache_size = cache_size if cache_size is not None else CACHE_SIZE
+
+    server = MoveServer(workers,cache_size)
+    ready  = lambda s: print("Serving on {} ({} workers)".format(unix if unix is not None else "{}:{}".format(host,port),workers),flush=True)
+
+    try:
+        asyncio.run(server.serve(host,port,unix,ready))
+    except KeyboardInterrupt:
+        print("Stats: {}".format(server.stats))
+
+@cli.command()
+@click.option('--host' , default = None , help = 'Endereço TCP (padrão: SERVER_HOST do server)')
+@click.option('--port' , type = int , default = None , help = 'Porta TCP (padrão: SERVER_PORT do server)')
+@click.option('--unix' , default = None , help = 'Socket Unix em vez de TCP')
+@click.option('--shape', type = (int,int) , default = (3,3))
+@click.option('--strategy', type = click.Choice(SEARCH_STRATEGIES) , default = StrategyGame.ALPHA_BETA)
+@click.option('--depth', type = int , default = None)
+@click.option('--iterations' , type = int , default = None)
+@click.option('--connections' , default = 8 , help = 'Conexões simultaneas')
+@click.option('--requests' , default = 100 , help = 'Requisições de cada conexão')
+@click.option('--positions' , default = 50 , help = 'Posições diferentes sorteadas pelas requisições')
+@click.option('--seed' , type = int , default = None)
+@click.option('--output' , default = None , help = 'Grava o resumo em JSON')
+@click.pass_context
+def loadgen(ctx,host,port,unix,shape,strategy,depth,iterations,connections,requests,positions,seed,output):
+
+    import asyncio
+    from server import load_generator, SERVER_HOST, SERVER_PORT
+
+    host    = host if host is not None else SERVER_HOST
+    port    = port if port is not None else SERVER_PORT
+
+    options = {key: value for key,value in dict(depth=depth,iterations=iterations).items() if value is not None}
+
+    summary = asyncio.run(load_generator(shape,connections,requests,positions,strategy,options,host,port,unix,seed))
+
+    print("Load: {} requests {} errors time: {:.2f}s throughput: {:.1f} req/s latency ms p50: {:.2f} p95: {:.2f} p99: {:.2f} max: {:.2f}".format(
+        summary["requests"],summary["errors"],summary["time"],summary["throughput"],summary["latency_p50_ms"],summary["latency_p95_ms"],
+        summary["latency_p99_ms"],summary["latency_max_ms"]))
+    print("Server: {}".format(summary["server"]))
+
+    if output is not None:
+        with open(output,"w") as f:
+            json.dump(summary,f,indent=1)
+
+@cli.command()
+@click.argument('input_file' , type = click.Path(exists=True))
+@click.option('--output' , default = None , help = 'Resultado em JSONL ou CSV pela extensão (padrão: o nome da entrada com .analysis.jsonl)')
+@click.option('--strategy', type = click.Choice(SEARCH_STRATEGIES) , default = StrategyGame.ALPHA_BETA , help = 'Estrategia das posições sem strategy')
+@click.option('--depth', type = int , default = None)
+@click.option('--tt-size' , type = float , default = 64)
+@click.option('--iterations' , type = int , default = None)
+@click.option('--win-length' , type = int , default = None)
+@click.option('--workers' , default = 1 , help = 'Processos que executam as buscas')
+@click.option('--chunk-size' , type = int , default = None , help = 'Posições lidas e buscadas de cada vez (padrão: ANALYZE_CHUNK do analyze)')
+@click.option('--cache-size' , type = int , default = None , help = 'Resultados mantidos no cache do lote (padrão: ANALYZE_CACHE do analyze)')
+@click.pass_context
+def analyze(ctx,input_file,output,strategy,depth,tt_size,iterations,win_length,workers,chunk_size,cache_size):
+
+    from analyze import analyze as analyze_positions, ANALYZE_CHUNK, ANALYZE_CACHE
+
+    chunk_size = chunk_size if chunk_size is not None else ANALYZE_CHUNK
+    cache_size = cache_size if cache_size is not None else ANALYZE_CACHE
+
+    if output is None:
+        output = os.path.splitext(input_file)[0] + ".analysis.jsonl"
+
+    options  = {key: value for key,value in dict(depth=depth,tt_size=tt_size,iterations=iterations).items() if value is not None}
+    defaults = dict(strategy=strategy,options=options,win_length=win_length)
+    start    = time.time()
+
+    stats    = analyze_positions(input_file,output,defaults,workers,chunk_size,cache_size)
+
+    print("Analyze: {positions} positions {searches} searches {cached} cached {errors} errors".format(**stats) +
+          " time: {:.2f} -> {}".format(time.time() - start,output))
+
+@cli.command()
+@click.option('--repeat' , default = 5 , help = 'Quantidade de execuções medidas')
+@click.option('--max-time' , type = float , default = None , help = 'Falha se a mediana do play (s) passar deste limite')
+@click.pass_context
+def startup(ctx,repeat,max_time):
+
+    import subprocess
+    import statistics
+    import tempfile
+
+    script  = os.path.abspath(__file__)
+    play    = [sys.executable,script,"play","--ntimes","1","--shape","3","3","--player","1","random","X","--player","2","random","O",
+               "--batch-size","0","--no-plot"]
+    imports = [sys.executable,"-c","import ttt"]
+    env     = dict(os.environ,PYTHONPATH=os.path.dirname(script))
+    times   = {"import": [],"play": []}
+
+    # Processos novos (inicio a frio do interpretador) em um diretorio temporario para os arquivos de trace
+    with tempfile.TemporaryDirectory() as cwd:
+        for i in range(repeat):
+            for name,cmd in (("import",imports),("play",play)):
+                start = time.time()
+                subprocess.run(cmd,cwd=cwd,env=env,check=True,stdout=subprocess.DEVNULL)
+                times[name].append(time.time() - start)
+
+    for name,values in times.items():
+        print("Startup {:<6}: median {:.3f}s min {:.3f}s max {:.3f}s ({} runs)".format(name,statistics.median(values),min(values),max(values),repeat))
+
+    if max_time is not None and statistics.median(times["play"]) > max_time:
+        raise click.ClickException("play --ntimes 1 median {:.3f}s exceeds {:.3f}s".format(statistics.median(times["play"]),max_time))
+
 if __name__ == '__main__':
     cli(obj={})